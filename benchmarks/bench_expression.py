@@ -0,0 +1,103 @@
+"""Benchmark for the evaluation of nif.xml expressions, which gate the
+optional attributes and array sizes of nearly every block.
+
+Reads a generated nif file with many small geometry blocks, and times
+the conditions of a typical block directly.
+
+Usage::
+
+    python benchmarks/bench_expression.py [num_blocks]
+"""
+
+
+# ***** BEGIN LICENSE BLOCK *****
+#
+# Copyright © 2005-2015, NIF File Format Library and Tools contributors.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#
+#    * Redistributions in binary form must reproduce the above
+#      copyright notice, this list of conditions and the following
+#      disclaimer in the documentation and/or other materials provided
+#      with the distribution.
+#
+#    * Neither the name of the NIF File Format Library and Tools
+#      project nor the names of its contributors may be used to endorse
+#      or promote products derived from this software without specific
+#      prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import io
+import os.path
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "modules"))
+
+from pyffi.formats.nif import NifFormat
+
+
+def make_nif(num_blocks):
+    """Return the bytes of an Oblivion nif file with C{num_blocks}
+    blocks: a node with empty shapes and their geometry data."""
+    root = NifFormat.NiNode()
+    root.num_children = num_blocks // 2
+    root.children.update_size()
+    for i in range(root.num_children):
+        shape = NifFormat.NiTriShape()
+        shape.data = NifFormat.NiTriShapeData()
+        root.children[i] = shape
+    data = NifFormat.Data(version=0x14000005, user_version=11)
+    data.roots = [root]
+    stream = io.BytesIO()
+    data.write(stream)
+    return stream.getvalue()
+
+
+def bench_read(raw):
+    """Time reading the nif file."""
+    start = time.perf_counter()
+    data = NifFormat.Data()
+    data.read(io.BytesIO(raw))
+    elapsed = time.perf_counter() - start
+    print("read %i blocks in %.3f seconds" % (len(data.blocks), elapsed))
+
+
+def bench_conditions(num_evals=100000):
+    """Time the conditions of a NiTriShapeData block."""
+    block = NifFormat.NiTriShapeData()
+    exprs = [attr.cond for attr in block._attribute_list
+             if attr.cond is not None]
+    start = time.perf_counter()
+    for i in range(num_evals // len(exprs)):
+        for expr in exprs:
+            expr.eval(block)
+    elapsed = time.perf_counter() - start
+    print("evaluated %i conditions in %.3f seconds"
+          % (num_evals, elapsed))
+
+
+if __name__ == "__main__":
+    num_blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    bench_read(make_nif(num_blocks))
+    bench_conditions()
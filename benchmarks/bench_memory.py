@@ -0,0 +1,111 @@
+"""Benchmark for the memory used by parsed nif blocks.
+
+For each block type, writes a Skyrim nif file with many default blocks
+of that type, and reports the number of bytes allocated per block when
+reading the file back (including all attribute values of the block).
+
+Usage::
+
+    python benchmarks/bench_memory.py [num_blocks]
+"""
+
+
+# ***** BEGIN LICENSE BLOCK *****
+#
+# Copyright © 2005-2015, NIF File Format Library and Tools contributors.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#
+#    * Redistributions in binary form must reproduce the above
+#      copyright notice, this list of conditions and the following
+#      disclaimer in the documentation and/or other materials provided
+#      with the distribution.
+#
+#    * Neither the name of the NIF File Format Library and Tools
+#      project nor the names of its contributors may be used to endorse
+#      or promote products derived from this software without specific
+#      prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import gc
+import io
+import os.path
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "modules"))
+
+from pyffi.formats.nif import NifFormat
+
+BLOCK_TYPES = [
+    "NiNode",
+    "BSFadeNode",
+    "NiTriShape",
+    "NiTriShapeData",
+    "BSLightingShaderProperty",
+    "BSShaderTextureSet",
+    "NiAlphaProperty",
+    "NiStringExtraData",
+    "bhkRigidBody",
+    "bhkBoxShape",
+    "NiTransformController",
+    "NiTransformInterpolator",
+]
+
+
+def make_nif(block_type, num_blocks):
+    """Return the bytes of a Skyrim nif file with C{num_blocks} default
+    blocks of type C{block_type}, all of them roots."""
+    data = NifFormat.Data(version=0x14020007, user_version=12,
+                          user_version_2=83)
+    block_class = getattr(NifFormat, block_type)
+    data.roots = [block_class() for i in range(num_blocks)]
+    stream = io.BytesIO()
+    data.write(stream)
+    return stream.getvalue()
+
+
+def bytes_per_block(raw, num_blocks):
+    """Return the number of bytes allocated per block, when reading
+    C{raw}."""
+    data = NifFormat.Data()
+    gc.collect()
+    tracemalloc.start()
+    start, peak = tracemalloc.get_traced_memory()
+    data.read(io.BytesIO(raw))
+    gc.collect()
+    end, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (end - start) / num_blocks
+
+
+def bench_memory(num_blocks):
+    """Print the memory used by each block type."""
+    for block_type in BLOCK_TYPES:
+        raw = make_nif(block_type, num_blocks)
+        print("%-28s %8i bytes per block"
+              % (block_type, bytes_per_block(raw, num_blocks)))
+
+
+if __name__ == "__main__":
+    bench_memory(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
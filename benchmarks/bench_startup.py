@@ -0,0 +1,93 @@
+"""Benchmark for the cold start of pyffi: the time it takes a fresh
+python process to import the xml based file formats, with the class
+cache disabled, with an empty cache (which is then filled), and with a
+filled cache.
+
+Usage::
+
+    python benchmarks/bench_startup.py [num_runs]
+"""
+
+
+# ***** BEGIN LICENSE BLOCK *****
+#
+# Copyright © 2005-2015, NIF File Format Library and Tools contributors.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#
+#    * Redistributions in binary form must reproduce the above
+#      copyright notice, this list of conditions and the following
+#      disclaimer in the documentation and/or other materials provided
+#      with the distribution.
+#
+#    * Neither the name of the NIF File Format Library and Tools
+#      project nor the names of its contributors may be used to endorse
+#      or promote products derived from this software without specific
+#      prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+import os.path
+import subprocess
+import sys
+import tempfile
+
+MODULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           os.pardir, "modules")
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import pyffi.formats.nif
+import pyffi.formats.kfm
+import pyffi.formats.egm
+print(time.perf_counter() - start)
+"""
+
+
+def time_import(cache_dir):
+    """Import the formats in a fresh python process, and return the
+    elapsed time in seconds."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = MODULES_DIR
+    env["PYFFICACHEPATH"] = cache_dir
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SCRIPT], env=env)
+    return float(output)
+
+
+def bench_startup(num_runs):
+    """Print the best import time, out of C{num_runs}, for each cache
+    state."""
+    no_cache = min(time_import("") for i in range(num_runs))
+    cold = []
+    warm = []
+    for i in range(num_runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold.append(time_import(cache_dir))
+            warm.append(time_import(cache_dir))
+    print("import without cache:  %.3f seconds" % no_cache)
+    print("import, empty cache:   %.3f seconds" % min(cold))
+    print("import, filled cache:  %.3f seconds" % min(warm))
+
+
+if __name__ == "__main__":
+    bench_startup(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
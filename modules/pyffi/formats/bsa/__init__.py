@@ -96,15 +96,19 @@ Create an BSA file from scratch and write to file
 # ***** END LICENSE BLOCK *****
 
 
+import io
 import logging
+import mmap
 import struct
 import os
 import re
+import zlib
 
 import pyffi.object_models.xml
 import pyffi.object_models.common
 from pyffi.object_models.xml.basic import BasicBase
 import pyffi.object_models
+from pyffi.utils import BufferReader
 from pyffi.utils.graph import EdgeFilter
 
 
@@ -209,8 +213,208 @@ class BsaFormat(pyffi.object_models.xml.FileFormat):
             # not supported
             return -1
 
+    @staticmethod
+    def normalize_path(path):
+        """Convert a path to the form in which it is stored in archives:
+        lower case, with backslashes, and without leading or trailing
+        separators.
+
+        :param path: The path.
+        :type path: ``str`` or ``bytes``
+        :return: The normalized path.
+        :rtype: ``str``
+
+        >>> BsaFormat.normalize_path('/Meshes/Clutter/Bowl01.NIF')
+        'meshes\\\\clutter\\\\bowl01.nif'
+        """
+        if isinstance(path, bytes):
+            path = path.decode("latin-1")
+        return path.lower().replace("/", "\\").strip("\\")
+
+    @staticmethod
+    def get_hash(path, folder=False):
+        """Calculate the hash of a file name, or of a folder name, as
+        stored in bsa files from Oblivion and up.
+
+        :param path: The normalized name (see :meth:`normalize_path`).
+        :type path: ``str``
+        :param folder: Whether *path* is a folder name, which never has
+            an extension.
+        :type folder: ``bool``
+        :return: The hash.
+        :rtype: ``int``
+
+        >>> "0x%016X" % BsaFormat.get_hash('meshes', folder=True)
+        '0x322F3A9A6D066573'
+        >>> "0x%016X" % BsaFormat.get_hash('bowl01.nif')
+        '0xC9ED1CA16206B031'
+        """
+        if folder:
+            root, ext = path, ""
+        else:
+            root, ext = os.path.splitext(path)
+        chars = root.encode("latin-1")
+        if not chars:
+            return 0
+        hash1 = (chars[-1]
+                 | ((chars[-2] if len(chars) > 2 else 0) << 8)
+                 | (len(chars) << 16)
+                 | (chars[0] << 24))
+        hash1 |= {".kf": 0x80, ".nif": 0x8000, ".dds": 0x8080,
+                  ".wav": 0x80000000}.get(ext, 0)
+        hash2 = 0
+        for char in chars[1:-2]:
+            hash2 = (hash2 * 0x1003F + char) & 0xFFFFFFFF
+        hash3 = 0
+        for char in ext.encode("latin-1"):
+            hash3 = (hash3 * 0x1003F + char) & 0xFFFFFFFF
+        hash2 = (hash2 + hash3) & 0xFFFFFFFF
+        return (hash2 << 32) | hash1
+
+    @staticmethod
+    def get_old_hash(path):
+        """Calculate the hash of a file name, as stored in Morrowind bsa
+        files.
+
+        :param path: The normalized name (see :meth:`normalize_path`).
+        :type path: ``str``
+        :return: The hash.
+        :rtype: ``int``
+
+        >>> "0x%016X" % BsaFormat.get_old_hash('meshes\\\\bowl01.nif')
+        '0xFD4BDAD80A2F1608'
+        """
+        chars = path.encode("latin-1")
+        half = len(chars) >> 1
+        low = 0
+        for i, char in enumerate(chars[:half]):
+            low ^= char << ((8 * i) & 0x1F)
+        high = 0
+        for i, char in enumerate(chars[half:]):
+            temp = char << ((8 * i) & 0x1F)
+            high ^= temp
+            # rotate right
+            n = temp & 0x1F
+            high = ((high << (32 - n)) | (high >> n)) & 0xFFFFFFFF
+        return (high << 32) | low
+
     class Header(pyffi.object_models.FileFormat.Data):
-        """A class to contain the actual bsa data."""
+        """A class to contain the actual bsa data.
+
+        Besides reading the records, like any other file format, the
+        data of the files in the archive can be accessed, in the style
+        of :class:`pyffi.object_models.ArchiveFileFormat`:
+
+        >>> import struct, zlib
+        >>> from io import BytesIO
+        >>> def archive(version, flags, raw):
+        ...     # one folder, meshes, with one file, bowl01.nif
+        ...     start = 36 + 16 + 8 + 16 + 11
+        ...     return b"".join([
+        ...         b"BSA\\0", struct.pack("<8I", version, 36, flags, 1, 1, 7, 11, 0),
+        ...         struct.pack("<QII",
+        ...                     BsaFormat.get_hash("meshes", folder=True), 1, 0),
+        ...         b"\\x07meshes\\0",
+        ...         struct.pack("<QII",
+        ...                     BsaFormat.get_hash("bowl01.nif"), len(raw), start),
+        ...         b"bowl01.nif\\0", raw])
+        >>> data = BsaFormat.Data(fileobj=BytesIO(archive(103, 0x3, b"bowl")))
+        >>> for member in data.get_members():
+        ...     print(member.name, member.stream.read())
+        meshes\\bowl01.nif b'bowl'
+        >>> data.read_file('Meshes/Bowl01.nif')
+        b'bowl'
+        >>> data.read_file('meshes\\\\cup01.nif')
+        Traceback (most recent call last):
+            ...
+        KeyError: 'no file meshes\\\\cup01.nif in archive'
+        >>> data.close()
+
+        Compressed files start with their original size:
+
+        >>> raw = struct.pack("<I", 4) + zlib.compress(b"bowl")
+        >>> data = BsaFormat.Data(fileobj=BytesIO(archive(103, 0x7, raw)))
+        >>> data.read_file('meshes\\\\bowl01.nif')
+        b'bowl'
+        >>> data.open_file('meshes\\\\bowl01.nif').read()
+        b'bowl'
+        >>> data.close()
+
+        From Fallout 3 on, the data may start with the full path of the
+        file:
+
+        >>> raw = b"\\x11meshes\\\\bowl01.nifbowl"
+        >>> data = BsaFormat.Data(fileobj=BytesIO(archive(104, 0x103, raw)))
+        >>> data.read_file('meshes\\\\bowl01.nif')
+        b'bowl'
+        >>> data.close()
+
+        Morrowind archives have no folders, and the offsets of the files
+        are relative to the end of the file hashes:
+
+        >>> names = [b"meshes\\\\bowl01.nif", b"meshes\\\\cup01.nif"]
+        >>> hash_offset = 12 * 2 + sum(len(name) + 1 for name in names)
+        >>> data = BsaFormat.Data(fileobj=BytesIO(b"".join([
+        ...     b"\\x00\\x01\\x00\\x00", struct.pack("<II", hash_offset, 2),
+        ...     struct.pack("<IIII", 4, 0, 3, 4),
+        ...     struct.pack("<II", 0, len(names[0]) + 1),
+        ...     b"".join(name + b"\\0" for name in names),
+        ...     b"".join(struct.pack("<Q", BsaFormat.get_old_hash(name.decode()))
+        ...              for name in names),
+        ...     b"bowlcup"])))
+        >>> for member in data.get_members():
+        ...     print(member.name, member.stream.read())
+        meshes\\bowl01.nif b'bowl'
+        meshes\\cup01.nif b'cup'
+        >>> data.read_file('meshes/cup01.nif')
+        b'cup'
+        >>> data.close()
+
+        Files are looked up by the hash of their path, and their data
+        is sliced from a memory map of the archive if possible, and
+        decompressed if it is compressed.
+        """
+
+        _index = None
+        """Maps the hash of the path of every file to its record, as
+        ``(name, offset, size, compressed)``, in the order of the
+        archive."""
+
+        _buffer = None
+        """The ``mmap`` of the archive, or its content, as ``bytes``, if
+        it cannot be mapped."""
+
+        _view = None
+        """A ``memoryview`` on :attr:`_buffer`."""
+
+        _stream = None
+        """The stream opened by name, if any, which is closed along with
+        the archive."""
+
+        def __init__(self, template=None, argument=None, parent=None,
+                     name=None, mode=None, fileobj=None):
+            """Initialize the data, and if a file name or a file object
+            is given, read the archive from it.
+
+            :param name: The name of the archive to read.
+            :type name: ``str``
+            :param mode: Must be ``'r'``, writing is not supported.
+            :type mode: ``str``
+            :param fileobj: The stream to read the archive from.
+            :type fileobj: ``file``
+            """
+            BsaFormat._Header.__init__(self, template, argument, parent)
+            if name is None and fileobj is None:
+                return
+            if mode not in (None, 'r', 'rb'):
+                raise NotImplementedError("writing bsa files not supported")
+            if fileobj is None:
+                fileobj = self._stream = open(name, 'rb')
+            try:
+                self.read(fileobj)
+            except:
+                self.close()
+                raise
 
         def inspect_quick(self, stream):
             """Quickly checks if stream contains BSA data, and gets the
@@ -305,6 +509,143 @@ class BsaFormat(pyffi.object_models.xml.FileFormat):
                 raise ValueError(
                     'end of file not reached: corrupt bsa file?')
 
+            # index the files, and map the archive, for read_file
+            logger.debug("Indexing files.")
+            self._index = {}
+            if self.version == 0:
+                data_offset = (12 + self.old_file_hashes_offset
+                               + 8 * self.num_old_files)
+                for old_file in self.old_files:
+                    self._index[old_file.name_hash] = (
+                        old_file.name,
+                        data_offset + old_file.data_offset,
+                        old_file.data_size, False)
+            else:
+                for folder in self.folders:
+                    for file_ in folder.files:
+                        compressed = (
+                            self.archive_flags.is_compressed
+                            != file_.file_size.is_compressed_override)
+                        self._index[(folder.name_hash, file_.name_hash)] = (
+                            BsaFormat.normalize_path(folder.name) + "\\"
+                            + BsaFormat.normalize_path(file_.name),
+                            file_.offset, file_.file_size.num_bytes,
+                            compressed)
+            try:
+                self._buffer = mmap.mmap(
+                    stream.fileno(), 0, access=mmap.ACCESS_READ)
+            except (AttributeError, OSError, ValueError):
+                # not a real file (io.UnsupportedOperation is both an
+                # OSError and a ValueError)
+                stream.seek(0)
+                self._buffer = stream.read()
+            self._view = memoryview(self._buffer)
+
+        def _get_key(self, path):
+            """Return the key of the file with the given path in
+            :attr:`_index`.
+            """
+            path = BsaFormat.normalize_path(path)
+            if self.version == 0:
+                return BsaFormat.get_old_hash(path)
+            folder, sep, name = path.rpartition("\\")
+            return (BsaFormat.get_hash(folder, folder=True),
+                    BsaFormat.get_hash(name))
+
+        def _get_record_data(self, record):
+            """Return the data of a file from its record, decompressed,
+            as ``bytes`` if it was compressed, or as a ``memoryview`` on
+            the archive otherwise.
+            """
+            name, offset, size, compressed = record
+            view = self._view[offset:offset + size]
+            if self.version >= 104 and self.archive_flags.unknown_9:
+                # fallout 3 and up: data starts with the full path
+                view = view[1 + view[0]:]
+            if not compressed:
+                return view
+            if self.version >= 105:
+                raise ValueError(
+                    "lz4 compressed bsa files not supported")
+            original_size, = struct.unpack_from("<I", view)
+            data = zlib.decompress(view[4:])
+            if len(data) != original_size:
+                raise ValueError(
+                    "%s: expected %i bytes but decompressed %i bytes"
+                    % (name, original_size, len(data)))
+            return data
+
+        def _get_record(self, path):
+            """Return the record of the file with the given path."""
+            if self._index is None:
+                raise ValueError("archive not read")
+            try:
+                return self._index[self._get_key(path)]
+            except KeyError:
+                raise KeyError("no file %s in archive" % path)
+
+        def open_file(self, path):
+            """Open a file in the archive for reading. Uncompressed data
+            is not copied.
+
+            :param path: The path of the file, as stored in the archive,
+                or with forward slashes, in any case.
+            :type path: ``str``
+            :return: The stream of the file.
+            :rtype: :class:`pyffi.utils.BufferReader` or ``io.BytesIO``
+            """
+            data = self._get_record_data(self._get_record(path))
+            if isinstance(data, memoryview):
+                return BufferReader(data)
+            return io.BytesIO(data)
+
+        def read_file(self, path):
+            """Return the data of a file in the archive.
+
+            :param path: The path of the file (see :meth:`open_file`).
+            :type path: ``str``
+            :return: The data of the file.
+            :rtype: ``bytes``
+            """
+            data = self._get_record_data(self._get_record(path))
+            if isinstance(data, memoryview):
+                return data.tobytes()
+            return data
+
+        def get_members(self):
+            """Generator which yields all files in the archive, in order,
+            as :class:`pyffi.object_models.ArchiveMember`. The data of
+            a file is only decompressed when its member is yielded.
+            """
+            if self._index is None:
+                raise ValueError("archive not read")
+            for record in self._index.values():
+                member = pyffi.object_models.ArchiveMember()
+                member.name = record[0]
+                data = self._get_record_data(record)
+                member.stream = (BufferReader(data)
+                                 if isinstance(data, memoryview)
+                                 else io.BytesIO(data))
+                yield member
+
+        def close(self):
+            """Release the archive, and close its stream if it was
+            opened by name.
+            """
+            if self._view is not None:
+                self._view.release()
+                self._view = None
+            if isinstance(self._buffer, mmap.mmap):
+                try:
+                    self._buffer.close()
+                except BufferError:
+                    # members still refer to it, so leave it to them
+                    pass
+            self._buffer = None
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
         def write(self, stream):
             """Write a bsa file.
 
@@ -338,6 +338,7 @@ end
 # ***** END LICENSE BLOCK *****
 
 from itertools import repeat, chain
+import io
 import logging
 import math  # math.pi
 import os
@@ -356,10 +357,16 @@ import pyffi.utils
 from pyffi.utils import (inertia, mathutils, mopp, tristrip, vertex_cache, quickhull)
 # convert the following to absolute imports
 from pyffi.object_models.editable import EditableBoolComboBox
+from pyffi.utils import BufferReader, _read_bytes, _unpack
 from pyffi.utils.graph import EdgeFilter
 from pyffi.object_models.xml.basic import BasicBase
 from pyffi.object_models.xml.struct_ import StructBase
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class NifFormat(FileFormat):
     """This class contains the generated classes from the xml."""
@@ -401,6 +408,9 @@ class NifFormat(FileFormat):
 
     class StringOffset(pyffi.object_models.common.Int):
         """This is just an integer with -1 as default value."""
+
+        __slots__ = ()
+
         def __init__(self, **kwargs):
             pyffi.object_models.common.Int.__init__(self, **kwargs)
             self.set_value(-1)
@@ -417,6 +427,9 @@ class NifFormat(FileFormat):
         >>> i.get_value()
         True
         """
+
+        __slots__ = ()
+
         def __init__(self, **kwargs):
             BasicBase.__init__(self, **kwargs)
             self.set_value(False)
@@ -425,17 +438,12 @@ class NifFormat(FileFormat):
             return self._value
 
         def set_value(self, value):
-            if isinstance(value, str):
-                if value.lower() == 'false':
-                    self._value = False
-                    return
-                elif value == '0':
-                    self._value = False
-                    return
-            if value:
-                self._value = True
-            else:
+            if isinstance(value, str) and (value.lower() == 'false'
+                                           or value == '0'):
                 self._value = False
+            else:
+                self._value = bool(value)
+            self._changed()
 
         def get_size(self, data=None):
             ver = data.version if data else -1
@@ -449,11 +457,9 @@ class NifFormat(FileFormat):
 
         def read(self, stream, data):
             if data.version > 0x04000002:
-                value, = struct.unpack(data._byte_order + 'B',
-                                       stream.read(1))
+                value, = _unpack(stream, data._byte_order + 'B', 1)
             else:
-                value, = struct.unpack(data._byte_order + 'I',
-                                       stream.read(4))
+                value, = _unpack(stream, data._byte_order + 'I', 4)
             self._value = bool(value)
 
         def write(self, stream, data):
@@ -465,11 +471,14 @@ class NifFormat(FileFormat):
                                          int(self._value)))
 
     class Flags(pyffi.object_models.common.UShort):
+        __slots__ = ()
+
         def __str__(self):
             return hex(self.get_value())
 
     class Ref(BasicBase):
         """Reference to another block."""
+        __slots__ = ("_template",)
         _is_template = True
         _has_links = True
         _has_refs = True
@@ -483,6 +492,9 @@ class NifFormat(FileFormat):
             return self._value
 
         def set_value(self, value):
+            # signal that the tree may have changed
+            # (see NifFormat.Data.blocks_by_type)
+            BasicBase._link_generation += 1
             if value is None:
                 self._value = None
             else:
@@ -493,20 +505,32 @@ class NifFormat(FileFormat):
                                        )
                                     )
                 self._value = value
+            self._changed()
 
         def get_size(self, data=None):
             return 4
 
         def get_hash(self, data=None):
-            if self.get_value():
-                return self.get_value().get_hash(data)
-            else:
+            value = self.get_value()
+            if not value:
                 return None
+            # the hash of the block does not depend on the structure
+            # which holds this reference
+            dependencies = BasicBase._hash_dependencies
+            BasicBase._hash_dependencies = None
+            try:
+                hsh = value.get_hash(data)
+            finally:
+                BasicBase._hash_dependencies = dependencies
+            # but the structure must check whether the hash of the block
+            # is still the same (see StructBase.get_hash)
+            if dependencies is not None:
+                dependencies.append((self, hsh))
+            return hsh
 
         def read(self, stream, data):
             self.set_value(None)  # fix_links will set this field
-            block_index, = struct.unpack(data._byte_order + 'i',
-                                         stream.read(4))
+            block_index, = _unpack(stream, data._byte_order + 'i', 4)
             data._link_stack.append(block_index)
 
         def write(self, stream, data):
@@ -592,6 +616,24 @@ class NifFormat(FileFormat):
             if self.get_value() is not None:
                 self.get_value().replace_global_node(oldbranch, newbranch)
 
+        def replace_global_nodes(self, replacements,
+                                 edge_filter=EdgeFilter()):
+            """Replace the block, if it is in C{replacements}. Unlike
+            L{replace_global_node}, this does not recurse into the block.
+
+            >>> from pyffi.formats.nif import NifFormat
+            >>> x = NifFormat.NiNode()
+            >>> y = NifFormat.NiNode()
+            >>> z = NifFormat.NiNode()
+            >>> x.add_child(y)
+            >>> x.replace_global_nodes({y: z})
+            >>> x.children[0] is z
+            True
+            """
+            value = self.get_value()
+            if value is not None and value in replacements:
+                self.set_value(replacements[value])
+
         def get_detail_display(self):
             # return the node itself, if it is not None
             if self.get_value() is not None:
@@ -601,6 +643,7 @@ class NifFormat(FileFormat):
 
     class Ptr(Ref):
         """A weak reference to another block, used to point up the hierarchy tree. The reference is not returned by the L{get_refs} function to avoid infinite recursion."""
+        __slots__ = ()
         _is_template = True
         _has_links = True
         _has_refs = False
@@ -621,6 +664,7 @@ class NifFormat(FileFormat):
                                        )
                                     )
                 self._value = weakref.ref(value)
+            self._changed()
 
         def __str__(self):
             # avoid infinite recursion
@@ -638,6 +682,12 @@ class NifFormat(FileFormat):
                 self.set_value(newbranch)
                 # print("replacing", repr(oldbranch), "->", repr(newbranch))
 
+        def replace_global_nodes(self, replacements,
+                                 edge_filter=EdgeFilter()):
+            value = self.get_value()
+            if value is not None and value in replacements:
+                self.set_value(replacements[value])
+
     class LineString(BasicBase):
         """Basic type for strings ending in a newline character (0x0a).
 
@@ -662,6 +712,9 @@ class NifFormat(FileFormat):
         >>> str(m)
         'Hi There'
         """
+
+        __slots__ = ()
+
         def __init__(self, **kwargs):
             BasicBase.__init__(self, **kwargs)
             self.set_value('')
@@ -671,6 +724,7 @@ class NifFormat(FileFormat):
 
         def set_value(self, value):
             self._value = pyffi.object_models.common._as_bytes(value).rstrip('\x0a'.encode("ascii"))
+            self._changed()
 
         def __str__(self):
             return pyffi.object_models.common._as_str(self._value)
@@ -689,6 +743,8 @@ class NifFormat(FileFormat):
             stream.write("\x0a".encode("ascii"))
 
     class HeaderString(BasicBase):
+        __slots__ = ()
+
         def __str__(self):
             return 'NetImmerse/Gamebryo File Format, Version x.x.x.x'
 
@@ -772,6 +828,8 @@ class NifFormat(FileFormat):
                 return "%s File Format, Version %s" % (s, v)
 
     class FileVersion(pyffi.object_models.common.UInt):
+        __slots__ = ()
+
         def set_value(self):
             raise NotImplementedError("file version is specified via data")
 
@@ -837,6 +895,9 @@ class NifFormat(FileFormat):
 
     class ShortString(BasicBase):
         """Another type for strings."""
+
+        __slots__ = ()
+
         def __init__(self, **kwargs):
             BasicBase.__init__(self, **kwargs)
             self._value = ''.encode("ascii")
@@ -849,6 +910,7 @@ class NifFormat(FileFormat):
             if len(val) > 254:
                 raise ValueError('string too long')
             self._value = val
+            self._changed()
 
         def __str__(self):
             return pyffi.object_models.common._as_str(self._value)
@@ -861,8 +923,7 @@ class NifFormat(FileFormat):
             return self.get_value()
 
         def read(self, stream, data):
-            n, = struct.unpack(data._byte_order + 'B',
-                               stream.read(1))
+            n, = _unpack(stream, data._byte_order + 'B', 1)
             self._value = stream.read(n).rstrip('\x00'.encode("ascii"))
 
         def write(self, stream, data):
@@ -874,6 +935,7 @@ class NifFormat(FileFormat):
             stream.write('\x00'.encode("ascii"))
 
     class string(SizedString):
+        __slots__ = ()
         _has_strings = True
 
         def get_size(self, data=None):
@@ -884,7 +946,7 @@ class NifFormat(FileFormat):
                 return 4 + len(self._value)
 
         def read(self, stream, data):
-            n, = struct.unpack(data._byte_order + 'i', stream.read(4))
+            n, = _unpack(stream, data._byte_order + 'i', 4)
             if data.version >= 0x14010003:
                 if n == -1:
                     self._value = ''.encode("ascii")
@@ -913,7 +975,7 @@ class NifFormat(FileFormat):
                     try:
                         stream.write(struct.pack(
                             data._byte_order + 'i',
-                            data._string_list.index(self._value)))
+                            data._get_string_index(self._value)))
                     except ValueError:
                         raise ValueError("string '%s' not in string list"
                                          % self._value
@@ -936,33 +998,74 @@ class NifFormat(FileFormat):
 
     class FilePath(string):
         """A file path."""
+
+        __slots__ = ()
+
         def get_hash(self, data=None):
             """Returns a case insensitive hash value."""
             return self.get_value().lower()
 
     class ByteArray(BasicBase):
         """Array (list) of bytes. Implemented as basic type to speed up reading
-        and also to prevent data to be dumped by __str__."""
+        and also to prevent data to be dumped by __str__.
+
+        When read from a L{BufferReader} which does not copy payloads,
+        the bytes are kept as a view on its buffer, and only copied when
+        L{get_value} is called. Use L{get_buffer} to access them without
+        copying.
+
+        >>> from pyffi.utils import BufferReader
+        >>> data = NifFormat.Data()
+        >>> reader = BufferReader(b'\\x03\\x00\\x00\\x00abc',
+        ...                       copy_payloads=False)
+        >>> bytearr = NifFormat.ByteArray()
+        >>> bytearr.read(reader, data)
+        >>> bytearr.get_buffer().obj is reader.buffer.obj
+        True
+        >>> bytearr.get_value()
+        b'abc'
+        """
+
+        __slots__ = ()
+
         def __init__(self, **kwargs):
             BasicBase.__init__(self, **kwargs)
             self.set_value("".encode())  # b'' for > py25
 
+        def __getstate__(self):
+            # views cannot be pickled
+            return None, {"_value": self.get_value()}
+
         def get_value(self):
+            if not isinstance(self._value, bytes):
+                self._value = bytes(self._value)
             return self._value
 
+        def get_buffer(self):
+            """Return the bytes as a read only buffer, without copying
+            them.
+
+            :return: The bytes.
+            :rtype: ``memoryview``
+            """
+            return memoryview(self._value).toreadonly()
+
         def set_value(self, value):
-            self._value = pyffi.object_models.common._as_bytes(value)
+            if isinstance(value, (memoryview, bytearray)):
+                self._value = memoryview(value).toreadonly()
+            else:
+                self._value = pyffi.object_models.common._as_bytes(value)
+            self._changed()
 
         def get_size(self, data=None):
             return len(self._value) + 4
 
         def get_hash(self, data=None):
-            return self._value.__hash__()
+            return self.get_value().__hash__()
 
         def read(self, stream, data):
-            size, = struct.unpack(data._byte_order + 'I',
-                                  stream.read(4))
-            self._value = stream.read(size)
+            size, = _unpack(stream, data._byte_order + 'I', 4)
+            self._value = _read_bytes(stream, size)
 
         def write(self, stream, data):
             stream.write(struct.pack(data._byte_order + 'I',
@@ -974,56 +1077,75 @@ class NifFormat(FileFormat):
 
     class ByteMatrix(BasicBase):
         """Matrix of bytes. Implemented as basic type to speed up reading
-        and to prevent data being dumped by __str__."""
+        and to prevent data being dumped by __str__.
+
+        The rows are stored one after the other in a single buffer,
+        which is a view on the buffer of a L{BufferReader} if read from
+        one which does not copy payloads. L{get_value} returns the list of rows, and L{get_buffer}
+        the rows as they are stored, without copying them.
+
+        >>> bytemat = NifFormat.ByteMatrix()
+        >>> bytemat.set_value([b'ab', b'cd', b'ef'])
+        >>> bytemat.get_buffer().tobytes()
+        b'abcdef'
+        >>> bytemat.get_value()
+        [b'ab', b'cd', b'ef']
+        >>> print(bytemat)
+        < 3x2 Bytes >
+        """
+
+        __slots__ = ("_shape",)
+
         def __init__(self, **kwargs):
             BasicBase.__init__(self, **kwargs)
             self.set_value([])
 
+        def __getstate__(self):
+            # views cannot be pickled
+            return None, {"_value": bytes(self._value),
+                          "_shape": self._shape}
+
         def get_value(self):
-            return self._value
+            size1, size2 = self._shape
+            view = self.get_buffer()
+            return [view[i * size1:(i + 1) * size1].tobytes()
+                    for i in range(size2)]
+
+        def get_buffer(self):
+            """Return all rows, one after the other, as a read only
+            buffer, without copying them.
+
+            :return: The bytes.
+            :rtype: ``memoryview``
+            """
+            return memoryview(self._value).toreadonly()
 
         def set_value(self, value):
             assert(isinstance(value, list))
-            if value:
-                size1 = len(value[0])
+            size1 = len(value[0]) if value else 0
             for x in value:
-                # TODO: fix this for py3k
-                # assert(isinstance(x, basestring))
                 assert(len(x) == size1)
-            self._value = value  # should be a list of strings of bytes
+            self._value = b"".join(value)
+            self._shape = (size1, len(value))
+            self._changed()
 
         def get_size(self, data=None):
-            if len(self._value) == 0:
-                return 8
-            else:
-                return len(self._value) * len(self._value[0]) + 8
+            return len(self._value) + 8
 
         def get_hash(self, data=None):
-            return tuple(x.__hash__() for x in self._value)
+            return (self._shape, self.get_buffer().__hash__())
 
         def read(self, stream, data):
-            size1, = struct.unpack(data._byte_order + 'I',
-                                   stream.read(4))
-            size2, = struct.unpack(data._byte_order + 'I',
-                                   stream.read(4))
-            self._value = []
-            for i in range(size2):
-                self._value.append(stream.read(size1))
+            size1, size2 = _unpack(stream, data._byte_order + 'II', 8)
+            self._value = _read_bytes(stream, size1 * size2)
+            self._shape = (size1, size2)
 
         def write(self, stream, data):
-            if self._value:
-                stream.write(struct.pack(data._byte_order + 'I',
-                                         len(self._value[0])))
-            else:
-                stream.write(struct.pack(data._byte_order + 'I', 0))
-            stream.write(struct.pack(data._byte_order + 'I',
-                                     len(self._value)))
-            for x in self._value:
-                stream.write(x)
+            stream.write(struct.pack(data._byte_order + 'II', *self._shape))
+            stream.write(self._value)
 
         def __str__(self):
-            size1 = len(self._value[0]) if self._value else 0
-            size2 = len(self._value)
+            size1, size2 = self._shape
             return "< %ix%i Bytes >" % (size2, size1)
 
     @staticmethod
@@ -1096,12 +1218,20 @@ class NifFormat(FileFormat):
         _link_stack = None
         _block_dct = None
         _string_list = None
+        _string_index_dct = None
         _block_index_dct = None
+        _lazy_buffer = None
+        _lazy_blocks = None
+        _lazy_string_list = None
+        _block_type_index = None
 
         class VersionUInt(pyffi.object_models.common.UInt):
+            __slots__ = ()
+
             def set_value(self, value):
                 if value is None:
                     self._value = None
+                    self._changed()
                 else:
                     pyffi.object_models.common.UInt.set_value(self, value)
 
@@ -1114,6 +1244,58 @@ class NifFormat(FileFormat):
             def get_detail_display(self):
                 return self.__str__()
 
+        class Catalog(object):
+            """Lightweight description of a nif file, as returned by
+            L{NifFormat.Data.inspect_catalog}."""
+
+            __slots__ = ("version", "user_version", "user_version_2",
+                         "block_types", "strings", "block_sizes")
+
+            def __init__(self, version, user_version, user_version_2,
+                         block_types=None, strings=None, block_sizes=None):
+                self.version = version
+                """The version, as an integer."""
+                self.user_version = user_version
+                """The user version."""
+                self.user_version_2 = user_version_2
+                """The second user version."""
+                self.block_types = block_types
+                """Dictionary mapping block type names to the number of
+                blocks of that type, or ``None`` if the header does not
+                store block types (versions before 5.0.0.1)."""
+                self.strings = strings if strings is not None else []
+                """List of strings in the header (versions 20.1.0.3 and
+                up), as ``bytes``. Texture paths show up here."""
+                self.block_sizes = block_sizes
+                """List of block sizes, or ``None`` if the header does
+                not store them (versions before 20.2.0.7)."""
+
+            def has_block_type(self, block_type):
+                """Check if the file has a block of the given type, or
+                of a subclass of it. See
+                L{NifFormat.Header.has_block_type}.
+
+                :raise ``ValueError``: If the header stores no block types.
+                :param block_type: The block type.
+                :type block_type: L{NifFormat.NiObject}
+                :rtype: ``bool``
+                """
+                if self.block_types is None:
+                    raise ValueError("header does not store any block types")
+                return any(
+                    issubclass(getattr(NifFormat, name), block_type)
+                    for name in self.block_types)
+
+            def __repr__(self):
+                if self.block_types is None:
+                    blocks = "unknown blocks"
+                else:
+                    blocks = "%i blocks of %i types" % (
+                        sum(self.block_types.values()), len(self.block_types))
+                return "<%s version 0x%08X user version %i, %s, %i strings>" % (
+                    self.__class__.__name__, self.version, self.user_version,
+                    blocks, len(self.strings))
+
         def __init__(self, version=0x04000002, user_version=0, user_version_2=0):
             """Initialize nif data. By default, this creates an empty
             nif document of the given version and user version.
@@ -1263,6 +1445,99 @@ class NifFormat(FileFormat):
                 else:
                     root.replace_global_node(oldbranch, newbranch, edge_filter=edge_filter)
 
+        def replace_global_nodes(self, replacements,
+                                 edge_filter=EdgeFilter()):
+            """Replace several branches at once, in a single walk over
+            the tree. This has the same result as calling
+            L{replace_global_node} for each replacement in turn,
+            provided that no new branch is replaced itself.
+
+            >>> data = NifFormat.Data()
+            >>> root = NifFormat.NiNode()
+            >>> prop1 = NifFormat.NiAlphaProperty()
+            >>> prop2 = NifFormat.NiAlphaProperty()
+            >>> root.add_property(prop1)
+            >>> root.add_property(prop2)
+            >>> data.roots = [root]
+            >>> data.replace_global_nodes({prop2: prop1})
+            >>> [prop is prop1 for prop in root.properties]
+            [True, True]
+
+            :param replacements: Dictionary mapping old branches to new
+                branches.
+            :type replacements: ``dict``
+            """
+            for i, root in enumerate(self.roots):
+                if root in replacements:
+                    self.roots[i] = replacements[root]
+            visited = set()
+            for root in self.roots:
+                # (the tree follows the references of each block after
+                # they have been replaced)
+                for block in root.tree(unique=True):
+                    if block not in visited:
+                        visited.add(block)
+                        block.replace_global_nodes(
+                            replacements, edge_filter=edge_filter)
+
+        def blocks_by_type(self, block_type):
+            """Return all blocks of the given type, or of a subclass of
+            it, in the tree at L{roots}. Every block is listed once, in
+            the order of L{NifFormat.NiObject.tree}. The blocks are
+            indexed on first call, and the index is kept until
+            L{roots} changes, any reference is set, or any array of
+            references changes (that is, until blocks are added,
+            replaced, or removed).
+
+            >>> data = NifFormat.Data()
+            >>> root = NifFormat.NiNode()
+            >>> node = NifFormat.NiNode()
+            >>> shape = NifFormat.NiTriShape()
+            >>> root.add_child(node)
+            >>> root.add_child(shape)
+            >>> node.add_child(shape)
+            >>> data.roots = [root]
+            >>> data.blocks_by_type(NifFormat.NiAVObject) == [root, node, shape]
+            True
+            >>> other = NifFormat.NiTriStrips()
+            >>> node.add_child(other)
+            >>> data.blocks_by_type(NifFormat.NiGeometry) == [shape, other]
+            True
+            >>> node.remove_child(other)
+            >>> data.blocks_by_type(NifFormat.NiGeometry) == [shape]
+            True
+            >>> node.set_children([])
+            >>> root.remove_child(shape)
+            >>> data.blocks_by_type(NifFormat.NiAVObject) == [root, node]
+            True
+
+            :param block_type: The block type.
+            :type block_type: L{NifFormat.NiObject}
+            :return: The blocks.
+            :rtype: ``list`` of L{NifFormat.NiObject}
+            """
+            roots = tuple(self.roots)
+            index = self._block_type_index
+            if (index is None or index[0] != BasicBase._link_generation
+                    or index[1] != roots):
+                blocks = []
+                visited = set()
+                for root in roots:
+                    for block in root.tree(unique=True):
+                        if block not in visited:
+                            visited.add(block)
+                            blocks.append(block)
+                # (reading lazy blocks sets references too, so take the
+                # generation after the walk)
+                index = (BasicBase._link_generation, roots, blocks, {})
+                self._block_type_index = index
+            blocks_of_type = index[3].get(block_type)
+            if blocks_of_type is None:
+                blocks_of_type = [block for block in index[2]
+                                  if isinstance(block, block_type)]
+                index[3][block_type] = blocks_of_type
+            return list(blocks_of_type)
+
         def get_detail_child_nodes(self, edge_filter=EdgeFilter()):
             yield self._version_value_
             yield self._user_version_value_
@@ -1284,7 +1559,7 @@ class NifFormat(FileFormat):
             Call this function if you only need to inspect the header of the nif.
 
             :param stream: The file to inspect.
-            :type stream: ``file``
+            :type stream: ``file`` or L{pyffi.utils.BufferReader}
             """
             pos = stream.tell()
             try:
@@ -1293,11 +1568,121 @@ class NifFormat(FileFormat):
             finally:
                 stream.seek(pos)
 
-        def read(self, stream):
+        def inspect_catalog(self, stream):
+            """Read the nif header, and describe the file from the
+            header alone: version, block type histogram, strings, and
+            block sizes. No blocks are created or read. Resets stream
+            to original position.
+
+            >>> from io import BytesIO
+            >>> data = NifFormat.Data(version=0x14020007, user_version=12)
+            >>> data.roots = [NifFormat.NiNode()]
+            >>> data.roots[0].name = "Scene Root"
+            >>> data.roots[0].add_child(NifFormat.NiTriShape())
+            >>> data.roots[0].add_child(NifFormat.NiTriShape())
+            >>> stream = BytesIO()
+            >>> data.write(stream)
+            >>> _ = stream.seek(0)
+            >>> catalog = NifFormat.Data().inspect_catalog(stream)
+            >>> hex(catalog.version), catalog.user_version
+            ('0x14020007', 12)
+            >>> sorted(catalog.block_types.items())
+            [('NiNode', 1), ('NiTriShape', 2)]
+            >>> catalog.strings
+            [b'Scene Root']
+            >>> catalog.has_block_type(NifFormat.NiGeometry)
+            True
+            >>> len(catalog.block_sizes)
+            3
+
+            :param stream: The file to inspect.
+            :type stream: ``file`` or L{pyffi.utils.BufferReader}
+            :return: The description of the file.
+            :rtype: L{NifFormat.Data.Catalog}
+            """
+            self.inspect(stream)
+            header = self.header
+            block_types = None
+            if header.num_block_types:
+                names = []
+                for name in header.block_types:
+                    name = name.decode("ascii")
+                    # NiDataStreams are special
+                    if name.startswith("NiDataStream\x01"):
+                        name = "NiDataStream"
+                    names.append(name)
+                block_types = {}
+                # note the 0xfff mask: required for the NiPhysX blocks
+                for index in header.block_type_index:
+                    name = names[index & 0xfff]
+                    block_types[name] = block_types.get(name, 0) + 1
+            block_sizes = None
+            if self.version >= 0x14020007:
+                block_sizes = list(header.block_size)
+            return self.Catalog(
+                self.version, self.user_version, self.user_version_2,
+                block_types=block_types,
+                strings=list(header.strings),
+                block_sizes=block_sizes)
+
+        def read(self, stream, lazy=False, executor=None):
             """Read a nif file. Does not reset stream position.
 
+            For nif files of version 20.2.0.7 and up, the size of every
+            block is stored in the header, so blocks can be read
+            lazily: all blocks are created, but a block is only read
+            when any of its attributes is first accessed (for instance
+            through L{roots}, L{blocks}, or a reference from another
+            block). Blocks that are never used, are never read. For
+            earlier versions, the C{lazy} flag is ignored.
+
+            To read from a memory mapped file (or any other buffer)
+            without creating intermediate objects, wrap the ``mmap`` in
+            a L{pyffi.utils.BufferReader}:
+
+            >>> from io import BytesIO
+            >>> from pyffi.utils import BufferReader
+            >>> data = NifFormat.Data(version=0x14020007, user_version=11)
+            >>> data.roots = [NifFormat.NiNode()]
+            >>> data.roots[0].name = "Scene Root"
+            >>> stream = BytesIO()
+            >>> data.write(stream)
+            >>> data = NifFormat.Data()
+            >>> data.read(BufferReader(stream.getvalue()))
+            >>> print(data.roots[0].name.decode())
+            Scene Root
+
+            Payloads, such as byte arrays, are copied out of the buffer,
+            so it can be closed as soon as this method returns. With
+            C{BufferReader(buffer, copy_payloads=False)} they are kept
+            as views on the buffer instead, which then must stay open
+            for as long as the data lives.
+
+            For these versions, blocks can also be decoded in parallel,
+            by passing an C{executor} from L{concurrent.futures}. The
+            blocks are split in chunks of consecutive blocks, which are
+            decoded independently, and the links between blocks are
+            fixed once all chunks are done. With a
+            ``ProcessPoolExecutor``, decoded blocks are pickled back,
+            so this pays off for files with many or large blocks only.
+            The C{executor} is ignored for earlier versions, and if
+            C{lazy} is set.
+
+            >>> import concurrent.futures
+            >>> stream.seek(0)
+            0
+            >>> data = NifFormat.Data()
+            >>> with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            ...     data.read(stream, executor=executor)
+            >>> print(data.roots[0].name.decode())
+            Scene Root
+
             :param stream: The stream from which to read.
-            :type stream: ``file``
+            :type stream: ``file`` or L{pyffi.utils.BufferReader}
+            :param lazy: Whether to read blocks only when needed.
+            :type lazy: ``bool``
+            :param executor: Executor for decoding blocks in parallel.
+            :type executor: ``concurrent.futures.Executor``
             """
             logger = logging.getLogger("pyffi.nif.data")
             # read header
@@ -1318,6 +1703,47 @@ class NifFormat(FileFormat):
             self._string_list = [s for s in self.header.strings]
             self._block_dct = {}  # maps block index to actual block
             self.blocks = []  # records all blocks as read from file in order
+            self._lazy_buffer = None
+            self._lazy_blocks = None
+            self._lazy_string_list = None
+            lazy = lazy and self.version >= 0x14020007
+            if lazy:
+                self._read_blocks_lazy(stream)
+            elif executor is not None and self.version >= 0x14020007:
+                self._read_blocks_parallel(stream, executor)
+            else:
+                self._read_blocks(stream)
+
+            # read footer
+            ftr = NifFormat.Footer()
+            ftr.read(stream, self)
+
+            # check if we are at the end of the file
+            if stream.read(1):
+                logger.error(
+                    'End of file not reached: corrupt nif file?')
+
+            # fix links in blocks and footer (header has no links)
+            # (lazily read blocks fix their links when they are read)
+            if not lazy:
+                for block in self.blocks:
+                    block.fix_links(self)
+            ftr.fix_links(self)
+            # the link stack should be empty now
+            if self._link_stack:
+                raise NifFormat.NifError('not all links have been popped from the stack (bug?)')
+            # add root objects in footer to roots list
+            if self.version >= 0x0303000D:
+                for root in ftr.roots:
+                    self.roots.append(root)
+
+        def _read_blocks(self, stream):
+            """Read all blocks, following the header.
+
+            :param stream: The stream from which to read.
+            :type stream: ``file``
+            """
+            logger = logging.getLogger("pyffi.nif.data")
             block_num = 0  # the current block numner
 
             while True:
@@ -1436,32 +1862,163 @@ class NifFormat(FileFormat):
                     if block_num >= self.header.num_blocks:
                         break
 
-            # read footer
-            ftr = NifFormat.Footer()
-            ftr.read(stream, self)
+        def _get_block_spans(self):
+            """Return the type name, data stream usage and access (or
+            ``None``), and size of every block, as stored in the
+            header. Requires version 20.2.0.7 or up."""
+            spans = []
+            for block_num in range(self.header.num_blocks):
+                # note the 0xfff mask: required for the NiPhysX blocks
+                block_type = self.header.block_types[
+                    self.header.block_type_index[block_num] & 0xfff]
+                block_type = block_type.decode("ascii")
+                # handle data stream classes
+                data_stream = None
+                if block_type.startswith("NiDataStream\x01"):
+                    block_type, data_stream_usage, data_stream_access = block_type.split("\x01")
+                    data_stream = (int(data_stream_usage),
+                                   int(data_stream_access))
+                if not hasattr(NifFormat, block_type):
+                    raise ValueError("Unknown block type '%s'."
+                                     % block_type
+                                     )
+                spans.append((block_type, data_stream,
+                              self.header.block_size[block_num]))
+            return spans
 
-            # check if we are at the end of the file
-            if stream.read(1):
-                logger.error(
-                    'End of file not reached: corrupt nif file?')
+        # minimal size of chunks of blocks that are decoded in parallel
+        _PARALLEL_CHUNK_SIZE = 0x10000
 
-            # fix links in blocks and footer (header has no links)
-            for block in self.blocks:
+        # maximal number of chunks of blocks that are decoded in parallel
+        _PARALLEL_MAX_CHUNKS = 256
+
+        def _read_blocks_parallel(self, stream, executor):
+            """Read all blocks, following the header, by decoding chunks
+            of consecutive blocks with the given executor, see
+            L{_read_block_chunk}. Links are fixed afterwards, by
+            L{read}. Requires version 20.2.0.7 or up.
+
+            :param stream: The stream from which to read.
+            :type stream: ``file``
+            :param executor: The executor.
+            :type executor: ``concurrent.futures.Executor``
+            """
+            spans = self._get_block_spans()
+            total_size = sum(size for block_type, data_stream, size in spans)
+            buf = stream.read(total_size)
+            if len(buf) != total_size:
+                raise NifFormat.NifError(
+                    'unexpected end of file: corrupt nif file?')
+            buf = memoryview(buf)
+            chunk_size = max(total_size // self._PARALLEL_MAX_CHUNKS,
+                             self._PARALLEL_CHUNK_SIZE)
+            string_list = list(self._string_list)
+            futures = []
+            start = 0
+            offset = 0
+            while start < len(spans):
+                # gather blocks until the chunk is large enough
+                stop = start
+                size = 0
+                while stop < len(spans) and size < chunk_size:
+                    size += spans[stop][2]
+                    stop += 1
+                futures.append(executor.submit(
+                    _read_block_chunk,
+                    (self.version, self.user_version, self.user_version_2,
+                     self._byte_order, string_list, spans[start:stop],
+                     bytes(buf[offset:offset + size]))))
+                start = stop
+                offset += size
+            # merge the chunks in order, so links are popped in the
+            # same order as they were pushed by a sequential read
+            for future in futures:
+                blocks, link_stack = future.result()
+                for block in blocks:
+                    self._block_dct[len(self.blocks)] = block
+                    self.blocks.append(block)
+                self._link_stack.extend(link_stack)
+
+        def _read_blocks_lazy(self, stream):
+            """Create all blocks, following the header, without reading
+            them. The raw data of the blocks is kept, and a block is
+            read from it on first access of any of its attributes, see
+            L{_read_lazy_block}. Requires version 20.2.0.7 or up.
+
+            :param stream: The stream from which to read.
+            :type stream: ``file``
+            """
+            self._lazy_blocks = []
+            self._lazy_string_list = self._string_list
+            offset = 0
+            for block_num, (block_type, data_stream, size) in enumerate(
+                    self._get_block_spans()):
+                # create the block, without initializing it
+                block_class = getattr(NifFormat, block_type)
+                block = block_class.__new__(block_class)
+                block._lazy_read = (self, block_num)
+                self._lazy_blocks.append((offset, size, data_stream))
+                offset += size
+                self._block_dct[block_num] = block
+                self.blocks.append(block)
+            # keep the data of all blocks, so the stream need not
+            # remain open
+            self._lazy_buffer = stream.read(offset)
+            if len(self._lazy_buffer) != offset:
+                raise NifFormat.NifError(
+                    'unexpected end of file: corrupt nif file?')
+
+        def _read_lazy_block(self, block, block_num):
+            """Read a block that was skipped by a lazy L{read}.
+
+            :param block: The block, as created by L{_read_blocks_lazy}.
+            :type block: L{NifFormat.NiObject}
+            :param block_num: The index of the block in the file.
+            :type block_num: ``int``
+            """
+            logger = logging.getLogger("pyffi.nif.data")
+            offset, size, data_stream = self._lazy_blocks[block_num]
+            # every block reads from its own stream, so blocks that are
+            # read while reading this one do not interfere
+            stream = BufferReader(
+                memoryview(self._lazy_buffer)[offset:offset + size],
+                copy_payloads=False)
+            block.__init__()
+            # the string list is rebuilt on write, and links of this
+            # block only must be popped, so restore both while reading
+            string_list = self._string_list
+            link_stack = self._link_stack
+            self._string_list = self._lazy_string_list
+            self._link_stack = []
+            try:
+                logger.debug("Reading %s block at 0x%08X"
+                             % (block.__class__.__name__, offset))
+                block.read(stream, self)
+                # complete NiDataStream data
+                if data_stream:
+                    block.usage = data_stream[0]
+                    block.access.from_int(data_stream[1], self)
+                # check block size
+                if stream.tell() != size:
+                    logger.error("Block size check failed: corrupt nif file or bad nif.xml?")
+                    logger.error("Skipping %i bytes in %s"
+                                 % (size - stream.tell(),
+                                    block.__class__.__name__))
                 block.fix_links(self)
-            ftr.fix_links(self)
-            # the link stack should be empty now
-            if self._link_stack:
-                raise NifFormat.NifError('not all links have been popped from the stack (bug?)')
-            # add root objects in footer to roots list
-            if self.version >= 0x0303000D:
-                for root in ftr.roots:
-                    self.roots.append(root)
+            finally:
+                self._string_list = string_list
+                self._link_stack = link_stack
 
         def write(self, stream):
             """Write a nif file. The L{header} and the L{blocks} are recalculated
             from the tree at L{roots} (e.g. list of block types, number of blocks,
             list of block types, list of strings, list of block sizes etc.).
 
+            All blocks are serialized in a single pass into a buffer, which
+            also collects the strings and gives the block sizes. The
+            header, which needs these, is written in front of it, and the
+            result goes to the stream in one go.
+
             :param stream: The stream to which to write.
             :type stream: file
             """
@@ -1471,16 +2028,10 @@ class NifFormat(FileFormat):
             self._block_index_dct = {}  # maps block to block index
             block_type_list = []  # list of all block type strings
             block_type_dct = {}  # maps block to block type string index
-            self._string_list = []
             for root in self.roots:
                 self._makeBlockList(root,
                                     self._block_index_dct,
                                     block_type_list, block_type_dct)
-                for block in root.tree():
-                    self._string_list.extend(
-                        block.get_strings(self))
-            self._string_list = list(set(self._string_list))  # ensure unique elements
-            # print(self._string_list)  # debug
 
             self.header.user_version = self.user_version  # TODO: dedicated type for user_version similar to FileVersion
             # for oblivion CS; apparently this is the version of the bhk blocks
@@ -1493,6 +2044,54 @@ class NifFormat(FileFormat):
             self.header.block_type_index.update_size()
             for i, block in enumerate(self.blocks):
                 self.header.block_type_index[i] = block_type_dct[block]
+
+            # set up footer
+            ftr = NifFormat.Footer()
+            ftr.num_roots = len(self.roots)
+            ftr.roots.update_size()
+            for i, root in enumerate(self.roots):
+                ftr.roots[i] = root
+
+            # write the blocks, collecting the strings on the way
+            # (see string.write)
+            self._string_list = []
+            self._string_index_dct = {}
+            block_sizes = []
+            buf = io.BytesIO()
+            try:
+                for block in self.blocks:
+                    # signal top level object if block is a root object
+                    if self.version < 0x0303000D and block in self.roots:
+                        s = NifFormat.SizedString()
+                        s.set_value("Top Level Object")
+                        s.write(buf, self)
+                    if self.version >= 0x05000001:
+                        if self.version <= 0x0A01006A:
+                            # write zero dummy separator
+                            buf.write('\x00\x00\x00\x00'.encode("ascii"))
+                    else:
+                        # write block type string
+                        s = NifFormat.SizedString()
+                        assert(block_type_list[block_type_dct[block]] == block.__class__.__name__)  # debug
+                        s.set_value(block.__class__.__name__)
+                        s.write(buf, self)
+                    # write block index
+                    logger.debug("Writing %s block" % block.__class__.__name__)
+                    if self.version < 0x0303000D:
+                        buf.write(struct.pack(self._byte_order + 'i',
+                                              self._block_index_dct[block]))
+                    # write block
+                    start = buf.tell()
+                    block.write(buf, self)
+                    block_sizes.append(buf.tell() - start)
+                if self.version < 0x0303000D:
+                    s = NifFormat.SizedString()
+                    s.set_value("End Of File")
+                    s.write(buf, self)
+                ftr.write(buf, self)
+            finally:
+                self._string_index_dct = None
+
             self.header.num_strings = len(self._string_list)
             if self._string_list:
                 self.header.max_string_length = max([len(s) for s in self._string_list])
@@ -1502,50 +2101,33 @@ class NifFormat(FileFormat):
             for i, s in enumerate(self._string_list):
                 self.header.strings[i] = s
             self.header.block_size.update_size()
-            for i, block in enumerate(self.blocks):
-                self.header.block_size[i] = block.get_size(data=self)
+            for i, block_size in enumerate(block_sizes):
+                self.header.block_size[i] = block_size
             # if verbose >= 2:
             #    print(hdr)
 
-            # set up footer
-            ftr = NifFormat.Footer()
-            ftr.num_roots = len(self.roots)
-            ftr.roots.update_size()
-            for i, root in enumerate(self.roots):
-                ftr.roots[i] = root
-
             # write the file
             logger.debug("Writing header")
             # logger.debug("%s" % self.header)
             self.header.write(stream, self)
-            for block in self.blocks:
-                # signal top level object if block is a root object
-                if self.version < 0x0303000D and block in self.roots:
-                    s = NifFormat.SizedString()
-                    s.set_value("Top Level Object")
-                    s.write(stream, self)
-                if self.version >= 0x05000001:
-                    if self.version <= 0x0A01006A:
-                        # write zero dummy separator
-                        stream.write('\x00\x00\x00\x00'.encode("ascii"))
-                else:
-                    # write block type string
-                    s = NifFormat.SizedString()
-                    assert(block_type_list[block_type_dct[block]] == block.__class__.__name__)  # debug
-                    s.set_value(block.__class__.__name__)
-                    s.write(stream, self)
-                # write block index
-                logger.debug("Writing %s block" % block.__class__.__name__)
-                if self.version < 0x0303000D:
-                    stream.write(struct.pack(self._byte_order + 'i',
-                                             self._block_index_dct[block]))
-                # write block
-                block.write(stream, self)
-            if self.version < 0x0303000D:
-                s = NifFormat.SizedString()
-                s.set_value("End Of File")
-                s.write(stream, self)
-            ftr.write(stream, self)
+            stream.write(buf.getbuffer())
+
+        def _get_string_index(self, value):
+            """Return the index of C{value} in the string list. While the
+            blocks are written, strings that are not yet in the list are
+            added to it.
+
+            :raise ``ValueError``: If the string is not in the list.
+            """
+            if self._string_index_dct is None:
+                return self._string_list.index(value)
+            try:
+                return self._string_index_dct[value]
+            except KeyError:
+                index = len(self._string_list)
+                self._string_index_dct[value] = index
+                self._string_list.append(value)
+                return index
 
         def _makeBlockList(self, root, block_index_dct, block_type_list, block_type_dct):
             """This is a helper function for write to set up the list of all blocks,
@@ -1583,7 +2165,7 @@ class NifFormat(FileFormat):
                         )
 
             # block already listed? if so, return
-            if root in self.blocks:
+            if root in block_index_dct:
                 return
             # add block type to block type dictionary
             block_type = root.__class__.__name__
@@ -4543,8 +5125,108 @@ class NifFormat(FileFormat):
         (4000, 5000, 6000, 0, 1000, 0, 0, 0, 0, 0, 310, 320, 330, 340)
         (1200, 3400, 5600, 1000, 0, 0, 97000, 96000, 0, 94000, 0, 0, 0, 0)
         """
+        # the arrays which can be accessed as numpy arrays, along with
+        # the number of components of their elements
+        _array_components = {
+            "vertices": 3,
+            "normals": 3,
+            "tangents": 3,
+            "bitangents": 3,
+            "vertex_colors": 4,
+            "uv_sets": 2,
+        }
+
+        def as_array(self, name):
+            """Return a geometry array as a contiguous float32 numpy array,
+            of shape C{(num_vertices, k)}, or of shape C{(num_uv_sets,
+            num_vertices, 2)} for the uv sets. Elements which were read in
+            bulk are converted straight from the file data, without
+            creating them. Requires numpy.
+
+            :param name: The array: C{"vertices"}, C{"normals"},
+                C{"tangents"}, C{"bitangents"}, C{"vertex_colors"}, or
+                C{"uv_sets"}.
+            :type name: C{str}
+            :return: A copy of the array.
+            :rtype: C{numpy.ndarray}
+            """
+            if numpy is None:
+                raise ImportError("NiGeometryData.as_array requires numpy")
+            num_components = self._array_components[name]
+            array = getattr(self, name)
+            values = numpy.frombuffer(array.get_raw("<"), dtype="<f4")
+            values = values.astype(numpy.float32)
+            if name != "uv_sets":
+                return values.reshape(-1, num_components)
+            num_uv_sets = len(array)
+            return values.reshape(
+                num_uv_sets,
+                values.size // (num_components * num_uv_sets)
+                if num_uv_sets else 0,
+                num_components)
+
+        def set_from_array(self, name, values):
+            """Set a geometry array from a numpy array (or anything that
+            converts into one) with the shape returned by L{as_array}.
+            Setting the vertices sets the number of vertices, all other
+            arrays must have an element for each vertex. The vertices,
+            normals and vertex colors are flagged as present, and the
+            number of uv sets is updated. The data is kept as raw bytes,
+            and elements are only created when they are accessed. Requires
+            numpy.
+
+            :param name: The array, see L{as_array}.
+            :type name: C{str}
+            :param values: The new elements.
+            :type values: C{numpy.ndarray}
+            """
+            if numpy is None:
+                raise ImportError(
+                    "NiGeometryData.set_from_array requires numpy")
+            num_components = self._array_components[name]
+            values = numpy.ascontiguousarray(values, dtype="<f4")
+            ndim = 3 if name == "uv_sets" else 2
+            if values.ndim != ndim or values.shape[-1] != num_components:
+                raise ValueError("cannot set %s from array of shape %s"
+                                 % (name, values.shape))
+            num_vertices = values.shape[-2]
+            if name == "vertices":
+                self.num_vertices = num_vertices
+                self.has_vertices = True
+            elif (num_vertices != self.num_vertices
+                  and (name != "uv_sets" or values.shape[0])):
+                raise ValueError("expected %i %s but got %i"
+                                 % (self.num_vertices, name, num_vertices))
+            if name == "normals":
+                self.has_normals = True
+            elif name == "vertex_colors":
+                self.has_vertex_colors = True
+            elif name == "uv_sets":
+                self.num_uv_sets = values.shape[0]
+            getattr(self, name).set_raw(values.tobytes(), "<")
+
         def update_center_radius(self):
-            """Recalculate center and radius of the data."""
+            """Recalculate center and radius of the data. The result
+            does not depend on whether numpy is available.
+
+            >>> import pyffi.formats.nif
+            >>> data = NifFormat.NiTriShapeData()
+            >>> data.num_vertices = 2
+            >>> data.has_vertices = True
+            >>> data.vertices.update_size()
+            >>> data.vertices[0].x, data.vertices[0].y = 0.1, 0.2
+            >>> data.vertices[1].x, data.vertices[1].z = 3.3, 1.1
+            >>> data.update_center_radius()
+            >>> center, radius = data.center.as_tuple(), data.radius
+            >>> numpy = pyffi.formats.nif.numpy
+            >>> pyffi.formats.nif.numpy = None
+            >>> data.update_center_radius()
+            >>> pyffi.formats.nif.numpy = numpy
+            >>> data.center.as_tuple() == center, data.radius == radius
+            (True, True)
+            >>> print("%.10f" % data.center.x)
+            1.7000000000
+            """
             # in case there are no vertices, set center and radius to zero
             if len(self.vertices) == 0:
                 self.center.x = 0.0
@@ -4553,6 +5235,23 @@ class NifFormat(FileFormat):
                 self.radius = 0.0
                 return
 
+            if numpy is not None:
+                if self.vertices._packed is None:
+                    # vertices which were set since they were read are
+                    # not rounded to single precision yet
+                    verts = numpy.array(
+                        [v.as_tuple() for v in self.vertices],
+                        dtype=numpy.float64)
+                else:
+                    verts = self.as_array("vertices").astype(numpy.float64)
+                center = (verts.min(axis=0) + verts.max(axis=0)) * 0.5
+                self.center.x, self.center.y, self.center.z = center.tolist()
+                delta = center - verts
+                r2 = (delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1]
+                      + delta[:, 2] * delta[:, 2])
+                self.radius = max(0.0, float(r2.max())) ** 0.5
+                return
+
             # find extreme values in x, y, and z direction
             lowx = min([v.x for v in self.vertices])
             lowy = min([v.y for v in self.vertices])
@@ -4582,10 +5281,14 @@ class NifFormat(FileFormat):
             """Apply scale factor on data."""
             if abs(scale - 1.0) < NifFormat.EPSILON:
                 return
-            for v in self.vertices:
-                v.x *= scale
-                v.y *= scale
-                v.z *= scale
+            if numpy is not None and self.has_vertices:
+                verts = self.as_array("vertices").astype(numpy.float64)
+                self.set_from_array("vertices", verts * scale)
+            else:
+                for v in self.vertices:
+                    v.x *= scale
+                    v.y *= scale
+                    v.z *= scale
             self.center.x *= scale
             self.center.y *= scale
             self.center.z *= scale
@@ -4619,7 +5322,52 @@ class NifFormat(FileFormat):
             :type vcolprecision: float
             :return: A generator yielding a hash value for each vertex.
             """
+            if numpy is not None:
+                hashes = self._get_vertex_hash_array(
+                    vertexprecision, normalprecision,
+                    uvprecision, vcolprecision)
+                if hashes is not None:
+                    return map(tuple, hashes.tolist())
+            return self._get_vertex_hash_iter(
+                vertexprecision, normalprecision,
+                uvprecision, vcolprecision)
+
+        def _get_vertex_hash_array(self, vertexprecision, normalprecision,
+                                   uvprecision, vcolprecision):
+            """Calculate the hashes of L{get_vertex_hash_generator} with
+            numpy, as an array with a row for each vertex. Returns ``None``
+            if some value cannot be rounded to an integer in the same way
+            as by L{mathutils.float_to_int}."""
+            def scaled(array, precision):
+                """Scale in double precision, as float_to_int(x * factor)
+                in the pure python version."""
+                return (array[:self.num_vertices].astype(numpy.float64)
+                        * float(10 ** precision))
+
+            columns = [numpy.zeros((self.num_vertices, 0))]
+            if self.has_vertices and len(self.vertices):
+                columns.append(scaled(self.as_array("vertices"),
+                                      vertexprecision))
+            if self.has_normals and len(self.normals):
+                columns.append(scaled(self.as_array("normals"),
+                                      normalprecision))
+            if len(self.uv_sets):
+                columns.extend(scaled(uvset, uvprecision)
+                               for uvset in self.as_array("uv_sets"))
+            if self.has_vertex_colors and len(self.vertex_colors):
+                columns.append(scaled(self.as_array("vertex_colors"),
+                                      vcolprecision))
+            values = numpy.hstack(columns)
+            # uvs sometimes have NaN, and the pure python version
+            # handles those (and other huge values)
+            if not numpy.all(numpy.abs(values) < 2.0 ** 62):
+                return None
+            return numpy.trunc(numpy.where(values > 0, values + 0.5,
+                                           values - 0.5)).astype(numpy.int64)
 
+        def _get_vertex_hash_iter(self, vertexprecision, normalprecision,
+                                  uvprecision, vcolprecision):
+            """Pure python version of L{get_vertex_hash_generator}."""
             verts = self.vertices if self.has_vertices else None
             norms = self.normals if self.has_normals else None
             uvsets = self.uv_sets if len(self.uv_sets) else None
@@ -5831,6 +6579,17 @@ class NifFormat(FileFormat):
             self.add_extra_data(extra)
 
     class NiObject:
+        def __getattr__(self, name):
+            # blocks of a lazily read nif file are read on first access
+            # of any of their attributes (see NifFormat.Data.read)
+            lazy_read = self.__dict__.pop("_lazy_read", None)
+            if lazy_read is None:
+                raise AttributeError("'%s' object has no attribute '%s'"
+                                     % (self.__class__.__name__, name))
+            data, block_num = lazy_read
+            data._read_lazy_block(self, block_num)
+            return getattr(self, name)
+
         def find(self, block_name=None, block_type=None):
             # does this block match the search criteria?
             if block_name and block_type:
@@ -5849,12 +6608,25 @@ class NifFormat(FileFormat):
             elif block_type:
                 if isinstance(self, block_type):
                     return self
+            else:
+                # nothing to search for
+                return None
 
             # ok, this block is not a match, so check further down in tree
-            for child in self.get_refs():
-                blk = child.find(block_name, block_type)
-                if blk:
-                    return blk
+            # (each block once: blocks are found in the same order
+            # as by recursing over all branches)
+            tree = self.tree(unique=True)
+            next(tree)
+            for block in tree:
+                if block_type and not isinstance(block, block_type):
+                    continue
+                if block_name:
+                    try:
+                        if block_name != block.name:
+                            continue
+                    except AttributeError:
+                        continue
+                return block
 
             return None
 
@@ -5893,16 +6665,21 @@ class NifFormat(FileFormat):
             :param follow_all: If C{block_type} is not ``None``, then if this is ``True`` the function will parse the whole tree. Otherwise, the function will not follow branches that start by a non-C{block_type} block.
 
             :param unique: Whether the generator can return the same block twice or not."""
-            # unique blocks: reduce this to the case of non-unique blocks
+            # unique blocks: walk the tree depth first, but skip branches
+            # that were walked already, as they cannot yield new blocks
             if unique:
-                block_list = []
-                for block in self.tree(block_type=block_type,
-                                       follow_all=follow_all,
-                                       unique=False
-                                       ):
-                    if block not in block_list:
+                visited = set()
+                stack = [self]
+                while stack:
+                    block = stack.pop()
+                    if block in visited:
+                        continue
+                    visited.add(block)
+                    if not block_type or isinstance(block, block_type):
                         yield block
-                        block_list.append(block)
+                    elif not follow_all:
+                        continue  # don't recurse further
+                    stack.extend(reversed(block.get_refs()))
                 return
 
             # yield self
@@ -5927,11 +6704,14 @@ class NifFormat(FileFormat):
             # will visit some child more than once (and as a consequence, infinitely
             # many times). So, walk the reference tree and check that every block is
             # only visited once.
-            children = []
-            for child in self.tree():
+            children = set()
+            stack = [self]
+            while stack:
+                child = stack.pop()
                 if child in children:
                     raise ValueError('cyclic references detected')
-                children.append(child)
+                children.add(child)
+                stack.extend(child.get_refs())
 
         def is_interchangeable(self, other):
             """Are the two blocks interchangeable?
@@ -5947,6 +6727,19 @@ class NifFormat(FileFormat):
                 # for blocks with references: quick check only
                 return self is other
 
+        def get_interchangeable_hash(self):
+            """Hash for finding interchangeable blocks: blocks which are
+            interchangeable (see L{is_interchangeable}) have equal hash,
+            so only blocks with equal hash need to be compared.
+
+            :return: The hash, or ``None`` if the block is only
+                interchangeable with itself.
+            """
+            if isinstance(self, (NifFormat.NiProperty, NifFormat.NiSourceTexture)):
+                return (self.__class__, self.get_hash())
+            else:
+                return None
+
     class NiMaterialProperty:
         def is_interchangeable(self, other):
             """Are the two material blocks interchangeable?"""
@@ -5968,17 +6761,22 @@ class NifFormat(FileFormat):
                 # ignore name
                 return self.get_hash()[1:] == other.get_hash()[1:]
 
+        def get_interchangeable_hash(self):
+            # the name is not always compared, so leave it out
+            return (self.__class__, self.get_hash()[1:])
+
     class ATextureRenderData:
         def save_as_dds(self, stream):
-            """Save image as DDS file."""
+            """Save image as DDS file. The pixel data is written straight
+            from the buffer it was read into, without copying it."""
             # set up header and pixel data
             data = pyffi.formats.dds.DdsFormat.Data()
             header = data.header
             pixeldata = data.pixeldata
 
             # create header, depending on the format
-            if self.pixel_format in (NifFormat.PixelFormat.PX_FMT_RGB8,
-                                     NifFormat.PixelFormat.PX_FMT_RGBA8):
+            if self.pixel_format in (NifFormat.PixelFormat.RGB8,
+                                     NifFormat.PixelFormat.RGBA8):
                 # uncompressed RGB(A)
                 header.flags.caps = 1
                 header.flags.height = 1
@@ -6001,25 +6799,20 @@ class NifFormat(FileFormat):
                     bit_pos = 0
                     for i, channel in enumerate(self.channels):
                         mask = (2 ** channel.bits_per_channel - 1) << bit_pos
-                        if channel.type == NifFormat.ChannelType.CHNL_RED:
+                        if channel.type == NifFormat.ChannelType.RED:
                             header.pixel_format.r_mask = mask
-                        elif channel.type == NifFormat.ChannelType.CHNL_GREEN:
+                        elif channel.type == NifFormat.ChannelType.GREEN:
                             header.pixel_format.g_mask = mask
-                        elif channel.type == NifFormat.ChannelType.CHNL_BLUE:
+                        elif channel.type == NifFormat.ChannelType.BLUE:
                             header.pixel_format.b_mask = mask
-                        elif channel.type == NifFormat.ChannelType.CHNL_ALPHA:
+                        elif channel.type == NifFormat.ChannelType.ALPHA:
                             header.pixel_format.a_mask = mask
                         bit_pos += channel.bits_per_channel
                 header.caps_1.complex = 1
                 header.caps_1.texture = 1
                 header.caps_1.mipmap = 1
-                if self.pixel_data:
-                    # used in older nif versions
-                    pixeldata.set_value(self.pixel_data)
-                else:
-                    # used in newer nif versions
-                    pixeldata.set_value(''.join(self.pixel_data_matrix))
-            elif self.pixel_format == NifFormat.PixelFormat.PX_FMT_DXT1:
+                pixeldata.set_value(self.pixel_data.get_buffer())
+            elif self.pixel_format == NifFormat.PixelFormat.DXT1:
                 # format used in Megami Tensei: Imagine and Bully SE
                 header.flags.caps = 1
                 header.flags.height = 1
@@ -6041,16 +6834,9 @@ class NifFormat(FileFormat):
                 header.caps_1.complex = 1
                 header.caps_1.texture = 1
                 header.caps_1.mipmap = 1
-                if isinstance(self,
-                              NifFormat.NiPersistentSrcTextureRendererData):
-                    pixeldata.set_value(
-                        ''.join(
-                            ''.join([chr(x) for x in tex])
-                            for tex in self.pixel_data))
-                else:
-                    pixeldata.set_value(''.join(self.pixel_data_matrix))
-            elif self.pixel_format in (NifFormat.PixelFormat.PX_FMT_DXT5,
-                                       NifFormat.PixelFormat.PX_FMT_DXT5_ALT):
+                pixeldata.set_value(self.pixel_data.get_buffer())
+            elif self.pixel_format in (NifFormat.PixelFormat.DXT5,
+                                       NifFormat.PixelFormat.DXT5_ALT):
                 # format used in Megami Tensei: Imagine
                 header.flags.caps = 1
                 header.flags.height = 1
@@ -6072,7 +6858,7 @@ class NifFormat(FileFormat):
                 header.caps_1.complex = 1
                 header.caps_1.texture = 1
                 header.caps_1.mipmap = 1
-                pixeldata.set_value(''.join(self.pixel_data_matrix))
+                pixeldata.set_value(self.pixel_data.get_buffer())
             else:
                 raise ValueError("cannot save pixel format %i as DDS"
                                  % self.pixel_format
@@ -6255,6 +7041,48 @@ class NifFormat(FileFormat):
             # looks pretty identical!
             return True
 
+        def get_interchangeable_hash(self):
+            """Hash for finding interchangeable geometry data, see
+            L{is_interchangeable}. The center is left out, as it is
+            only compared up to L{NifFormat.EPSILON}.
+
+            >>> from pyffi.formats.nif import NifFormat
+            >>> def geomdata(verts, tris):
+            ...     geomdata = NifFormat.NiTriShapeData()
+            ...     geomdata.num_vertices = len(verts)
+            ...     geomdata.has_vertices = True
+            ...     geomdata.vertices.update_size()
+            ...     for vert, (x, y, z) in zip(geomdata.vertices, verts):
+            ...         vert.x, vert.y, vert.z = x, y, z
+            ...     geomdata.set_triangles(tris)
+            ...     return geomdata
+            >>> geomdata1 = geomdata([(0, 0, 0), (1, 0, 0), (0, 1, 0)],
+            ...                      [(0, 1, 2)])
+            >>> geomdata2 = geomdata([(1, 0, 0), (0, 1, 0), (0, 0, 0)],
+            ...                      [(2, 0, 1)])
+            >>> geomdata1.is_interchangeable(geomdata2)
+            True
+            >>> (geomdata1.get_interchangeable_hash()
+            ...  == geomdata2.get_interchangeable_hash())
+            True
+            """
+            verthashes = list(self.get_vertex_hash_generator())
+            return (self.__class__,
+                    tuple(getattr(self, attribute) for attribute in (
+                        "num_vertices",
+                        "keep_flags",
+                        "compress_flags",
+                        "has_vertices",
+                        "num_uv_sets",
+                        "has_normals",
+                        "radius",
+                        "has_vertex_colors",
+                        "has_uv",
+                        "consistency_flags")),
+                    frozenset(verthashes),
+                    frozenset(tuple(verthashes[i] for i in tri)
+                              for tri in self.get_triangles()))
+
         def get_triangle_indices(self, triangles):
             """Yield list of triangle indices (relative to
             self.get_triangles()) of given triangles. Degenerate triangles in
@@ -6337,16 +7165,18 @@ class NifFormat(FileFormat):
                 else:
                     # raise ValueError('geometry has no tangents')
                     return None
-                if 24 * self.data.num_vertices != len(extra.binary_data):
+                # access the data without copying it
+                binary_data = extra._binary_data_value_.get_buffer()
+                if 24 * self.data.num_vertices != len(binary_data):
                     raise ValueError('tangent space data has invalid size, expected %i bytes but got %i'
                                      % (24 * self.data.num_vertices,
-                                        len(extra.binary_data)
+                                        len(binary_data)
                                         )
                                      )
-                tangents = bytes2vectors(extra.binary_data,
+                tangents = bytes2vectors(binary_data,
                                          0,
                                          self.data.num_vertices)
-                bitangents = bytes2vectors(extra.binary_data,
+                bitangents = bytes2vectors(binary_data,
                                            12 * self.data.num_vertices,
                                            self.data.num_vertices)
             else:
@@ -6408,6 +7238,77 @@ class NifFormat(FileFormat):
                     uvprecision=-2,
                     vcolprecision=-2))
 
+            if numpy is not None:
+                tan, bin = self._get_tangent_space_arrays(v_hash_map)
+            else:
+                tan, bin = self._get_tangent_space_vectors(v_hash_map)
+
+            # find possible extra data block
+            for extra in self.get_extra_datas():
+                if isinstance(extra, NifFormat.NiBinaryExtraData):
+                    if extra.name == b'Tangent space (binormal & tangent vectors)':
+                        break
+            else:
+                extra = None
+
+            # if autodetection is on, do as_extra only if an extra data block is found
+            if as_extra is None:
+                if extra:
+                    as_extra = True
+                else:
+                    as_extra = False
+
+            if as_extra:
+                # if tangent space extra data already exists, use it
+                if not extra:
+                    # otherwise, create a new block and link it
+                    extra = NifFormat.NiBinaryExtraData()
+                    extra.name = b'Tangent space (binormal & tangent vectors)'
+                    self.add_extra_data(extra)
+
+                # write the data
+                if numpy is not None:
+                    # _byte_order!! assuming little endian
+                    extra.binary_data = numpy.concatenate(
+                        (tan, bin)).astype("<f4").tobytes()
+                    return
+                binarydata = bytearray()
+                for vec in tan + bin:
+                    # _byte_order!! assuming little endian
+                    binarydata += struct.pack('<fff', vec.x, vec.y, vec.z)
+                extra.binary_data = bytes(binarydata)
+            else:
+                # set tangent space flag
+                # used to be 61440
+                # from Sid Meier's Railroad & Fallout 3 nifs,
+                # 4096 is sufficient?
+                if numpy is not None:
+                    self.data.set_from_array("tangents", tan)
+                    self.data.set_from_array("bitangents", bin)
+                    return
+                self.data.tangents.update_size()
+                self.data.bitangents.update_size()
+                for vec, data_tans in zip(tan, self.data.tangents):
+                    data_tans.x = vec.x
+                    data_tans.y = vec.y
+                    data_tans.z = vec.z
+                for vec, data_bins in zip(bin, self.data.bitangents):
+                    data_bins.x = vec.x
+                    data_bins.y = vec.y
+                    data_bins.z = vec.z
+
+        def _get_tangent_space_vectors(self, v_hash_map):
+            """Calculate the tangent space for L{update_tangent_space},
+            and normalize the normals. Returns the lists of tangents and
+            bitangents of all vertices.
+
+            :param v_hash_map: The hash of each vertex; vertices with
+                the same hash share their tangent space.
+            """
+            verts = self.data.vertices
+            norms = self.data.normals
+            uvs = self.data.uv_sets[0]
+
             # tangent and binormal dictionaries by vertex hash
             bin = dict((h, NifFormat.Vector3()) for h in v_hash_map)
             tan = dict((h, NifFormat.Vector3()) for h in v_hash_map)
@@ -6526,53 +7427,96 @@ class NifFormat(FileFormat):
                     tanh = n.crossproduct(binh)
 
             # tangent and binormal lists by vertex index
-            tan = [tan[h] for h in v_hash_map]
-            bin = [bin[h] for h in v_hash_map]
-
-            # find possible extra data block
-            for extra in self.get_extra_datas():
-                if isinstance(extra, NifFormat.NiBinaryExtraData):
-                    if extra.name == b'Tangent space (binormal & tangent vectors)':
-                        break
-            else:
-                extra = None
-
-            # if autodetection is on, do as_extra only if an extra data block is found
-            if as_extra is None:
-                if extra:
-                    as_extra = True
-                else:
-                    as_extra = False
-
-            if as_extra:
-                # if tangent space extra data already exists, use it
-                if not extra:
-                    # otherwise, create a new block and link it
-                    extra = NifFormat.NiBinaryExtraData()
-                    extra.name = b'Tangent space (binormal & tangent vectors)'
-                    self.add_extra_data(extra)
-
-                # write the data
-                binarydata = bytearray()
-                for vec in tan + bin:
-                    # _byte_order!! assuming little endian
-                    binarydata += struct.pack('<fff', vec.x, vec.y, vec.z)
-                extra.binary_data = bytes(binarydata)
-            else:
-                # set tangent space flag
-                # used to be 61440
-                # from Sid Meier's Railroad & Fallout 3 nifs,
-                # 4096 is sufficient?
-                self.data.tangents.update_size()
-                self.data.bitangents.update_size()
-                for vec, data_tans in zip(tan, self.data.tangents):
-                    data_tans.x = vec.x
-                    data_tans.y = vec.y
-                    data_tans.z = vec.z
-                for vec, data_bins in zip(bin, self.data.bitangents):
-                    data_bins.x = vec.x
-                    data_bins.y = vec.y
-                    data_bins.z = vec.z
+            return ([tan[h] for h in v_hash_map],
+                    [bin[h] for h in v_hash_map])
+
+        def _get_tangent_space_arrays(self, v_hash_map):
+            """As L{_get_tangent_space_vectors}, but calculated with
+            numpy, which gives the same results. Returns the arrays of
+            tangents and bitangents of all vertices."""
+            verts = self.data.as_array("vertices").astype(numpy.float64)
+            norms = self.data.as_array("normals").astype(numpy.float64)
+            uvs = self.data.as_array("uv_sets")[0].astype(numpy.float64)
+            tris = numpy.array(list(self.data.get_triangles()),
+                               dtype=numpy.intp).reshape(-1, 3)
+
+            def normalize(vecs):
+                """Normalize the rows of vecs in place, except for the
+                zero ones. Returns which rows were normalized."""
+                norm2 = (vecs[:, 0] * vecs[:, 0] + vecs[:, 1] * vecs[:, 1]
+                         + vecs[:, 2] * vecs[:, 2])
+                done = (norm2 != 0)
+                vecs[done] *= (1.0 / numpy.sqrt(norm2[done]))[:, None]
+                return done
+
+            def dot(vecs1, vecs2):
+                """Dot products of the rows of vecs1 and vecs2."""
+                return (vecs1[:, 0] * vecs2[:, 0] + vecs1[:, 1] * vecs2[:, 1]
+                        + vecs1[:, 2] * vecs2[:, 2])
+
+            # number the distinct hashes, in order of first occurrence
+            hash_index = {}
+            groups = numpy.array(
+                [hash_index.setdefault(h, len(hash_index))
+                 for h in v_hash_map], dtype=numpy.intp)
+
+            # contributions of the triangles, skipping degenerate ones
+            tri_groups = groups[tris]
+            valid = ((tri_groups[:, 0] != tri_groups[:, 1])
+                     & (tri_groups[:, 1] != tri_groups[:, 2])
+                     & (tri_groups[:, 2] != tri_groups[:, 0]))
+            v_2v_1 = verts[tris[:, 1]] - verts[tris[:, 0]]
+            v_3v_1 = verts[tris[:, 2]] - verts[tris[:, 0]]
+            w2w1 = uvs[tris[:, 1]] - uvs[tris[:, 0]]
+            w3w1 = uvs[tris[:, 2]] - uvs[tris[:, 0]]
+            r = w2w1[:, 0] * w3w1[:, 1] - w3w1[:, 0] * w2w1[:, 1]
+            r_sign = numpy.where(r >= 0, 1.0, -1.0)[:, None]
+            sdir = (w3w1[:, 1:2] * v_2v_1 - w2w1[:, 1:2] * v_3v_1) * r_sign
+            tdir = (w2w1[:, 0:1] * v_3v_1 - w3w1[:, 0:1] * v_2v_1) * r_sign
+            valid &= normalize(sdir)
+            valid &= normalize(tdir)
+
+            # sum the contributions by vertex hash, in triangle order
+            tan = numpy.zeros((len(hash_index), 3))
+            bin = numpy.zeros((len(hash_index), 3))
+            indices = tri_groups[valid].ravel()
+            numpy.add.at(tan, indices, numpy.repeat(tdir[valid], 3, axis=0))
+            numpy.add.at(bin, indices, numpy.repeat(sdir[valid], 3, axis=0))
+
+            # normalize the normals, picking something for invalid ones
+            norms_done = normalize(norms)
+            self.data.set_from_array("normals", norms)
+            norms[~norms_done] = (0.0, 1.0, 0.0)
+
+            # turn n, bin, tan into a base via Gram-Schmidt, for each
+            # vertex in turn: vertices which share their hash are
+            # handled in successive rounds, in order of their index
+            order = numpy.argsort(groups, kind="stable")
+            sorted_groups = groups[order]
+            firsts = numpy.flatnonzero(numpy.concatenate(
+                ([True], sorted_groups[1:] != sorted_groups[:-1])))
+            counts = numpy.diff(numpy.append(firsts, len(groups)))
+            ranks = numpy.empty(len(groups), dtype=numpy.intp)
+            ranks[order] = (numpy.arange(len(groups))
+                            - numpy.repeat(firsts, counts))
+            for rank in range(int(ranks.max()) + 1 if len(ranks) else 0):
+                vert_indices = numpy.flatnonzero(ranks == rank)
+                vert_groups = groups[vert_indices]
+                n = norms[vert_indices]
+                binh = bin[vert_groups]
+                tanh = tan[vert_groups]
+                binh -= n * dot(n, binh)[:, None]
+                # if the bitangent vanishes, the tangent is left alone
+                bin_done = normalize(binh)
+                tanh2 = tanh - n * dot(n, tanh)[:, None]
+                tanh2 -= binh * dot(binh, tanh2)[:, None]
+                normalize(tanh2)
+                tanh[bin_done] = tanh2[bin_done]
+                bin[vert_groups] = binh
+                tan[vert_groups] = tanh
+
+            # tangent and binormal arrays by vertex index
+            return tan[groups], bin[groups]
 
         # ported from nifskope/skeleton.cpp:spSkinPartition
         def update_skin_partition(self,
@@ -7481,6 +8425,47 @@ class NifFormat(FileFormat):
             v.v = -self.v
             return v
 
+def _read_block_chunk(args):
+    """Read a chunk of consecutive blocks, for
+    L{NifFormat.Data._read_blocks_parallel}. Runs in a worker, so the
+    blocks are read with a data instance of their own, and the links
+    that they pushed are returned along with them, unresolved.
+
+    :param args: Tuple of the version, user version, user version 2,
+        byte order, string list, list of block type names, data stream
+        usage and access (or ``None``), and sizes, and raw data of the
+        blocks.
+    :return: Tuple of the list of blocks, and the link stack.
+    """
+    logger = logging.getLogger("pyffi.nif.data")
+    (version, user_version, user_version_2, byte_order, string_list,
+     spans, raw) = args
+    data = NifFormat.Data(version=version, user_version=user_version,
+                          user_version_2=user_version_2)
+    data._byte_order = byte_order
+    data._string_list = string_list
+    data._link_stack = []
+    stream = BufferReader(raw, copy_payloads=False)
+    blocks = []
+    offset = 0
+    for block_type, data_stream, size in spans:
+        block = getattr(NifFormat, block_type)()
+        logger.debug("Reading %s block" % block_type)
+        block.read(stream, data)
+        # complete NiDataStream data
+        if data_stream:
+            block.usage = data_stream[0]
+            block.access.from_int(data_stream[1], data)
+        # check block size
+        offset += size
+        if stream.tell() != offset:
+            logger.error("Block size check failed: corrupt nif file or bad nif.xml?")
+            logger.error("Skipping %i bytes in %s"
+                         % (offset - stream.tell(), block_type))
+            stream.seek(offset)
+        blocks.append(block)
+    return blocks, data._link_stack
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -208,6 +208,7 @@ class TriFormat(pyffi.object_models.xml.FileFormat):
 
         def set_value(self, value):
             self._value = int(value)
+            self._changed()
 
         def __str__(self):
             return '%03i' % self._value
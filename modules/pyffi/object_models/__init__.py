@@ -194,6 +194,21 @@ class FileFormat(object):
             """
             raise NotImplementedError
 
+        def inspect_catalog(self, stream):
+            """Read just enough of the stream to describe its contents,
+            without reading any of the actual data. Resets stream to
+            original position. Call this function to index large
+            collections of files.
+
+            Override this method.
+
+            :param stream: The file to inspect.
+            :type stream: file
+            :return: A lightweight record describing the data, whose
+                fields are listed in its ``__slots__``.
+            """
+            raise NotImplementedError
+
         def read(self, stream):
             """Read data of particular format from stream.
             Override this method.
@@ -45,6 +45,7 @@ from pyffi.object_models.editable import EditableSpinBox
 from pyffi.object_models.editable import EditableFloatSpinBox
 from pyffi.object_models.editable import EditableLineEdit
 from pyffi.object_models.editable import EditableBoolComboBox
+from pyffi.utils import _read_bytes, _unpack
 
 # TODO get rid of these
 _b = b''
@@ -122,6 +123,8 @@ class Int(BasicBase, EditableSpinBox):
     '0x44332211'
     """
 
+    __slots__ = ()
+
     _min = -0x80000000  #: Minimum value.
     _max = 0x7fffffff  #: Maximum value.
     _struct = 'i'  #: Character used to represent type in struct.
@@ -162,6 +165,7 @@ class Int(BasicBase, EditableSpinBox):
                              % val
                              )
         self._value = val
+        self._changed()
 
     def read(self, stream, data):
         """Read value from stream.
@@ -169,8 +173,8 @@ class Int(BasicBase, EditableSpinBox):
         :param stream: The stream to read from.
         :type stream: file
         """
-        self._value = struct.unpack(data._byte_order + self._struct,
-                                    stream.read(self._size))[0]
+        self._value, = _unpack(stream, data._byte_order + self._struct,
+                               self._size)
 
     def write(self, stream, data):
         """Write value to stream.
@@ -215,6 +219,7 @@ class Int(BasicBase, EditableSpinBox):
 
 class UInt(Int):
     """Implementation of a 32-bit unsigned integer type."""
+    __slots__ = ()
     _min = 0
     _max = 0xffffffff
     _struct = 'I'
@@ -223,6 +228,7 @@ class UInt(Int):
 
 class Int64(Int):
     """Implementation of a 64-bit signed integer type."""
+    __slots__ = ()
     _min = -0x8000000000000000
     _max = 0x7fffffffffffffff
     _struct = 'q'
@@ -231,6 +237,7 @@ class Int64(Int):
 
 class UInt64(Int):
     """Implementation of a 64-bit unsigned integer type."""
+    __slots__ = ()
     _min = 0
     _max = 0xffffffffffffffff
     _struct = 'Q'
@@ -239,6 +246,7 @@ class UInt64(Int):
 
 class Byte(Int):
     """Implementation of a 8-bit signed integer type."""
+    __slots__ = ()
     _min = -0x80
     _max = 0x7f
     _struct = 'b'
@@ -247,6 +255,7 @@ class Byte(Int):
 
 class UByte(Int):
     """Implementation of a 8-bit unsigned integer type."""
+    __slots__ = ()
     _min = 0
     _max = 0xff
     _struct = 'B'
@@ -255,6 +264,7 @@ class UByte(Int):
 
 class Short(Int):
     """Implementation of a 16-bit signed integer type."""
+    __slots__ = ()
     _min = -0x8000
     _max = 0x7fff
     _struct = 'h'
@@ -263,6 +273,7 @@ class Short(Int):
 
 class UShort(UInt):
     """Implementation of a 16-bit unsigned integer type."""
+    __slots__ = ()
     _min = 0
     _max = 0xffff
     _struct = 'H'
@@ -273,14 +284,16 @@ class ULittle32(UInt):
     """Little endian 32 bit unsigned integer (ignores specified data
     byte order).
     """
+
+    __slots__ = ()
+
     def read(self, stream, data):
         """Read value from stream.
 
         :param stream: The stream to read from.
         :type stream: file
         """
-        self._value = struct.unpack('<' + self._struct,
-                                    stream.read(self._size))[0]
+        self._value, = _unpack(stream, '<' + self._struct, self._size)
 
     def write(self, stream, data):
         """Write value to stream.
@@ -294,6 +307,8 @@ class ULittle32(UInt):
 class Bool(UByte, EditableBoolComboBox):
     """Simple bool implementation."""
 
+    __slots__ = ()
+
     def get_value(self):
         """Return stored value.
 
@@ -308,11 +323,14 @@ class Bool(UByte, EditableBoolComboBox):
         :type value: bool
         """
         self._value = 1 if value else 0
+        self._changed()
 
 
 class Char(BasicBase, EditableLineEdit):
     """Implementation of an (unencoded) 8-bit character."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         """Initialize the character."""
         super(Char, self).__init__(**kwargs)
@@ -334,6 +352,7 @@ class Char(BasicBase, EditableLineEdit):
         assert(isinstance(value, bytes))
         assert(len(value) == 1)
         self._value = value
+        self._changed()
 
     def read(self, stream, data):
         """Read value from stream.
@@ -372,6 +391,8 @@ class Char(BasicBase, EditableLineEdit):
 class Float(BasicBase, EditableFloatSpinBox):
     """Implementation of a 32-bit float."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         """Initialize the float."""
         super(Float, self).__init__(**kwargs)
@@ -391,6 +412,7 @@ class Float(BasicBase, EditableFloatSpinBox):
         :type value: float
         """
         self._value = float(value)
+        self._changed()
 
     def read(self, stream, data):
         """Read value from stream.
@@ -398,8 +420,7 @@ class Float(BasicBase, EditableFloatSpinBox):
         :param stream: The stream to read from.
         :type stream: file
         """
-        self._value = struct.unpack(data._byte_order + 'f',
-                                    stream.read(4))[0]
+        self._value, = _unpack(stream, data._byte_order + 'f', 4)
 
     def write(self, stream, data):
         """Write value to stream.
@@ -452,6 +473,7 @@ class ZString(BasicBase, EditableLineEdit):
     >>> str(m)
     'Hi There!'
     """
+    __slots__ = ()
     _maxlen = 1000  #: The maximum length.
 
     def __init__(self, **kwargs):
@@ -483,6 +505,7 @@ class ZString(BasicBase, EditableLineEdit):
         if len(val) > self._maxlen:
             raise ValueError('string too long')
         self._value = val
+        self._changed()
 
     def read(self, stream, data=None):
         """Read string from stream.
@@ -548,6 +571,7 @@ class FixedString(BasicBase, EditableLineEdit):
     >>> str(m)
     'Hi There'
     """
+    __slots__ = ()
     _len = 0
 
     def __init__(self, **kwargs):
@@ -576,6 +600,7 @@ class FixedString(BasicBase, EditableLineEdit):
         if len(val) > self._len:
             raise ValueError("string '%s' too long" % val)
         self._value = val
+        self._changed()
 
     def read(self, stream, data=None):
         """Read string from stream.
@@ -635,6 +660,8 @@ class SizedString(BasicBase, EditableLineEdit):
     'Hi There'
     """
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         """Initialize the string."""
         super(SizedString, self).__init__(**kwargs)
@@ -657,6 +684,7 @@ class SizedString(BasicBase, EditableLineEdit):
         if len(val) > 10000:
             raise ValueError('string too long')
         self._value = val
+        self._changed()
 
     def __str__(self):
         return _as_str(self._value)
@@ -681,8 +709,7 @@ class SizedString(BasicBase, EditableLineEdit):
         :param stream: The stream to read from.
         :type stream: file
         """
-        length, = struct.unpack(data._byte_order + 'I',
-                                stream.read(4))
+        length, = _unpack(stream, data._byte_order + 'I', 4)
         if length > 10000:
             raise ValueError('string too long (0x%08X at 0x%08X)'
                              % (length, stream.tell()))
@@ -700,27 +727,63 @@ class SizedString(BasicBase, EditableLineEdit):
 
 
 class UndecodedData(BasicBase):
-    """Basic type for undecoded data trailing at the end of a file."""
+    """Basic type for undecoded data trailing at the end of a file.
+
+    The data is kept as it was read or assigned, which may be a view on
+    the buffer it came from, and is only copied into C{bytes} when
+    L{get_value} is called. Use L{get_buffer} to access it without
+    copying.
+
+    >>> from pyffi.utils import BufferReader
+    >>> undecoded = UndecodedData()
+    >>> reader = BufferReader(b'xxdata', 2, copy_payloads=False)
+    >>> undecoded.read(reader, None)
+    >>> undecoded.get_buffer().obj is reader.buffer.obj
+    True
+    >>> undecoded.get_value()
+    b'data'
+    """
+
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         BasicBase.__init__(self, **kwargs)
         self._value = b''
 
+    def __getstate__(self):
+        # views cannot be pickled
+        return None, {"_value": self.get_value()}
+
     def get_value(self):
         """Return stored value.
 
         :return: The stored value.
+        :rtype: C{bytes}
         """
+        if not isinstance(self._value, bytes):
+            self._value = bytes(self._value)
         return self._value
 
+    def get_buffer(self):
+        """Return the stored value as a read only buffer, without
+        copying it.
+
+        :return: The stored value.
+        :rtype: C{memoryview}
+        """
+        return memoryview(self._value).toreadonly()
+
     def set_value(self, value):
         """Set value to C{value}.
 
         :param value: The value to assign.
-        :type value: bytes
+        :type value: C{bytes}, or any other object supporting the buffer
+            protocol, such as C{memoryview}; the value is not copied
         """
         if len(value) > 16000000:
             raise ValueError('data too long')
         self._value = value
+        self._changed()
 
     def __str__(self):
         return '<UNDECODED DATA>'
@@ -746,7 +809,7 @@ class UndecodedData(BasicBase):
         :param stream: The stream to read from.
         :type stream: file
         """
-        self._value = stream.read(-1)
+        self._value = _read_bytes(stream)
 
     def write(self, stream, data):
         """Write data to stream.
@@ -48,6 +48,9 @@ graphical user interface.
 
 class EditableBase(object):
     """The base class for all delegates."""
+
+    __slots__ = ()
+
     def get_editor_value(self):
         """Return data as a value to initialize an editor with.
         Override this method.
@@ -76,6 +79,9 @@ class EditableSpinBox(EditableBase):
     Requirement: get_editor_value must return an ``int``, set_editor_value
     must take an ``int``.
     """
+
+    __slots__ = ()
+
     def get_editor_value(self):
         return self.get_value()
 
@@ -98,6 +104,8 @@ class EditableFloatSpinBox(EditableSpinBox):
     must take a ``float``.
     """
 
+    __slots__ = ()
+
     def get_editor_decimals(self):
         return 5
 
@@ -109,7 +117,8 @@ class EditableLineEdit(EditableBase):
     Requirement: get_editor_value must return a ``str``, set_editor_value
     must take a ``str``.
     """
-    pass
+
+    __slots__ = ()
 
 
 class EditableTextEdit(EditableLineEdit):
@@ -118,7 +127,8 @@ class EditableTextEdit(EditableLineEdit):
     Requirement:  get_editor_value must return a ``str``, set_editor_value
     must take a ``str``.
     """
-    pass
+
+    __slots__ = ()
 
 
 class EditableComboBox(EditableBase):
@@ -129,6 +139,8 @@ class EditableComboBox(EditableBase):
     must take an ``int`` (this integer is the index in the list of keys).
     """
 
+    __slots__ = ()
+
     def get_editor_keys(self):
         """Tuple of strings, each string describing an item."""
         return ()
@@ -139,6 +151,9 @@ class EditableBoolComboBox(EditableComboBox):
 
     Requirement: get_value must return a ``bool``, set_value must take a ``bool``.
     """
+
+    __slots__ = ()
+
     def get_editor_keys(self):
         return ("False", "True")
 
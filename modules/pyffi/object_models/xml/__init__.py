@@ -39,9 +39,12 @@ file, and xml handler for converting the xml description into Python classes.
 #
 # ***** END LICENSE BLOCK *****
 
+import hashlib
 import logging
+import marshal
 import time  # for timing stuff
 import types
+import os
 import os.path
 import sys
 import xml.sax
@@ -53,6 +56,9 @@ from pyffi.object_models.xml.bit_struct import BitStructBase
 from pyffi.object_models.xml.enum import EnumBase
 from pyffi.object_models.xml.expression import Expression
 
+# increment whenever the layout of the class table changes
+XML_CACHE_VERSION = 1
+
 
 class MetaFileFormat(pyffi.object_models.MetaFileFormat):
     """The MetaFileFormat metaclass transforms the XML description
@@ -90,26 +96,110 @@ class MetaFileFormat(pyffi.object_models.MetaFileFormat):
         # the hierarchy
         xml_file_name = dct.get('xml_file_name')
         if xml_file_name:
-            # set up XML parser
-            parser = xml.sax.make_parser()
-            parser.setContentHandler(XmlSaxHandler(self, name, bases, dct))
-
             # open XML file
             xml_file = self.openfile(xml_file_name, self.xml_file_path)
-
-            # parse the XML file: control is now passed on to XmlSaxHandler
-            # which takes care of the class creation
-            self.logger.debug("Parsing %s and generating classes."
-                              % xml_file_name
-                              )
-            start = time.clock()
             try:
+                # classes generated earlier from the same XML file are
+                # cached, so try the cache first
+                cache_file_name = self._get_xml_cache_file_name(xml_file)
+                start = time.perf_counter()
+                table = self._load_xml_cache(cache_file_name)
+                if table is not None:
+                    _create_classes_from_table(self, table)
+                    self.logger.debug(
+                        "Generated classes for %s from %s in %.3f seconds."
+                        % (xml_file_name, cache_file_name,
+                           time.perf_counter() - start))
+                    return
+
+                # set up XML parser
+                handler = XmlSaxHandler(self, name, bases, dct)
+                parser = xml.sax.make_parser()
+                parser.setContentHandler(handler)
+
+                # parse the XML file: control is now passed on to
+                # XmlSaxHandler which takes care of the class creation
+                self.logger.debug("Parsing %s and generating classes."
+                                  % xml_file_name
+                                  )
                 parser.parse(xml_file)
             finally:
                 xml_file.close()
             self.logger.debug("Parsing finished in %.3f seconds."
-                              % (time.clock() - start)
+                              % (time.perf_counter() - start)
                               )
+            self._save_xml_cache(
+                cache_file_name,
+                (self.versions, self.games, handler.class_table))
+
+    def _get_xml_cache_file_name(self, xml_file):
+        """Return the name of the file where the classes generated from
+        *xml_file* are cached, or ``None`` if caching is disabled. The
+        name is derived from a hash of the xml file, the pyffi version,
+        and the format class, so a changed xml file or a pyffi upgrade
+        never picks up a stale cache.
+
+        :param xml_file: The opened xml file.
+        :return: The name of the cache file, as ``str``.
+        """
+        if not self.xml_cache_dir:
+            return None
+        try:
+            with open(xml_file.name, "rb") as stream:
+                xml_bytes = stream.read()
+        except (AttributeError, IOError):
+            return None
+        key = hashlib.sha1(xml_bytes)
+        key.update(repr((pyffi.__version__, XML_CACHE_VERSION,
+                         sys.version_info[:2],
+                         self.__module__, self.__name__)).encode("ascii"))
+        return os.path.join(
+            self.xml_cache_dir,
+            "%s-%s.marshal" % (os.path.basename(xml_file.name),
+                               key.hexdigest()))
+
+    def _load_xml_cache(self, cache_file_name):
+        """Load the class table from the cache, or return ``None`` if
+        there is no valid cache.
+
+        :param cache_file_name: The name of the cache file.
+        :return: The class table, as described in
+            :func:`_create_classes_from_table`.
+        """
+        if not cache_file_name:
+            return None
+        try:
+            with open(cache_file_name, "rb") as stream:
+                return marshal.load(stream)
+        except (IOError, EOFError, ValueError, TypeError):
+            return None
+
+    def _save_xml_cache(self, cache_file_name, table):
+        """Save the class table to the cache. Failure to do so is not an
+        error: the xml file is simply parsed again next time.
+
+        :param cache_file_name: The name of the cache file.
+        :param table: The class table.
+        """
+        if not cache_file_name:
+            return
+        tmp_file_name = "%s.%i.tmp" % (cache_file_name, os.getpid())
+        try:
+            data = marshal.dumps(table)
+            if not os.path.isdir(self.xml_cache_dir):
+                os.makedirs(self.xml_cache_dir)
+            # write to a temporary file first, so other processes
+            # importing at the same time never see a partial cache
+            with open(tmp_file_name, "wb") as stream:
+                stream.write(data)
+            os.replace(tmp_file_name, cache_file_name)
+        except (IOError, OSError, ValueError) as exc:
+            self.logger.debug("Could not cache classes in %s: %s"
+                              % (cache_file_name, exc))
+            try:
+                os.remove(tmp_file_name)
+            except OSError:
+                pass
 
 
 class FileFormat(pyffi.object_models.FileFormat, metaclass=MetaFileFormat):
@@ -117,6 +207,13 @@ class FileFormat(pyffi.object_models.FileFormat, metaclass=MetaFileFormat):
     described by an xml file."""
     xml_file_name = None  #: Override.
     xml_file_path = None  #: Override.
+    xml_cache_dir = os.getenv(
+        'PYFFICACHEPATH',
+        os.path.join(os.path.expanduser("~"), ".cache", "pyffi"))
+    """Directory where the classes generated from the xml file are
+    cached, so the xml file need not be parsed again on the next import.
+    Set the ``PYFFICACHEPATH`` environment variable to an empty string
+    to disable the cache."""
     logger = logging.getLogger("pyffi.object_models.xml")
 
     # We also keep an ordered list of all classes that have been created.
@@ -146,6 +243,11 @@ class StructAttribute(object):
     :class:`StructBase` later).
     """
 
+    type_name = None
+    """The name of the type of this member variable, as given in the
+    xml file.
+    """
+
     default = None
     """The default value of this member variable."""
 
@@ -206,6 +308,7 @@ class StructAttribute(object):
         except KeyError:
             raise AttributeError("'%s' is missing a type attribute"
                                  % self.displayname)
+        self.type_name = attrs_type_str
         if attrs_type_str != "TEMPLATE":
             try:
                 self.type_ = getattr(cls, attrs_type_str)
@@ -258,6 +361,39 @@ class StructAttribute(object):
         if self.ver2:
             self.ver2 = cls.version_number(self.ver2)
 
+    _tuple_fields = ("displayname", "name", "type_name", "default",
+                     "template", "arg", "arr1", "arr2", "cond", "vercond",
+                     "ver1", "ver2", "userver", "doc", "is_abstract")
+
+    def as_tuple(self):
+        """Return the attribute data as a tuple which can be marshalled,
+        for the class cache. Must be called before the end of the xml
+        document, i.e. before types and templates are resolved.
+        """
+        return tuple(
+            value.as_tuple() if isinstance(value, Expression) else value
+            for value in (getattr(self, field)
+                          for field in self._tuple_fields))
+
+    @classmethod
+    def from_tuple(cls, format_cls, values):
+        """Create attribute from a tuple returned by :meth:`as_tuple`,
+        without parsing any of the xml attributes again.
+
+        :param format_cls: The class where all types reside.
+        :param values: The tuple."""
+        self = cls.__new__(cls)
+        for field, value in zip(cls._tuple_fields, values):
+            if field in ("arr1", "arr2", "cond", "vercond") and value:
+                value = Expression.from_tuple(value)
+            setattr(self, field, value)
+        if self.type_name != "TEMPLATE":
+            # if not found, forward declaration resolved at endDocument
+            self.type_ = getattr(format_cls, self.type_name, self.type_name)
+        else:
+            self.type_ = None  # type determined at runtime
+        return self
+
 
 class BitStructAttribute(object):
     """Helper class to collect attribute data of bitstruct bits tags."""
@@ -291,6 +427,30 @@ class BitStructAttribute(object):
         if self.ver2:
             self.ver2 = cls.version_number(self.ver2)
 
+    _tuple_fields = ("name", "numbits", "default", "cond",
+                     "ver1", "ver2", "userver", "doc")
+
+    def as_tuple(self):
+        """Return the attribute data as a tuple which can be marshalled,
+        for the class cache."""
+        return tuple(
+            value.as_tuple() if isinstance(value, Expression) else value
+            for value in (getattr(self, field)
+                          for field in self._tuple_fields))
+
+    @classmethod
+    def from_tuple(cls, format_cls, values):
+        """Create attribute from a tuple returned by :meth:`as_tuple`.
+
+        :param format_cls: The class where all types reside.
+        :param values: The tuple."""
+        self = cls.__new__(cls)
+        for field, value in zip(cls._tuple_fields, values):
+            if field == "cond" and value:
+                value = Expression.from_tuple(value)
+            setattr(self, field, value)
+        return self
+
 
 class XmlError(Exception):
     """The XML handler will throw this exception if something goes wrong while
@@ -372,6 +532,10 @@ class XmlSaxHandler(xml.sax.handler.ContentHandler):
         self.class_name = None
         self.class_dict = None
         self.class_bases = ()
+        self.class_base_names = ()
+
+        # description of all created classes, for the class cache
+        self.class_table = []
 
         # elements for basic classes
         self.basic_class = None
@@ -483,6 +647,7 @@ class XmlSaxHandler(xml.sax.handler.ContentHandler):
                     try:
                         self.class_bases += (
                             getattr(self.cls, class_basename), )
+                        self.class_base_names += (class_basename,)
                     except KeyError:
                         raise XmlError(
                             "typo, or forward declaration of struct %s"
@@ -543,6 +708,7 @@ class XmlSaxHandler(xml.sax.handler.ContentHandler):
                 typename = attrs["type"]
                 try:
                     self.class_bases += (getattr(self.cls, typename),)
+                    self.class_base_names += (typename,)
                 except AttributeError:
                     raise XmlError("typo, or forward declaration of type %s"
                                    % typename
@@ -655,55 +821,17 @@ but got %s instead""" % name)
                      self.tag_enum,
                      self.tag_alias,
                      self.tag_bit_struct):
-            # create class
-            # assign it to cls.<class_name> if it has not been implemented
-            # internally
-            cls_klass = getattr(self.cls, self.class_name, None)
-            if cls_klass and issubclass(cls_klass, BasicBase):
-                # overrides a basic type - not much to do
-                pass
-            else:
-                # check if we have a customizer class
-                if cls_klass:
-                    # exists: create and add to base class of customizer
-                    gen_klass = type(
-                        "_" + str(self.class_name),
-                        self.class_bases, self.class_dict)
-                    setattr(self.cls, "_" + self.class_name, gen_klass)
-                    # recreate the class, to ensure that the
-                    # metaclass is called!!
-                    # (otherwise, cls_klass does not have correct
-                    # _attribute_list, etc.)
-                    cls_klass = type(
-                        cls_klass.__name__,
-                        (gen_klass,) + cls_klass.__bases__,
-                        dict(cls_klass.__dict__))
-                    setattr(self.cls, self.class_name, cls_klass)
-                    # if the class derives from Data, then make an alias
-                    if issubclass(cls_klass,
-                                  pyffi.object_models.FileFormat.Data
-                                  ):
-                        self.cls.Data = cls_klass
-                    # for the stuff below
-                    gen_class = cls_klass
-                else:
-                    # does not yet exist: create it and assign to class dict
-                    gen_klass = type(
-                        str(self.class_name), self.class_bases, self.class_dict)
-                    setattr(self.cls, self.class_name, gen_klass)
-                # append class to the appropriate list
-                if tag == self.tag_struct:
-                    self.cls.xml_struct.append(gen_klass)
-                elif tag == self.tag_enum:
-                    self.cls.xml_enum.append(gen_klass)
-                elif tag == self.tag_alias:
-                    self.cls.xml_alias.append(gen_klass)
-                elif tag == self.tag_bit_struct:
-                    self.cls.xml_bit_struct.append(gen_klass)
+            # describe the class for the cache, and create it
+            self.class_table.append(
+                (tag, self.class_name, self.class_base_names,
+                 _get_class_description(self.class_dict)))
+            _create_class(self.cls, tag,
+                          self.class_name, self.class_bases, self.class_dict)
             # reset variables
             self.class_name = None
             self.class_dict = None
             self.class_bases = ()
+            self.class_base_names = ()
         elif tag == self.tag_basic:
             # link class cls.<class_name> to self.basic_class
             setattr(self.cls, self.class_name, self.basic_class)
@@ -719,29 +847,7 @@ but got %s instead""" % name)
         Searches and adds class customized functions.
         For version tags, adds version to version and game lists.
         """
-        # get 'name_attribute' for all classes
-        # we need this to fix them in cond="..." later
-        klass_filter = {}
-        for klass in self.cls.xml_struct:
-            klass_filter[self.cls.name_attribute(klass.__name__)] = klass
-        for obj in list(self.cls.__dict__.values()):
-            # skip objects that are not generated by the C{type} function
-            # or that do not derive from StructBase
-            if not (isinstance(obj, type) and issubclass(obj, StructBase)):
-                continue
-            # fix templates
-            for attr in obj._attrs:
-                templ = attr.template
-                if isinstance(templ, str):
-                    attr.template = \
-                        getattr(self.cls, templ) if templ != "TEMPLATE" \
-                        else None
-                attrtype = attr.type_
-                if isinstance(attrtype, str):
-                    attr.type_ = getattr(self.cls, attrtype)
-                # fix refs to types in conditions
-                if attr.cond:
-                    attr.cond.map_(lambda x: klass_filter[x] if x in klass_filter else x)
+        _resolve_classes(self.cls)
 
     def characters(self, chars):
         """Add the string C{chars} to the docstring.
@@ -770,3 +876,149 @@ but got %s instead""" % name)
                 else:
                     gamesdict[gamestr] = [
                         self.cls.versions[self.version_string]]
+
+
+def _get_class_description(class_dict):
+    """Return a copy of the dictionary of a class to be generated, which
+    can be marshalled, for the class cache.
+
+    :param class_dict: The class dictionary, as set up by
+        :class:`XmlSaxHandler`.
+    :return: The description, as ``dict``.
+    """
+    description = dict(class_dict)
+    del description["__module__"]
+    if "_attrs" in description:
+        description["_attrs"] = [attr.as_tuple() for attr in
+                                 description["_attrs"]]
+    return description
+
+
+def _create_class(cls, tag, class_name, class_bases, class_dict):
+    """Create a class, assign it to cls.<class_name> if it has not been
+    implemented internally, and append it to the appropriate list of
+    generated classes.
+
+    :param cls: The class where all types reside.
+    :param tag: The xml tag of the class (struct, enum, alias, or
+        bitstruct).
+    :param class_name: The name of the class.
+    :param class_bases: The bases of the class.
+    :param class_dict: The dictionary of the class.
+    """
+    cls_klass = getattr(cls, class_name, None)
+    if cls_klass and issubclass(cls_klass, BasicBase):
+        # overrides a basic type - not much to do
+        return
+    if tag in (XmlSaxHandler.tag_enum, XmlSaxHandler.tag_alias):
+        # basic values have no instance dictionary
+        class_dict = dict(class_dict, __slots__=())
+    # classes reside in cls, so instances can be pickled
+    qualname = "%s.%s" % (cls.__qualname__, class_name)
+    # check if we have a customizer class
+    if cls_klass:
+        # exists: create and add to base class of customizer
+        gen_klass = type(
+            "_" + str(class_name),
+            class_bases,
+            dict(class_dict, __qualname__="%s.%s" % (
+                cls.__qualname__, "_" + class_name)))
+        setattr(cls, "_" + class_name, gen_klass)
+        # recreate the class, to ensure that the
+        # metaclass is called!!
+        # (otherwise, cls_klass does not have correct
+        # _attribute_list, etc.)
+        # (the __dict__ and __weakref__ descriptors of the customizer
+        # do not apply to instances of the new class, so skip them)
+        cls_klass = type(
+            cls_klass.__name__,
+            (gen_klass,) + cls_klass.__bases__,
+            dict(((key, value) for key, value in cls_klass.__dict__.items()
+                  if key not in ("__dict__", "__weakref__")),
+                 __qualname__=qualname))
+        setattr(cls, class_name, cls_klass)
+        # if the class derives from Data, then make an alias
+        if issubclass(cls_klass,
+                      pyffi.object_models.FileFormat.Data
+                      ):
+            cls.Data = cls_klass
+        # for the stuff below
+        gen_class = cls_klass
+    else:
+        # does not yet exist: create it and assign to class dict
+        gen_klass = type(
+            str(class_name), class_bases,
+            dict(class_dict, __qualname__=qualname))
+        setattr(cls, class_name, gen_klass)
+    # append class to the appropriate list
+    if tag == XmlSaxHandler.tag_struct:
+        cls.xml_struct.append(gen_klass)
+    elif tag == XmlSaxHandler.tag_enum:
+        cls.xml_enum.append(gen_klass)
+    elif tag == XmlSaxHandler.tag_alias:
+        cls.xml_alias.append(gen_klass)
+    elif tag == XmlSaxHandler.tag_bit_struct:
+        cls.xml_bit_struct.append(gen_klass)
+
+
+def _resolve_classes(cls):
+    """Resolve forward declared types and templates, and class
+    references in conditions, once all classes have been created.
+
+    :param cls: The class where all types reside.
+    """
+    # get 'name_attribute' for all classes
+    # we need this to fix them in cond="..." later
+    klass_filter = {}
+    for klass in cls.xml_struct:
+        klass_filter[cls.name_attribute(klass.__name__)] = klass
+    for obj in list(cls.__dict__.values()):
+        # skip objects that are not generated by the C{type} function
+        # or that do not derive from StructBase
+        if not (isinstance(obj, type) and issubclass(obj, StructBase)):
+            continue
+        # fix templates
+        for attr in obj._attrs:
+            templ = attr.template
+            if isinstance(templ, str):
+                attr.template = \
+                    getattr(cls, templ) if templ != "TEMPLATE" \
+                    else None
+            attrtype = attr.type_
+            if isinstance(attrtype, str):
+                attr.type_ = getattr(cls, attrtype)
+            # fix refs to types in conditions
+            if attr.cond:
+                attr.cond.map_(lambda x: klass_filter[x] if x in klass_filter else x)
+            # (expressions are compiled on their first evaluation)
+
+
+def _create_classes_from_table(cls, table):
+    """Create all classes from a class table, as recorded by
+    :class:`XmlSaxHandler` while parsing the xml file, without parsing
+    the xml file again.
+
+    :param cls: The class where all types reside.
+    :param table: Tuple of the versions dictionary, the games
+        dictionary, and a list of ``(tag, class_name, base_names,
+        description)`` tuples, one for each class, in xml order.
+    """
+    default_bases = {XmlSaxHandler.tag_struct: (StructBase,),
+                     XmlSaxHandler.tag_enum: (EnumBase,),
+                     XmlSaxHandler.tag_alias: (),
+                     XmlSaxHandler.tag_bit_struct: (BitStructBase,)}
+    attr_classes = {XmlSaxHandler.tag_struct: StructAttribute,
+                    XmlSaxHandler.tag_bit_struct: BitStructAttribute}
+    cls.versions, cls.games, class_table = table
+    for tag, class_name, base_names, description in class_table:
+        class_bases = (tuple(getattr(cls, base_name)
+                             for base_name in base_names)
+                       or default_bases[tag])
+        class_dict = dict(description)
+        class_dict["__module__"] = cls.__module__
+        if tag in attr_classes:
+            class_dict["_attrs"] = [
+                attr_classes[tag].from_tuple(cls, attr)
+                for attr in class_dict["_attrs"]]
+        _create_class(cls, tag, class_name, class_bases, class_dict)
+    _resolve_classes(cls)
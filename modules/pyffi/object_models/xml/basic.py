@@ -39,9 +39,25 @@
 # ***** END LICENSE BLOCK *****
 # --------------------------------------------------------------------------
 
+import weakref
+
 from pyffi.utils.graph import DetailNode
 
 
+class _HashLink(weakref.ref):
+    """A weak reference from a value to the structure (or array) holding
+    it, which is set when the structure calculates its hash, so a change
+    of the value can invalidate that hash (see L{BasicBase._changed}).
+    It is not pickled, nor copied: it is set again when the hash is
+    calculated again.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return type(None), ()
+
+
 class BasicBase(DetailNode):
     """Base class from which all basic types are derived.
 
@@ -77,11 +93,23 @@ class BasicBase(DetailNode):
     NotImplementedError
     """
 
+    __slots__ = ("_value", "_parent")
+
     _is_template = False  # is it a template type?
     _has_links = False  # does the type contain a Ref or a Ptr?
     _has_refs = False  # does the type contain a Ref?
     _has_strings = False  # does the type contain a string?
     arg = None  # default argument
+    # increased whenever a link is set, or an array of links changes
+    # (see for instance NifFormat.Data.blocks_by_type)
+    _link_generation = 0
+    # while a structure calculates its hash, the values whose hash
+    # depends on other structures, with their hash, are added to this
+    # list (see StructBase.get_hash)
+    _hash_dependencies = None
+    # increased whenever the hash kept by a structure is dropped or
+    # replaced, so hashes depending on it must be checked again
+    _hash_changes = 0
 
     def __init__(self, template=None, argument=None, parent=None):
         """Initializes the instance.
@@ -131,9 +159,18 @@ class BasicBase(DetailNode):
         raise NotImplementedError
 
     def set_value(self, value):
-        """Set object value."""
+        """Set object value. Call L{_changed} once the value is set."""
         raise NotImplementedError
 
+    def _changed(self):
+        """Signal that the value changed, so the structure holding it,
+        if any, recalculates its hash (see StructBase.get_hash)."""
+        link = getattr(self, "_parent", None)
+        if link is not None:
+            parent = link()
+            if parent is not None:
+                parent._changed()
+
     def get_size(self, data=None):
         """Returns size of the object in bytes."""
         raise NotImplementedError
@@ -147,6 +184,10 @@ class BasicBase(DetailNode):
         """Replace a given branch."""
         pass
 
+    def replace_global_nodes(self, replacements, **kwargs):
+        """Replace given branches, without recursion."""
+        pass
+
     #
     # user interface functions come next
     # these functions are named after similar ones in the TreeItem example
@@ -46,6 +46,8 @@ from functools import partial
 import struct
 
 from pyffi.object_models.editable import EditableSpinBox  # for Bits
+from pyffi.object_models.xml.basic import BasicBase, _HashLink
+from pyffi.utils import _unpack
 from pyffi.utils.graph import DetailNode, EdgeFilter
 
 
@@ -100,6 +102,9 @@ class _MetaBitStructBase(type):
 class Bits(DetailNode, EditableSpinBox):
     """Basic implementation of a n-bit unsigned integer type (without read
     and write)."""
+
+    __slots__ = ("_value", "_numbits", "_parent")
+
     def __init__(self, numbits=1, default=0, parent=None):
         # parent disabled for performance
         # self._parent = weakref.ref(parent) if parent else None
@@ -117,6 +122,10 @@ class Bits(DetailNode, EditableSpinBox):
         if value >> self._numbits:
             raise ValueError('value out of range (%i)' % value)
         self._value = value
+        self._changed()
+
+    # see BasicBase._changed
+    _changed = BasicBase._changed
 
     def __str__(self):
         return str(self.get_value())
@@ -280,9 +289,10 @@ class BitStructBase(DetailNode, metaclass=_MetaBitStructBase):
 
     def read(self, stream, data):
         """Read structure from stream."""
+        self._changed()
         # read all attributes
-        value = struct.unpack(data._byte_order + self._struct,
-                              stream.read(self._numbytes))[0]
+        value, = _unpack(stream, data._byte_order + self._struct,
+                         self._numbytes)
         # set the structure variables
         self.from_int(value, data)
 
@@ -336,13 +346,22 @@ class BitStructBase(DetailNode, metaclass=_MetaBitStructBase):
         return self._numbytes
 
     def get_hash(self, data=None):
-        """Calculate a hash for the structure, as a tuple."""
+        """Calculate a hash for the structure, as a tuple. The bits are
+        linked to the structure, so a change of their value invalidates
+        the hash of the structure holding this one (see
+        L{pyffi.object_models.xml.struct_.StructBase.get_hash})."""
         # calculate hash
+        link = _HashLink(self)
         hsh = []
         for attr in self._get_filtered_attribute_list(data):
-            hsh.append(getattr(self, attr.name))
+            bits = getattr(self, "_%s_value_" % attr.name)
+            bits._parent = link
+            hsh.append(bits.get_value())
         return tuple(hsh)
 
+    # see BasicBase._changed
+    _changed = BasicBase._changed
+
     @classmethod
     def get_games(cls):
         """Get games for which this block is supported."""
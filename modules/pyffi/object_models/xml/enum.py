@@ -43,6 +43,7 @@ import struct
 
 from pyffi.object_models.xml.basic import BasicBase
 from pyffi.object_models.editable import EditableComboBox
+from pyffi.utils import _unpack
 
 
 class _MetaEnumBase(type):
@@ -95,6 +96,8 @@ class _MetaEnumBase(type):
 
 
 class EnumBase(BasicBase, EditableComboBox, metaclass=_MetaEnumBase):
+    __slots__ = ()
+
     _enumkeys = []
     _enumvalues = []
     _numbytes = 1  # default width of an enum
@@ -132,11 +135,12 @@ class EnumBase(BasicBase, EditableComboBox, metaclass=_MetaEnumBase):
                          )
         else:
             self._value = val
+            self._changed()
 
     def read(self, stream, data):
         """Read value from stream."""
-        self._value = struct.unpack(data._byte_order + self._struct,
-                                    stream.read(self._numbytes))[0]
+        self._value, = _unpack(stream, data._byte_order + self._struct,
+                               self._numbytes)
 
     def write(self, stream, data):
         """Write value to stream."""
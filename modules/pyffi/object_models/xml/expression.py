@@ -40,6 +40,7 @@
 # ***** END LICENSE BLOCK *****
 # --------------------------------------------------------------------------
 
+import keyword
 import re
 import sys  # stderr (for debugging)
 
@@ -107,76 +108,121 @@ class Expression(object):
             print("error while parsing expression '%s'" % expr_str)
             raise
 
+    _op_templates = {'==': 'int(%s == %s)',
+                     '!=': 'int(%s != %s)',
+                     '>=': 'int(%s >= %s)',
+                     '<=': 'int(%s <= %s)',
+                     '&&': 'int(%s and %s)',
+                     '||': 'int(%s or %s)',
+                     '&': '(%s & %s)',
+                     '|': '(%s | %s)',
+                     '-': '(%s - %s)',
+                     '!': 'int(not %s%s)',
+                     '>': 'int(%s > %s)',
+                     '<': 'int(%s < %s)',
+                     '/': 'int(%s / %s)',
+                     '*': 'int(%s * %s)',
+                     '+': '(%s + %s)'
+                     }
+    """Python source templates for each operator."""
+
     def eval(self, data=None):
-        """Evaluate the expression to an integer."""
+        """Evaluate the expression to an integer.
 
-        if isinstance(self._left, Expression):
-            left = self._left.eval(data)
-        elif isinstance(self._left, str):
-            if self._left == '""':
-                left = ""
-            else:
-                left = data
-                for part in self._left.split("."):
-                    left = getattr(left, part)
-        elif isinstance(self._left, type):
-            left = isinstance(data, self._left)
-        elif self._left is None:
-            pass
-        else:
-            assert(isinstance(self._left, int))  # debug
-            left = self._left
+        The expression is compiled into a python function on first
+        evaluation, which then replaces this method on the instance.
+
+        >>> e = Expression('x + 2')
+        >>> class A(object):
+        ...     x = 3
+        >>> e.eval(A())
+        5
+        >>> 'eval' in e.__dict__
+        True
+        """
+        self.eval = self.compile()
+        return self.eval(data)
 
+    def __getstate__(self):
+        """The compiled expression cannot be pickled: drop it, it is
+        compiled again on first evaluation.
+
+        >>> import pickle
+        >>> e = Expression('x + 2')
+        >>> class A(object):
+        ...     x = 3
+        >>> e.eval(A())
+        5
+        >>> pickle.loads(pickle.dumps(e)).eval(A())
+        5
+        """
+        state = dict(self.__dict__)
+        state.pop("eval", None)
+        return state
+
+    def compile(self):
+        """Compile the expression into a python function which takes
+        the data as single (optional) argument, and which returns the
+        same result as L{eval}.
+
+        >>> class B(object):
+        ...     c = 3
+        >>> class A(object):
+        ...     b = B()
+        ...     d = 0
+        >>> f = Expression('(b.c == 3) && !d').compile()
+        >>> f(A())
+        1
+        >>> Expression('(1 + 2) * 4').compile()()
+        12
+        """
+        namespace = {}
+        return eval("lambda data=None: " + self._get_source(namespace),
+                    namespace)
+
+    def _get_source(self, namespace):
+        """Return python source code for the expression, in terms of
+        C{data}. Classes that are referred to are added to C{namespace}."""
+        if self._left is None:
+            left = ""
+        else:
+            left = self._get_operand_source(self._left, namespace, True)
         if not self._op:
             return left
-
-        if isinstance(self._right, Expression):
-            right = self._right.eval(data)
-        elif isinstance(self._right, str):
-            if (not self._right) or self._right == '""':
-                right = ""
-            else:
-                right = getattr(data, self._right)
-        elif isinstance(self._right, type):
-            right = isinstance(data, self._right)
-        elif self._right is None:
-            pass
+        if self._right is None:
+            right = ""
         else:
-            assert(isinstance(self._right, int))  # debug
-            right = self._right
+            right = self._get_operand_source(self._right, namespace, False)
+        try:
+            template = self._op_templates[self._op]
+        except KeyError:
+            raise NotImplementedError("expression syntax error: operator '" + self._op + "' not implemented")
+        return template % (left, right)
 
-        if self._op == '==':
-            return int(left == right)
-        elif self._op == '!=':
-            return int(left != right)
-        elif self._op == '>=':
-            return int(left >= right)
-        elif self._op == '<=':
-            return int(left <= right)
-        elif self._op == '&&':
-            return int(left and right)
-        elif self._op == '||':
-            return int(left or right)
-        elif self._op == '&':
-            return left & right
-        elif self._op == '|':
-            return left | right
-        elif self._op == '-':
-            return left - right
-        elif self._op == '!':
-            return int(not(right))
-        elif self._op == '>':
-            return int(left > right)
-        elif self._op == '<':
-            return int(left < right)
-        elif self._op == '/':
-            return int(left / right)
-        elif self._op == '*':
-            return int(left * right)
-        elif self._op == '+':
-            return left + right
+    @staticmethod
+    def _get_operand_source(operand, namespace, split_names):
+        """Return python source code for an operand. Names on the left
+        hand side of an operator may be dotted, names on the right
+        hand side are looked up as a whole (as L{eval} always did)."""
+        if isinstance(operand, Expression):
+            return "(%s)" % operand._get_source(namespace)
+        elif isinstance(operand, str):
+            if (not operand) or operand == '""':
+                return '""'
+            source = "data"
+            for part in (operand.split(".") if split_names else (operand,)):
+                if part.isidentifier() and not keyword.iskeyword(part):
+                    source += "." + part
+                else:
+                    source = "getattr(%s, %r)" % (source, part)
+            return source
+        elif isinstance(operand, type):
+            name = "_class_%i" % len(namespace)
+            namespace[name] = operand
+            return "isinstance(data, %s)" % name
         else:
-            raise NotImplementedError("expression syntax error: operator '" + self._op + "' not implemented")
+            assert(isinstance(operand, int))  # debug
+            return "(%i)" % operand
 
     def __str__(self):
         """Reconstruct the expression to a string."""
@@ -387,6 +433,34 @@ class Expression(object):
             self._right.map_(func)
         else:
             self._right = func(self._right)
+        # operands changed, so compile again on next evaluation
+        self.__dict__.pop("eval", None)
+
+    def as_tuple(self):
+        """Return the parsed expression as nested C{(left, op, right)}
+        tuples, which can be marshalled, and turned back into an
+        expression with L{from_tuple}, without parsing the expression
+        string again.
+
+        >>> Expression('(a == 1) && (b != 2)').as_tuple()
+        (('a', '==', 1), '&&', ('b', '!=', 2))
+        >>> print(Expression.from_tuple(_))
+        a == 1 && b != 2
+        """
+        return tuple(
+            operand.as_tuple() if isinstance(operand, Expression) else operand
+            for operand in (self._left, self._op, self._right))
+
+    @classmethod
+    def from_tuple(cls, tree):
+        """Create an expression from nested tuples, as returned by
+        L{as_tuple}."""
+        expr = cls.__new__(cls)
+        left, expr._op, right = tree
+        expr._left = cls.from_tuple(left) if isinstance(left, tuple) else left
+        expr._right = (
+            cls.from_tuple(right) if isinstance(right, tuple) else right)
+        return expr
 
 if __name__ == "__main__":
     import doctest
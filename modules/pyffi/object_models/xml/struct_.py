@@ -40,14 +40,18 @@
 # --------------------------------------------------------------------------
 
 # note: some imports are defined at the end to avoid problems with circularity
+import copyreg
+import struct
 import weakref
 
 from functools import partial
 
+from pyffi.utils import _read_bytes
 from pyffi.utils.graph import DetailNode, GlobalNode, EdgeFilter
 
 import pyffi.object_models.common
-from pyffi.object_models.xml.basic import BasicBase
+from pyffi.object_models.xml.basic import BasicBase, _HashLink
+from pyffi.object_models.xml.enum import EnumBase
 
 
 class _MetaStructBase(type):
@@ -56,6 +60,20 @@ class _MetaStructBase(type):
     <attrname> property is generated which gets and sets basic types,
     and gets other types (struct and array). Used as metaclass of
     StructBase."""
+    def __new__(metacls, name, bases, dct):
+        # store the attribute values in slots rather than in the
+        # instance dictionary, which takes far less memory
+        if "__slots__" not in dct:
+            slots = []
+            for attr in dct.get('_attrs', []):
+                slot = "_%s_value_" % attr.name
+                if slot not in slots and not any(hasattr(base, slot)
+                                                 for base in bases):
+                    slots.append(slot)
+            dct["__slots__"] = tuple(slots)
+        return super(_MetaStructBase, metacls).__new__(
+            metacls, name, bases, dct)
+
     def __init__(cls, name, bases, dct):
         super(_MetaStructBase, cls).__init__(name, bases, dct)
         # does the type contain a Ref or a Ptr?
@@ -139,6 +157,10 @@ class _MetaStructBase(type):
         # precalculate the attribute name list
         cls._names = cls._get_names()
 
+        # attribute plans are compiled on demand, one per version triple
+        # (see StructBase._get_attribute_plan)
+        cls._attribute_plans = {}
+
 
 class StructBase(GlobalNode, metaclass=_MetaStructBase):
     """Base class from which all file struct types are derived.
@@ -173,6 +195,7 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
     ...             return self.__value
     ...         def set_value(self, value):
     ...             self.__value = int(value)
+    ...             self._changed()
     ...     @staticmethod
     ...     def name_attribute(name):
     ...         return name
@@ -224,10 +247,14 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
     <BLANKLINE>
     """
 
+    # the argument, and the attribute values (in slots of the
+    # subclasses), are the only per instance data; the dictionary is
+    # only created if other attributes are set
+    __slots__ = ("arg", "_hash_cache", "_parent", "__dict__", "__weakref__")
+
     _is_template = False
     _attrs = []
     _games = {}
-    arg = None
 
     # initialize all attributes
     def __init__(self, template=None, argument=None, parent=None):
@@ -247,12 +274,10 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
         names = set()
         # initialize argument
         self.arg = argument
+        # no hash calculated yet (see get_hash)
+        self._hash_cache = None
         # save parent (note: disabled for performance)
         # self._parent = weakref.ref(parent) if parent else None
-        # initialize item list
-        # this list is used for instance by qskope to display the structure
-        # in a tree view
-        self._items = []
         # initialize attributes
         for attr in self._attribute_list:
             # skip attributes with dupiclate names
@@ -265,10 +290,7 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
             # things that can only be determined at runtime (rt_xxx)
             rt_type = attr.type_ if attr.type_ is not None else template
             rt_template = attr.template if attr.template is not None else template
-            if attr.arg in (int, None):
-                rt_arg = attr.arg
-            else:
-                getattr(self, attr.arg)
+            rt_arg = self._get_attribute_argument(attr)
             # instantiate the class, handling arrays at the same time
             if attr.arr1 is None:
                 attr_instance = rt_type(template=rt_template,
@@ -296,8 +318,14 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
             # assign attribute value
             setattr(self, "_%s_value_" % attr.name, attr_instance)
 
-            # add instance to item list
-            self._items.append(attr_instance)
+    def _get_attribute_argument(self, attr):
+        """Return the argument of an attribute, which is either fixed, or
+        the current value of another attribute (can only be done at
+        runtime)."""
+        if attr.arg is None or isinstance(attr.arg, int):
+            return attr.arg
+        else:
+            return getattr(self, attr.arg)
 
     def deepcopy(self, block):
         """Copy attributes from a given block (one block class must be a
@@ -345,19 +373,19 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
 
     def read(self, stream, data):
         """Read structure from stream."""
+        self._changed()
         # read all attributes
         for attr in self._get_filtered_attribute_list(data):
             # skip abstract attributes
             if attr.is_abstract:
                 continue
             # get attribute argument (can only be done at runtime)
-            if attr.arg in (int, None):
-                rt_arg = attr.arg
-            else:
-                getattr(self, attr.arg)
+            rt_arg = self._get_attribute_argument(attr)
             # read the attribute
             attr_value = getattr(self, "_%s_value_" % attr.name)
-            attr_value.arg = rt_arg
+            # (most values take no argument, and have no slot for it)
+            if rt_arg is not None or attr_value.arg is not None:
+                attr_value.arg = rt_arg
             attr_value.read(stream, data)
             # ## UNCOMMENT FOR DEBUGGING WHILE READING
             # print("* %s.%s" % (self.__class__.__name__, attr.name)) # debug
@@ -378,14 +406,12 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
             if attr.is_abstract:
                 continue
             # get attribute argument (can only be done at runtime)
-            if attr.arg in (int, None):
-                rt_arg = attr.arg
-            else:
-                getattr(self, attr.arg)
+            rt_arg = self._get_attribute_argument(attr)
             # write the attribute
             attr_value = getattr(self, "_%s_value_" % attr.name)
-            attr_value.arg = rt_arg
-            getattr(self, "_%s_value_" % attr.name).write(stream, data)
+            if rt_arg is not None or attr_value.arg is not None:
+                attr_value.arg = rt_arg
+            attr_value.write(stream, data)
             # ## UNCOMMENT FOR DEBUGGING WHILE WRITING
             # print("* %s.%s" % (self.__class__.__name__, attr.name)) # debug
             # val = getattr(self, "_%s_value_" % attr.name) # debug
@@ -466,17 +492,110 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
             # skip abstract attributes
             if attr.is_abstract:
                 continue
-            size += getattr(self, "_%s_value_" % attr.name).get_size(data)
+            rt_arg = self._get_attribute_argument(attr)
+            attr_value = getattr(self, "_%s_value_" % attr.name)
+            if rt_arg is not None or attr_value.arg is not None:
+                attr_value.arg = rt_arg
+            size += attr_value.get_size(data)
         return size
 
     def get_hash(self, data=None):
-        """Calculate a hash for the structure, as a tuple."""
-        # calculate hash
-        hsh = []
-        for attr in self._get_filtered_attribute_list(data):
-            hsh.append(
-                getattr(self, "_%s_value_" % attr.name).get_hash(data))
-        return tuple(hsh)
+        """Calculate a hash for the structure, as a tuple.
+
+        The hash is kept, and returned again on later calls, until a
+        value of this structure, or of any structure or array in it,
+        is set or read, or until the hash of a block it references
+        changes. So, repeated checks on unchanged structures are
+        cheap, and changing one block leaves the hashes of other
+        blocks alone.
+
+        >>> from pyffi.formats.nif import NifFormat
+        >>> vec = NifFormat.Vector3()
+        >>> vec.get_hash()
+        (0, 0, 0)
+        >>> vec.get_hash() is vec.get_hash()
+        True
+        >>> vec.x = 1.0
+        >>> vec.get_hash()
+        (200, 0, 0)
+        >>> vec._y_value_.set_value(2.0)
+        >>> vec.get_hash()
+        (200, 400, 0)
+        >>> data = NifFormat.NiTriShapeData()
+        >>> data.num_vertices = 1
+        >>> data.has_vertices = True
+        >>> data.vertices.update_size()
+        >>> hsh = data.get_hash()
+        >>> data.vertices[0]._z_value_.set_value(3.0)
+        >>> data.get_hash() == hsh
+        False
+        >>> node = NifFormat.NiNode()
+        >>> shape = NifFormat.NiTriShape()
+        >>> node.add_child(shape)
+        >>> hsh = node.get_hash()
+        >>> shape.get_hash() is shape.get_hash()
+        True
+        >>> shape.translation.x = 1.0
+        >>> node.get_hash() == hsh
+        False
+        >>> prop = NifFormat.BSShaderPPLightingProperty()
+        >>> hsh = prop.get_hash()
+        >>> prop.shader_flags._specular_value_.set_value(1)
+        >>> prop.get_hash() == hsh
+        False
+        """
+        key = _get_version_key(data)
+        outer = BasicBase._hash_dependencies
+        cache = self._hash_cache
+        if cache is not None and cache.key == key:
+            valid = True
+            if cache.checked != BasicBase._hash_changes:
+                # check the blocks this structure references
+                BasicBase._hash_dependencies = None
+                try:
+                    valid = all(value.get_hash(data) is hsh
+                                for value, hsh in cache.dependencies)
+                finally:
+                    BasicBase._hash_dependencies = outer
+                cache.checked = BasicBase._hash_changes
+            if valid:
+                if outer is not None:
+                    outer.extend(cache.dependencies)
+                return cache.hash
+        if cache is not None:
+            BasicBase._hash_changes += 1
+        # calculate hash, linking every attribute to this structure,
+        # so a change of the attribute invalidates the hash
+        link = _HashLink(self)
+        dependencies = BasicBase._hash_dependencies = []
+        try:
+            hsh = []
+            for attr in self._get_filtered_attribute_list(data):
+                value = getattr(self, "_%s_value_" % attr.name)
+                value._parent = link
+                hsh.append(value.get_hash(data))
+        finally:
+            BasicBase._hash_dependencies = outer
+        hsh = tuple(hsh)
+        if outer is not None:
+            outer.extend(dependencies)
+        self._hash_cache = _HashCache(key, hsh, dependencies)
+        return hsh
+
+    def _changed(self):
+        """Signal that a value of the structure changed, so it, and the
+        structure holding it, if any, recalculate their hash (see
+        L{get_hash})."""
+        if self._hash_cache is None:
+            # so neither have the structures holding it
+            return
+        self._hash_cache = None
+        BasicBase._hash_changes += 1
+        link = getattr(self, "_parent", None)
+        if link is not None:
+            parent = link()
+            if parent is not None:
+                parent._changed()
 
     def replace_global_node(self, oldbranch, newbranch, **kwargs):
         for attr in self._get_filtered_attribute_list():
@@ -487,6 +606,17 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
             getattr(self, "_%s_value_" % attr.name).replace_global_node(
                 oldbranch, newbranch, **kwargs)
 
+    def replace_global_nodes(self, replacements, **kwargs):
+        """Replace the branches that this structure links to directly,
+        as given by a dictionary which maps old branches to new
+        branches. Unlike L{replace_global_node}, this does not recurse
+        into the branches."""
+        for attr in self._get_filtered_attribute_list():
+            if not attr.type_._has_links:
+                continue
+            getattr(self, "_%s_value_" % attr.name).replace_global_nodes(
+                replacements, **kwargs)
+
     @classmethod
     def get_games(cls):
         """Get games for which this block is supported."""
@@ -528,57 +658,105 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
                 names.append(attr.name)
         return names
 
-    def _get_filtered_attribute_list(self, data=None):
-        """Generator for listing all 'active' attributes, that is,
-        attributes whose condition evaluates ``True``, whose version
-        interval contains C{version}, and whose user version is
-        C{user_version}. ``None`` for C{version} or C{user_version} means
-        that these checks are ignored. Duplicate names are skipped as
-        well.
-
-        Note: version and user_version arguments are deprecated, use
-        the data argument instead.
+    @classmethod
+    def _get_attribute_plan(cls, data=None):
+        """Return the attribute plan of this structure for the version,
+        user version, and user version 2 of C{data}. The plan is
+        compiled on first use, and cached on the class.
+
+        The plan is a tuple of C{(attr, cond, check_name)} triples,
+        listing the attributes that pass the version, user version,
+        and version condition checks, in order. Only the C{cond}
+        expression (if not ``None``) must still be evaluated on the
+        instance. If C{check_name} is ``True`` then an earlier
+        conditional attribute has the same name, and the attribute
+        must be skipped if that one was active.
+
+        >>> from pyffi.formats.nif import NifFormat
+        >>> data = NifFormat.Data(version=0x14000005, user_version=11)
+        >>> plan = NifFormat.NiNode._get_attribute_plan(data)
+        >>> plan is NifFormat.NiNode._get_attribute_plan(data)
+        True
+        >>> [attr.name for attr, cond, check_name in plan][:4]
+        ['name', 'num_extra_data_list', 'extra_data_list', 'controller']
         """
+        key = _get_version_key(data)
+        try:
+            return cls._attribute_plans[key]
+        except KeyError:
+            plan = cls._compile_attribute_plan(data)
+            cls._attribute_plans[key] = plan
+            return plan
+
+    @classmethod
+    def _compile_attribute_plan(cls, data=None):
+        """Calculate the attribute plan of this structure, without
+        caching. See L{_get_attribute_plan}."""
         if data is not None:
             version = data.version
             user_version = data.user_version
         else:
             version = None
             user_version = None
+        attrs = []
+        # names of attributes that are active whenever they pass the
+        # version checks; later attributes with these names never are
         names = set()
-        for attr in self._attribute_list:
-            # print(attr.name, version, attr.ver1, attr.ver2) # debug
-
+        for attr in cls._attribute_list:
             # check version
             if version is not None:
                 if attr.ver1 is not None and version < attr.ver1:
                     continue
                 if attr.ver2 is not None and version > attr.ver2:
                     continue
-            # print("version check passed") # debug
-
             # check user version
             if (attr.userver is not None and user_version is not None and user_version != attr.userver):
                 continue
-            # print("user version check passed") # debug
-
-            # check conditions
-            if attr.cond is not None and not attr.cond.eval(self):
-                continue
-
+            # version conditions only depend on data, so evaluate them now
             if (version is not None and user_version is not None and attr.vercond is not None):
                 if not attr.vercond.eval(data):
                     continue
+            # skip duplicate names
+            if attr.name in names:
+                continue
+            if attr.cond is None:
+                names.add(attr.name)
+            attrs.append(attr)
+        # duplicates that remain follow a conditional attribute of the
+        # same name, so they must be checked at runtime
+        counts = {}
+        for attr in attrs:
+            counts[attr.name] = counts.get(attr.name, 0) + 1
+        return tuple((attr, attr.cond, counts[attr.name] > 1)
+                     for attr in attrs)
 
-            # print("condition passed") # debug
+    def _get_filtered_attribute_list(self, data=None):
+        """Generator for listing all 'active' attributes, that is,
+        attributes whose condition evaluates ``True``, whose version
+        interval contains C{version}, and whose user version is
+        C{user_version}. ``None`` for C{version} or C{user_version} means
+        that these checks are ignored. Duplicate names are skipped as
+        well.
 
-            # skip dupiclate names
+        The version checks are taken from the cached attribute plan
+        (see L{_get_attribute_plan}), so only the conditions are
+        evaluated here.
 
-            if attr.name in names:
+        Note: version and user_version arguments are deprecated, use
+        the data argument instead.
+        """
+        names = None
+        for attr, cond, check_name in self._get_attribute_plan(data):
+            # check conditions
+            if cond is not None and not cond.eval(self):
                 continue
-            # print("duplicate check passed") # debug
-
-            names.add(attr.name)
+            # skip duplicate names
+            if check_name:
+                if names is None:
+                    names = set()
+                elif attr.name in names:
+                    continue
+                names.add(attr.name)
             # passed all tests
             # so yield the attribute
             yield attr
@@ -598,6 +776,7 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
                             % (attr.__class__.__name__,
                                value.__class__.__name__))
         # set it
+        self._changed()
         setattr(self, "_" + name + "_value_", value)
 
     def get_basic_attribute(self, name):
@@ -637,7 +816,7 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
 
     def get_detail_child_nodes(self, edge_filter=EdgeFilter()):
         """Yield children of this structure."""
-        return (item for item in self._items)
+        return (getattr(self, "_%s_value_" % name) for name in self._names)
 
     def get_detail_child_names(self, edge_filter=EdgeFilter()):
         """Yield names of the children of this structure."""
@@ -656,13 +835,126 @@ class StructBase(GlobalNode, metaclass=_MetaStructBase):
             yield branch
 
 
+class _HashCache(object):
+    """The hash of a structure (see L{StructBase.get_hash}), with the
+    version key it was calculated for, the values whose hash depends
+    on other structures, with their hash, and the value of
+    C{BasicBase._hash_changes} when these were last checked. It is not
+    pickled, nor copied, as the links which invalidate it are not
+    either."""
+
+    __slots__ = ("key", "hash", "dependencies", "checked")
+
+    def __init__(self, key, hsh, dependencies):
+        self.key = key
+        self.hash = hsh
+        self.dependencies = dependencies
+        self.checked = BasicBase._hash_changes
+
+    def __reduce__(self):
+        return type(None), ()
+
+def _get_version_key(data):
+    """Return the versions of C{data} which determine the layout of a
+    structure, as a tuple (or ``None`` if C{data} is ``None``)."""
+    if data is None:
+        return None
+    return (data.version, data.user_version,
+            getattr(data, "user_version_2", None))
+
+# maps (element type, version key) to the fixed layout of that type
+_fixed_layouts = {}
+
+
+def _get_fixed_layout(element_type, data):
+    """Return the fixed layout of C{element_type} for the versions of
+    C{data}, or ``None`` if the type has no fixed layout. Types with a
+    fixed layout are plain numbers, enums, and structures whose active
+    attributes are all unconditional and have a fixed layout themselves
+    (for instance Vector3, TexCoord, Color4, and Triangle); such
+    elements can be read and written in bulk.
+
+    The layout is a pair C{(fmt, paths)}: C{fmt} is the struct format of
+    a single element (without byte order) and C{paths} lists, for every
+    field in C{fmt}, the chain of value attribute names leading to its
+    basic instance (``None`` if the element is itself a basic type).
+
+    >>> from pyffi.formats.nif import NifFormat
+    >>> data = NifFormat.Data(version=0x14000005, user_version=11)
+    >>> _get_fixed_layout(NifFormat.Vector3, data)
+    ('fff', (('_x_value_',), ('_y_value_',), ('_z_value_',)))
+    >>> _get_fixed_layout(NifFormat.ushort, data)
+    ('H', None)
+    >>> _get_fixed_layout(NifFormat.MatchGroup, data) is None
+    True
+    """
+    key = (element_type, _get_version_key(data))
+    try:
+        return _fixed_layouts[key]
+    except KeyError:
+        layout = _compile_fixed_layout(element_type, data)
+        _fixed_layouts[key] = layout
+        return layout
+
+
+def _compile_fixed_layout(element_type, data):
+    """Calculate the fixed layout of C{element_type}, without caching.
+    See L{_get_fixed_layout}."""
+    if issubclass(element_type, BasicBase):
+        # only types which use the standard reader have a known format
+        if element_type.read in (pyffi.object_models.common.Int.read,
+                                 EnumBase.read):
+            return element_type._struct, None
+        elif element_type.read is pyffi.object_models.common.Float.read:
+            return 'f', None
+        else:
+            return None
+    if not (issubclass(element_type, StructBase)
+            and element_type.read is StructBase.read
+            and element_type.write is StructBase.write):
+        return None
+    fmt = ''
+    paths = []
+    for attr, cond, check_name in element_type._get_attribute_plan(data):
+        if (cond is not None or attr.is_abstract or attr.arr1 is not None
+                or attr.arg is not None or attr.type_ is None):
+            return None
+        layout = _get_fixed_layout(attr.type_, data)
+        if layout is None:
+            return None
+        attr_fmt, attr_paths = layout
+        name = "_%s_value_" % attr.name
+        fmt += attr_fmt
+        if attr_paths is None:
+            paths.append((name,))
+        else:
+            paths.extend((name,) + path for path in attr_paths)
+    if not fmt:
+        return None
+    return fmt, tuple(paths)
+
+
 class _ListWrap(list, DetailNode):
     """A wrapper for list, which uses get_value and set_value for
-    getting and setting items of the basic type."""
+    getting and setting items of the basic type.
+
+    Elements of a fixed layout type may be stored as raw bytes by a
+    bulk read (see L{Array.read}); the elements are then only created
+    when they are first accessed."""
+
+    # _packed is ``None``, or a tuple C{(raw, byte_order, layout, count)}
+    # describing elements that have been read but not yet created
+    __slots__ = ("_parent", "_elementType", "_get_item_hook",
+                 "_set_item_hook", "_iter_item_hook", "_packed",
+                 "__weakref__")
+
+    _elementTypeTemplate = None
+    _elementTypeArgument = None
 
     def __init__(self, element_type, parent=None):
         self._parent = weakref.ref(parent) if parent else None
         self._elementType = element_type
+        self._packed = None
         # we link to the unbound methods (that is, self.__class__.xxx
         # instead of self.xxx) to avoid circular references!!
         if issubclass(element_type, BasicBase):
@@ -674,15 +966,48 @@ class _ListWrap(list, DetailNode):
             self._set_item_hook = self.__class__._not_implemented_hook
             self._iter_item_hook = self.__class__.iter_item
 
+    def _changed(self):
+        """Signal that elements were added, removed, or replaced, or
+        that a value of an element changed."""
+        if self._elementType._has_links:
+            BasicBase._link_generation += 1
+        if self._parent is not None:
+            parent = self._parent()
+            if parent is not None:
+                parent._changed()
+
     def __getitem__(self, index):
+        if self._packed is not None:
+            self._unpack()
         return self._get_item_hook(self, index)
 
     def __setitem__(self, index, value):
+        self._changed()
+        if self._packed is not None:
+            self._unpack()
         return self._set_item_hook(self, index, value)
 
+    def __delitem__(self, index):
+        self._changed()
+        if self._packed is not None:
+            self._unpack()
+        list.__delitem__(self, index)
+
     def __iter__(self):
+        if self._packed is not None:
+            self._unpack()
         return self._iter_item_hook(self)
 
+    def __reversed__(self):
+        if self._packed is not None:
+            self._unpack()
+        return list.__reversed__(self)
+
+    def __len__(self):
+        if self._packed is not None:
+            return self._packed[3]
+        return list.__len__(self)
+
     def __contains__(self, value):
         # ensure that the "in" operator uses self.__iter__() rather than
         # list.__iter__()
@@ -691,6 +1016,183 @@ class _ListWrap(list, DetailNode):
                 return True
         return False
 
+    def __eq__(self, other):
+        if self._packed is not None:
+            self._unpack()
+        return list.__eq__(self, other)
+
+    def __ne__(self, other):
+        if self._packed is not None:
+            self._unpack()
+        return list.__ne__(self, other)
+
+    def append(self, elem):
+        self._changed()
+        if self._packed is not None:
+            self._unpack()
+        list.append(self, elem)
+
+    def extend(self, elems):
+        self._changed()
+        if self._packed is not None:
+            self._unpack()
+        list.extend(self, elems)
+
+    def insert(self, index, elem):
+        self._changed()
+        if self._packed is not None:
+            self._unpack()
+        list.insert(self, index, elem)
+
+    def pop(self, *args):
+        self._changed()
+        if self._packed is not None:
+            self._unpack()
+        return list.pop(self, *args)
+
+    def remove(self, elem):
+        self._changed()
+        if self._packed is not None:
+            self._unpack()
+        list.remove(self, elem)
+
+    def _unpacking(name, changes=False):
+        """Return a wrapper for the list method C{name} which creates the
+        elements first, so the method never sees the empty list that
+        holds packed elements."""
+        method = getattr(list, name)
+
+        def wrapper(self, *args, **kwargs):
+            if changes:
+                self._changed()
+            if self._packed is not None:
+                self._unpack()
+            return method(self, *args, **kwargs)
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    __repr__ = _unpacking("__repr__")
+    __lt__ = _unpacking("__lt__")
+    __le__ = _unpacking("__le__")
+    __gt__ = _unpacking("__gt__")
+    __ge__ = _unpacking("__ge__")
+    __add__ = _unpacking("__add__")
+    __mul__ = _unpacking("__mul__")
+    __rmul__ = _unpacking("__rmul__")
+    index = _unpacking("index")
+    count = _unpacking("count")
+    copy = _unpacking("copy")
+    __iadd__ = _unpacking("__iadd__", changes=True)
+    __imul__ = _unpacking("__imul__", changes=True)
+    sort = _unpacking("sort", changes=True)
+    reverse = _unpacking("reverse", changes=True)
+    clear = _unpacking("clear", changes=True)
+    del _unpacking
+
+    def __reduce__(self):
+        """Pickle the parent itself rather than a weak reference to it,
+        and the elements rather than their values (which is what
+        iteration yields), as part of the state."""
+        state = {}
+        for klass in type(self).__mro__:
+            for name in klass.__dict__.get("__slots__", ()):
+                if name != "__weakref__" and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        if state["_parent"] is not None:
+            state["_parent"] = state["_parent"]()
+        if state["_packed"] is not None:
+            raw, byte_order, layout, count = state["_packed"]
+            state["_packed"] = (bytes(raw), byte_order, layout, count)
+        return (copyreg.__newobj__, (type(self),),
+                (state, list(list.__iter__(self))))
+
+    def __setstate__(self, state):
+        state, elements = state
+        for name, value in state.items():
+            setattr(self, name, value)
+        if self._parent is not None:
+            self._parent = weakref.ref(self._parent)
+        list.extend(self, elements)
+
+    def _unpack(self):
+        """Create the elements described by C{_packed}, which were read
+        in bulk but not yet accessed."""
+        raw, byte_order, layout, count = self._packed
+        self._packed = None
+        fmt, paths = layout
+        elements = []
+        for values in struct.Struct(byte_order + fmt).iter_unpack(raw):
+            elem = self._elementType(template=self._elementTypeTemplate,
+                                     argument=self._elementTypeArgument,
+                                     parent=self)
+            if paths is None:
+                elem._value = values[0]
+            else:
+                for path, value in zip(paths, values):
+                    leaf = elem
+                    for name in path:
+                        leaf = getattr(leaf, name)
+                    leaf._value = value
+            elements.append(elem)
+        list.extend(self, elements)
+
+    def _read_packed(self, stream, data, layout, count):
+        """Read C{count} elements of the given fixed layout in one go,
+        deferring the creation of the elements until they are accessed.
+        The elements are kept as a view on the buffer of a
+        L{BufferReader} which does not copy payloads, rather than a
+        copy."""
+        byte_order = data._byte_order
+        size = struct.calcsize(byte_order + layout[0]) * count
+        raw = _read_bytes(stream, size)
+        if len(raw) != size:
+            raise ValueError('unexpected end of stream (expected %i bytes but got %i)'
+                             % (size, len(raw)))
+        self._set_raw(raw, byte_order, layout, count)
+
+    def _set_raw(self, raw, byte_order, layout, count):
+        """Replace all elements by C{count} elements of the given fixed
+        layout, packed in C{raw}. The elements are only created when
+        they are accessed."""
+        self._changed()
+        list.__delitem__(self, slice(None))
+        self._packed = (raw, byte_order, layout, count)
+
+    def _get_raw(self, byte_order, layout):
+        """Return all elements packed with the given fixed layout.
+        Elements which have not been created yet are left alone."""
+        if self._packed is not None:
+            raw, packed_byte_order, packed_layout, count = self._packed
+            if packed_byte_order == byte_order and packed_layout == layout:
+                return raw
+            self._unpack()
+        fmt, paths = layout
+        values = []
+        for elem in list.__iter__(self):
+            if paths is None:
+                values.append(elem.get_value())
+                continue
+            for path in paths:
+                leaf = elem
+                for name in path:
+                    leaf = getattr(leaf, name)
+                values.append(leaf.get_value())
+        return struct.pack(byte_order + fmt * list.__len__(self), *values)
+
+    def _write_packed(self, stream, data):
+        """Write elements that were read in bulk and have not been
+        accessed since, if their layout is unchanged for C{data}. Returns
+        ``True`` if the elements were written, ``False`` otherwise."""
+        if self._packed is None:
+            return False
+        raw, byte_order, layout, count = self._packed
+        if (byte_order != data._byte_order
+                or layout != _get_fixed_layout(self._elementType, data)):
+            return False
+        stream.write(raw)
+        return True
+
     def _not_implemented_hook(self, *args):
         """A hook for members that are not implemented."""
         raise NotImplementedError
@@ -698,12 +1200,16 @@ class _ListWrap(list, DetailNode):
     def iter_basic_item(self):
         """Iterator which calls C{get_value()} on all items. Applies when
         the list has BasicBase elements."""
+        if self._packed is not None:
+            self._unpack()
         for elem in list.__iter__(self):
             yield elem.get_value()
 
     def iter_item(self):
         """Iterator over all items. Applies when the list does not have
         BasicBase elements."""
+        if self._packed is not None:
+            self._unpack()
         for elem in list.__iter__(self):
             yield elem
 
@@ -724,18 +1230,21 @@ class _ListWrap(list, DetailNode):
 
     def get_detail_child_nodes(self, edge_filter=EdgeFilter()):
         """Yield children."""
+        if self._packed is not None:
+            self._unpack()
         return (item for item in list.__iter__(self))
 
     def get_detail_child_names(self, edge_filter=EdgeFilter()):
         """Yield child names."""
-        return ("[%i]" % row for row in range(list.__len__(self)))
+        return ("[%i]" % row for row in range(self.__len__()))
 
 
 class Array(_ListWrap):
     """A general purpose class for 1 or 2 dimensional arrays consisting of
     either BasicBase or StructBase elements."""
 
-    arg = None  # default argument
+    __slots__ = ("_elementTypeTemplate", "_elementTypeArgument",
+                 "_count1", "_count2", "arg")
 
     def __init__(self,
                  element_type=None,
@@ -769,6 +1278,7 @@ class Array(_ListWrap):
         self._elementTypeArgument = element_type_argument
         self._count1 = count1
         self._count2 = count2
+        self.arg = None  # default argument
 
         if self._count2 is None:
             for i in range(self._len1()):
@@ -839,7 +1349,7 @@ class Array(_ListWrap):
     def __str__(self):
         text = '%s instance at 0x%08X\n' % (self.__class__, id(self))
         if self._count2 is None:
-            for i, element in enumerate(list.__iter__(self)):
+            for i, element in enumerate(self._elementList()):
                 if i > 16:
                     text += "etc...\n"
                     break
@@ -849,6 +1359,8 @@ class Array(_ListWrap):
         else:
             k = 0
             for i, elemlist in enumerate(list.__iter__(self)):
+                if elemlist._packed is not None:
+                    elemlist._unpack()
                 for j, elem in enumerate(list.__iter__(elemlist)):
                     if k > 16:
                         text += "etc...\n"
@@ -865,6 +1377,17 @@ class Array(_ListWrap):
         """Update the array size. Call this function whenever the size
         parameters change in C{parent}."""
         # TODO: also update row numbers
+        self._changed()
+        if self._packed is not None:
+            self._unpack()
+        # the argument may have changed since the array was created
+        parent = self._parent() if self._parent is not None else None
+        if isinstance(parent, StructBase):
+            for attr in parent._attribute_list:
+                if getattr(parent, "_%s_value_" % attr.name, None) is self:
+                    self.arg = parent._get_attribute_argument(attr)
+                    break
+        self._update_element_argument()
         old_size = len(self)
         new_size = self._len1()
         if self._count2 is None:
@@ -881,8 +1404,10 @@ class Array(_ListWrap):
                 del self[new_size:old_size]
             else:
                 for i in range(new_size - old_size):
-                    self.append(_ListWrap(self._elementType))
+                    self.append(_ListWrap(self._elementType, parent=self))
             for i, elemlist in enumerate(list.__iter__(self)):
+                if elemlist._packed is not None:
+                    elemlist._unpack()
                 old_size_i = len(elemlist)
                 new_size_i = self._len2(i)
                 if new_size_i < old_size_i:
@@ -895,16 +1420,24 @@ class Array(_ListWrap):
                         elemlist.append(elem)
 
     def read(self, stream, data):
-        """Read array from stream."""
+        """Read array from stream. Elements with a fixed layout (see
+        L{_get_fixed_layout}) are read in bulk, and only created when
+        they are accessed."""
+        self._changed()
         # parse arguments
         self._elementTypeArgument = self.arg
         # check array size
         len1 = self._len1()
         if len1 > 0x10000000:
             raise ValueError('array too long (%i)' % len1)
+        self._packed = None
         del self[0:self.__len__()]
+        layout = _get_fixed_layout(self._elementType, data)
         # read array
         if self._count2 is None:
+            if layout is not None:
+                self._read_packed(stream, data, layout, len1)
+                return
             for i in range(len1):
                 elem = self._elementType(template=self._elementTypeTemplate,
                                          argument=self._elementTypeArgument,
@@ -918,6 +1451,10 @@ class Array(_ListWrap):
                 if len2i > 0x10000000:
                     raise ValueError('array too long (%i)' % len2i)
                 elemlist = _ListWrap(self._elementType, parent=self)
+                if layout is not None:
+                    elemlist._read_packed(stream, data, layout, len2i)
+                    self.append(elemlist)
+                    continue
                 for j in range(len2i):
                     elem = self._elementType(
                         template=self._elementTypeTemplate,
@@ -929,7 +1466,7 @@ class Array(_ListWrap):
 
     def write(self, stream, data):
         """Write array to stream."""
-        self._elementTypeArgument = self.arg
+        self._update_element_argument()
         len1 = self._len1()
         if len1 != self.__len__():
             raise ValueError('array size (%i) different from to field describing number of elements (%i)'
@@ -940,7 +1477,9 @@ class Array(_ListWrap):
         if len1 > 0x10000000:
             raise ValueError('array too long (%i)' % len1)
         if self._count2 is None:
-            for elem in list.__iter__(self):
+            if self._write_packed(stream, data):
+                return
+            for elem in self._elementList():
                 elem.write(stream, data)
         else:
             for i, elemlist in enumerate(list.__iter__(self)):
@@ -953,9 +1492,162 @@ class Array(_ListWrap):
                                      )
                 if len2i > 0x10000000:
                     raise ValueError('array too long (%i)' % len2i)
+                if elemlist._write_packed(stream, data):
+                    continue
+                if elemlist._packed is not None:
+                    elemlist._unpack()
                 for elem in list.__iter__(elemlist):
                     elem.write(stream, data)
 
+    def _update_element_argument(self):
+        """Pass the argument of the array on to its elements, which may
+        have been created with an older argument (for instance, keys
+        created by L{update_size} before their type was set).
+
+        >>> from io import BytesIO
+        >>> from pyffi.formats.nif import NifFormat
+        >>> kfd = NifFormat.NiKeyframeData()
+        >>> kfd.translations.num_keys = 2
+        >>> kfd.translations.keys.update_size()
+        >>> kfd.translations.interpolation = NifFormat.KeyType.QUADRATIC
+        >>> kfd.translations.keys[1].forward.x = 0.5
+        >>> for version in (0x04000002, 0x0A000100, 0x14020007):
+        ...     data = NifFormat.Data(version=version)
+        ...     data.roots = [kfd]
+        ...     stream = BytesIO()
+        ...     data.write(stream)
+        ...     _ = stream.seek(0)
+        ...     data = NifFormat.Data()
+        ...     data.read(stream)
+        ...     print(data.roots[0].translations.keys[1].forward.x)
+        0.5
+        0.5
+        0.5
+        >>> kfd.num_rotation_keys = 1
+        >>> kfd.quaternion_keys.update_size()
+        >>> kfd.rotation_type = NifFormat.KeyType.TENSION_BIAS_CONTINUITY
+        >>> kfd.quaternion_keys.update_size()
+        >>> kfd.quaternion_keys[0].arg
+        3
+        """
+        self._elementTypeArgument = self.arg
+        if self._count2 is None:
+            elemlists = (self,)
+        else:
+            elemlists = list.__iter__(self)
+        for elemlist in elemlists:
+            # elements read in bulk have a fixed layout, which takes
+            # no argument
+            if elemlist._packed is not None:
+                continue
+            for elem in list.__iter__(elemlist):
+                if self.arg is not None or elem.arg is not None:
+                    elem.arg = self.arg
+
+    def _get_raw_layout(self):
+        """Return the fixed layout of the elements, for L{get_raw} and
+        L{set_raw}."""
+        layout = _get_fixed_layout(self._elementType, None)
+        if layout is None:
+            raise TypeError('%s elements have no fixed layout'
+                            % self._elementType.__name__)
+        return layout
+
+    def get_raw(self, byte_order="<"):
+        """Return all elements packed in their fixed layout (see
+        L{_get_fixed_layout}), which should not depend on the version.
+        The rows of a two dimensional array follow one another. Elements
+        that were read in bulk and not accessed since are not created.
+
+        >>> from pyffi.formats.nif import NifFormat
+        >>> geomdata = NifFormat.NiGeometryData()
+        >>> geomdata.num_vertices = 2
+        >>> geomdata.vertices.update_size()
+        >>> geomdata.vertices[1].z = 0.5
+        >>> struct.unpack('<6f', geomdata.vertices.get_raw())
+        (0.0, 0.0, 0.0, 0.0, 0.0, 0.5)
+
+        :param byte_order: The byte order, as in the C{struct} module.
+        :type byte_order: C{str}
+        :return: The packed elements.
+        :rtype: C{bytes}
+        """
+        raw = self._get_raw_rows(byte_order)
+        return raw if isinstance(raw, bytes) else bytes(raw)
+
+    def get_buffer(self, byte_order="<"):
+        """Like L{get_raw}, but return a read only buffer. Elements that
+        were read in bulk and not accessed since are not copied, unless
+        the array has more than one row.
+
+        >>> from pyffi.formats.nif import NifFormat
+        >>> pixeldata = NifFormat.NiPixelData()
+        >>> pixeldata.num_faces = 1
+        >>> pixeldata.num_pixels = 4
+        >>> pixeldata.pixel_data.set_raw(b'rgba')
+        >>> buf = pixeldata.pixel_data.get_buffer()
+        >>> buf.obj is pixeldata.pixel_data[0]._packed[0]
+        True
+        >>> buf.tobytes()
+        b'rgba'
+
+        :param byte_order: The byte order, as in the C{struct} module.
+        :type byte_order: C{str}
+        :return: The packed elements.
+        :rtype: C{memoryview}
+        """
+        return memoryview(self._get_raw_rows(byte_order)).toreadonly()
+
+    def _get_raw_rows(self, byte_order):
+        """Return all rows packed, for L{get_raw} and L{get_buffer}."""
+        layout = self._get_raw_layout()
+        if self._count2 is None:
+            return self._get_raw(byte_order, layout)
+        if list.__len__(self) == 1:
+            return list.__getitem__(self, 0)._get_raw(byte_order, layout)
+        return b"".join(elemlist._get_raw(byte_order, layout)
+                        for elemlist in list.__iter__(self))
+
+    def set_raw(self, raw, byte_order="<"):
+        """Replace all elements by the elements packed in C{raw}, as
+        returned by L{get_raw}. The size of the array is taken from the
+        fields of the parent which describe it, so these must be set
+        first. The elements are only created when they are accessed.
+
+        >>> from pyffi.formats.nif import NifFormat
+        >>> geomdata = NifFormat.NiGeometryData()
+        >>> geomdata.num_vertices = 1
+        >>> geomdata.vertices.set_raw(struct.pack('<3f', 1, 2, 3))
+        >>> print(geomdata.vertices[0])
+        [ 1.000  2.000  3.000]
+
+        :param raw: The packed elements.
+        :type raw: C{bytes}
+        :param byte_order: The byte order, as in the C{struct} module.
+        :type byte_order: C{str}
+        """
+        layout = self._get_raw_layout()
+        size = struct.calcsize(byte_order + layout[0])
+        if self._count2 is None:
+            counts = [self._len1()]
+        else:
+            counts = [self._len2(i) for i in range(self._len1())]
+        if len(raw) != size * sum(counts):
+            raise ValueError('expected %i bytes but got %i'
+                             % (size * sum(counts), len(raw)))
+        if self._count2 is None:
+            self._set_raw(raw, byte_order, layout, counts[0])
+            return
+        self._packed = None
+        list.__delitem__(self, slice(None))
+        pos = 0
+        for count in counts:
+            elemlist = _ListWrap(self._elementType, parent=self)
+            elemlist._set_raw(raw[pos:pos + size * count],
+                              byte_order, layout, count)
+            list.append(self, elemlist)
+            pos += size * count
+
     def fix_links(self, data):
         """Fix the links in the array by calling C{fix_links} on all elements
         of the array."""
@@ -996,13 +1688,34 @@ class Array(_ListWrap):
 
     def get_size(self, data=None):
         """Calculate the sum of the size of all elements in the array."""
-        return sum(
-            (elem.get_size(data) for elem in self._elementList()), 0)
+        self._update_element_argument()
+        if self._count2 is None:
+            elemlists = (self,)
+        else:
+            elemlists = list.__iter__(self)
+        size = 0
+        for elemlist in elemlists:
+            packed = elemlist._packed
+            if (packed is not None and data is not None
+                    and packed[1] == data._byte_order
+                    and packed[2] == _get_fixed_layout(self._elementType, data)):
+                size += len(packed[0])
+                continue
+            if packed is not None:
+                elemlist._unpack()
+            size += sum(
+                (elem.get_size(data) for elem in list.__iter__(elemlist)), 0)
+        return size
 
     def get_hash(self, data=None):
-        """Calculate a hash value for the array, as a tuple."""
+        """Calculate a hash value for the array, as a tuple. Every
+        element is linked to the array, so a change of the element
+        invalidates the hash of the structure holding the array (see
+        L{StructBase.get_hash})."""
+        link = _HashLink(self)
         hsh = []
         for elem in self._elementList():
+            elem._parent = link
             hsh.append(elem.get_hash(data))
         return tuple(hsh)
 
@@ -1011,12 +1724,21 @@ class Array(_ListWrap):
         for elem in self._elementList():
             elem.replace_global_node(oldbranch, newbranch, **kwargs)
 
+    def replace_global_nodes(self, replacements, **kwargs):
+        """Replace given branches in all elements, without recursion."""
+        for elem in self._elementList():
+            elem.replace_global_nodes(replacements, **kwargs)
+
     def _elementList(self, **kwargs):
         """Generator for listing all elements."""
         if self._count2 is None:
+            if self._packed is not None:
+                self._unpack()
             for elem in list.__iter__(self):
                 yield elem
         else:
             for elemlist in list.__iter__(self):
+                if elemlist._packed is not None:
+                    elemlist._unpack()
                 for elem in list.__iter__(elemlist):
                     yield elem
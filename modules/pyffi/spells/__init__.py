@@ -137,20 +137,33 @@ the file format class of the files it can toast.
 
 from configparser import ConfigParser
 from copy import deepcopy
-from io import StringIO
+from io import BytesIO, StringIO
+import base64  # b64encode, for --manifest
+import collections  # deque
 import gc
-
+import hashlib  # sha1, for --manifest
+import csv  # writer, for --profile
+import json  # dumps, for --catalog, --manifest, and --profile
 import logging  # Logger
 import concurrent.futures  # ProcessPoolExecutor
-import multiprocessing  # current_process, cpu_count
+import multiprocessing  # cpu_count, Process, Queue
+import queue  # Empty, Full
 import optparse
 import os  # remove
 import os.path  # getsize, split, join
+import pickle  # dumps, for --manifest
 import re  # for regex parsing (--skip, --only)
 import shlex  # shlex.split for parsing option lists in ini files
 import subprocess
 import sys  # sys.stdout
 import tempfile
+import time  # perf_counter, for --profile
+import traceback  # format_exc
+try:
+    import resource  # getrusage, for --profile
+except ImportError:
+    # not available on all platforms
+    resource = None
 
 import pyffi  # for pyffi.__version__
 import pyffi.object_models  # pyffi.object_models.FileFormat
@@ -210,6 +223,21 @@ class Spell(object):
         self.stream = stream
         self.toaster = toaster if toaster else Toaster()
 
+    def _call_hook(self, name, *args):
+        """Call the method *name* of the spell, such as :meth:`branchentry`,
+        with the given arguments, and time it if the toaster has a
+        :attr:`Toaster.profile`.
+
+        :param name: The name of the method.
+        :type name: ``str``
+        :return: The return value of the method.
+        """
+        profile = self.toaster.profile
+        if profile is None:
+            return getattr(self, name)(*args)
+        return profile.call("%s:%s" % (self.SPELLNAME, name),
+                            getattr(self, name), *args)
+
     def _datainspect(self):
         """This is called after :meth:`pyffi.object_models.FileFormat.Data.inspect` has
         been called, and before :meth:`pyffi.object_models.FileFormat.Data.read` is
@@ -284,13 +312,13 @@ class Spell(object):
         if branch is self.data:
             self.toaster.msgblockbegin(
                 "--- %s ---" % self.SPELLNAME)
-            if self.dataentry():
+            if self._call_hook("dataentry"):
                 # spell returned True so recurse to children
                 # we use the abstract tree functions to parse the tree
                 # these are format independent!
                 for child in branch.get_global_child_nodes():
                     self.recurse(child)
-                self.dataexit()
+                self._call_hook("dataexit")
             self.toaster.msgblockend()
         elif self._branchinspect(branch) and self.branchinspect(branch):
             self.toaster.msgblockbegin(
@@ -298,13 +326,13 @@ class Spell(object):
                 % (branch.__class__.__name__,
                    branch.get_global_display()))
             # cast the spell on the branch
-            if self.branchentry(branch):
+            if self._call_hook("branchentry", branch):
                 # spell returned True so recurse to children
                 # we use the abstract tree functions to parse the tree
                 # these are format independent!
                 for child in branch.get_global_child_nodes():
                     self.recurse(child)
-                self.branchexit(branch)
+                self._call_hook("branchexit", branch)
             self.toaster.msgblockend()
 
     def dataentry(self):
@@ -390,6 +418,60 @@ class Spell(object):
         """
         pass
 
+    @classmethod
+    def toaststate(cls, toaster):
+        """Called in a worker process, when it has finished processing
+        its files, instead of :meth:`toastexit`. The state returned is
+        sent to the toaster in the main process, which passes it on to
+        :meth:`toastmerge`. The default implementation returns ``None``.
+
+        If you aggregate statistics data in :meth:`toastentry`, then
+        override this function and :meth:`toastmerge`, so that
+        :meth:`toastexit` reports on all files when running with more
+        than one job.
+
+        :param toaster: The toaster this spell is called from.
+        :type toaster: :class:`Toaster`
+        :return: The statistics data of the spell, which must be
+            picklable.
+        """
+        return None
+
+    @classmethod
+    def toastmerge(cls, toaster, state):
+        """Called in the main process, for every worker process, with
+        the state returned by :meth:`toaststate` in that worker, before
+        :meth:`toastexit` is called once. The default implementation
+        does nothing.
+
+        >>> import logging, os, tempfile
+        >>> import pyffi.spells.nif
+        >>> import pyffi.spells.nif.check
+        >>> from pyffi.formats.nif import NifFormat
+        >>> class NifToaster(pyffi.spells.nif.NifToaster):
+        ...     SPELLS = [pyffi.spells.nif.check.SpellCheckVersion]
+        >>> folder = tempfile.mkdtemp()
+        >>> data = NifFormat.Data(version=0x14000005)
+        >>> data.roots = [NifFormat.NiNode()]
+        >>> for i in range(4):
+        ...     with open(os.path.join(folder, "%i.nif" % i), "wb") as stream:
+        ...         data.write(stream)
+        >>> toaster = NifToaster(
+        ...     spellnames=["check_version"], options=dict(jobs=2),
+        ...     logger=logging.getLogger("pyffi.toaster.test"))
+        >>> toaster.toast(folder)
+        >>> toaster.versions
+        {335544325: 4}
+        >>> for i in range(4):
+        ...     os.remove(os.path.join(folder, "%i.nif" % i))
+        >>> os.rmdir(folder)
+
+        :param toaster: The toaster this spell is called from.
+        :type toaster: :class:`Toaster`
+        :param state: The state returned by :meth:`toaststate`.
+        """
+        pass
+
     @classmethod
     def get_toast_stream(cls, toaster, filename, test_exists=False):
         """Returns the stream that the toaster will write to. The
@@ -408,7 +490,8 @@ class Spell(object):
 class SpellGroupBase(Spell):
     """Base class for grouping spells. This implements all the spell grouping
     functions that fall outside of the actual recursing (:meth:`__init__`,
-    :meth:`toastentry`, :meth:`_datainspect`, :meth:`datainspect`, and :meth:`toastexit`).
+    :meth:`toastentry`, :meth:`_datainspect`, :meth:`datainspect`,
+    :meth:`toastexit`, :meth:`toaststate`, and :meth:`toastmerge`).
     """
 
     SPELLCLASSES = []
@@ -442,7 +525,7 @@ class SpellGroupBase(Spell):
         """Inspect every spell with L{Spell.datainspect} and keep
         those spells that must be cast."""
         self.spells = [spell for spell in self.spells
-                       if spell.datainspect()]
+                       if spell._call_hook("datainspect")]
         return bool(self.spells)
 
     @classmethod
@@ -457,6 +540,16 @@ class SpellGroupBase(Spell):
         for spellclass in cls.ACTIVESPELLCLASSES:
             spellclass.toastexit(toaster)
 
+    @classmethod
+    def toaststate(cls, toaster):
+        return [spellclass.toaststate(toaster)
+                for spellclass in cls.ACTIVESPELLCLASSES]
+
+    @classmethod
+    def toastmerge(cls, toaster, state):
+        for spellclass, spellstate in zip(cls.ACTIVESPELLCLASSES, state):
+            spellclass.toastmerge(toaster, spellstate)
+
 
 class SpellGroupSeriesBase(SpellGroupBase):
     """Base class for running spells in series."""
@@ -498,22 +591,23 @@ class SpellGroupParallelBase(SpellGroupBase):
     def branchentry(self, branch):
         """Run all spells."""
         # not using any: we want all entry code to be executed
-        return bool([spell.branchentry(branch) for spell in self.spells])
+        return bool([spell._call_hook("branchentry", branch)
+                     for spell in self.spells])
 
     def branchexit(self, branch):
         for spell in self.spells:
-            spell.branchexit(branch)
+            spell._call_hook("branchexit", branch)
 
     def dataentry(self):
         """Look into every spell with :meth:`Spell.dataentry`."""
         self.spells = [spell for spell in self.spells
-                       if spell.dataentry()]
+                       if spell._call_hook("dataentry")]
         return bool(self.spells)
 
     def dataexit(self):
         """Look into every spell with :meth:`Spell.dataexit`."""
         for spell in self.spells:
-            spell.dataexit()
+            spell._call_hook("dataexit")
 
     @property
     def changed(self):
@@ -585,6 +679,10 @@ class fake_logger:
         if level >= cls.level:
             print("pyffi.toaster:%s:%s" % (level_str, msg))
 
+    @classmethod
+    def log(cls, level, msg):
+        cls._log(level, logging.getLevelName(level), msg)
+
     @classmethod
     def error(cls, msg):
         cls._log(logging.ERROR, "ERROR", msg)
@@ -606,38 +704,424 @@ class fake_logger:
         cls.level = level
 
 
-def _toaster_job(args):
+class _RecordingLogger(object):
+    """Logger which passes all messages on to another logger, and also
+    keeps them, along with their level, so they can be logged again
+    when the file is found unchanged in the manifest (see
+    :meth:`Toaster.load_manifest`).
+
+    >>> logger = _RecordingLogger(fake_logger)
+    >>> logger.warn("bad")
+    pyffi.toaster:WARNING:bad
+    >>> logger.records
+    [(30, 'bad')]
+    """
+
+    LEVELS = dict(debug=logging.DEBUG, info=logging.INFO,
+                  warn=logging.WARNING, warning=logging.WARNING,
+                  error=logging.ERROR, critical=logging.CRITICAL)
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.records = []
+
+    def log(self, level, msg):
+        self.records.append((level, msg))
+        self.logger.log(level, msg)
+
+    def __getattr__(self, name):
+        level = self.LEVELS.get(name)
+        if level is None:
+            return getattr(self.logger, name)
+
+        def log(msg):
+            self.records.append((level, msg))
+            getattr(self.logger, name)(msg)
+        return log
+
+
+class ToastProfile(object):
+    """Timers for the phases of toasting, and for the methods of every
+    spell, along with the time and peak memory use of every file.
+    A toaster keeps one as :attr:`Toaster.profile` if the profile
+    option is set.
+
+    >>> profile = ToastProfile()
+    >>> profile.call("check:branchentry", max, 1, 2)
+    2
+    >>> profile.add("check:branchentry", 0.5)
+    >>> profile.timers["check:branchentry"][0]
+    2
+    >>> other = ToastProfile()
+    >>> other.add("read", 1.5)
+    >>> other.add_file("a.nif", dict(read=1.5))
+    >>> profile.merge(other.get_state())
+    >>> sorted(profile.timers)
+    ['check:branchentry', 'read']
+    >>> profile.files["a.nif"]["read"]
+    1.5
+
+    The profile option can be given on the command line:
+
+    >>> import os, sys, tempfile
+    >>> import pyffi.spells.nif
+    >>> import pyffi.spells.nif.check
+    >>> from pyffi.formats.nif import NifFormat
+    >>> class NifToaster(pyffi.spells.nif.NifToaster):
+    ...     SPELLS = [pyffi.spells.nif.check.SpellCheckVersion]
+    >>> folder = tempfile.mkdtemp()
+    >>> data = NifFormat.Data(version=0x14000005)
+    >>> data.roots = [NifFormat.NiNode()]
+    >>> with open(os.path.join(folder, "test.nif"), "wb") as stream:
+    ...     data.write(stream)
+    >>> csvname = os.path.join(folder, "profile.csv")
+    >>> toaster = NifToaster(logger=fake_logger)
+    >>> sys.argv = ["niftoaster.py", "--profile=%s" % csvname, "--jobs=1",
+    ...             "check_version", folder]
+    >>> toaster.cli() # doctest: +ELLIPSIS
+    pyffi.toaster:INFO:=== .../test.nif ===
+    ...
+    pyffi.toaster:INFO:Finished.
+    >>> sorted(toaster.profile.timers)
+    ['check_version:datainspect', 'inspect']
+    >>> with open(csvname) as stream:
+    ...     print(stream.readline().strip())
+    kind,name,count,seconds,inspect,read,spells,write,peak_rss
+    >>> os.remove(csvname)
+    >>> os.remove(os.path.join(folder, "test.nif"))
+    >>> os.rmdir(folder)
+    """
+
+    CSV_FIELDS = ("kind", "name", "count", "seconds",
+                  "inspect", "read", "spells", "write", "peak_rss")
+    """The columns of the profile, when written as CSV."""
+
+    def __init__(self):
+        self.timers = {}
+        """Maps timer name to the number of calls and the total time,
+        in seconds, as ``list``."""
+        self.files = {}
+        """Maps file name to the time of every phase, in seconds, and
+        the peak memory use of the process, in kilobytes, after the file
+        was toasted (``None`` if unknown), as ``dict``."""
+
+    def add(self, name, seconds, count=1):
+        """Add a time to a timer.
+
+        :param name: The name of the timer.
+        :type name: ``str``
+        :param seconds: The time to add.
+        :type seconds: ``float``
+        :param count: The number of calls to add.
+        :type count: ``int``
+        """
+        timer = self.timers.get(name)
+        if timer is None:
+            self.timers[name] = [count, seconds]
+        else:
+            timer[0] += count
+            timer[1] += seconds
+
+    def call(self, name, func, *args):
+        """Call *func* with the given arguments, and add the time it
+        took to a timer.
+
+        :param name: The name of the timer.
+        :type name: ``str``
+        :return: The return value of *func*.
+        """
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add_file(self, filename, phases):
+        """Record the time of every phase of toasting a file, along with
+        the current peak memory use.
+
+        :param filename: The name of the file.
+        :type filename: ``str``
+        :param phases: Maps phase name to time, in seconds.
+        :type phases: ``dict``
+        """
+        record = dict(phases)
+        record["seconds"] = sum(phases.values())
+        if resource is not None:
+            record["peak_rss"] = resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss
+        else:
+            record["peak_rss"] = None
+        self.files[filename] = record
+
+    def get_state(self):
+        """Return all timers and files, so they can be merged into
+        another profile, for instance in another process.
+        """
+        return {"timers": self.timers, "files": self.files}
+
+    def merge(self, state):
+        """Merge timers and files from another profile.
+
+        :param state: The timers and files, as returned by
+            :meth:`get_state`.
+        :type state: ``dict``
+        """
+        for name, (count, seconds) in state["timers"].items():
+            self.add(name, seconds, count=count)
+        self.files.update(state["files"])
+
+    def write(self, filename):
+        """Write the profile to a file, as CSV if the file name ends
+        with ``.csv``, and as JSON otherwise.
+
+        :param filename: The name of the file.
+        :type filename: ``str``
+        """
+        with open(filename, "w", newline="") as stream:
+            if not filename.lower().endswith(".csv"):
+                json.dump(
+                    {"timers": dict(
+                        (name, {"count": count, "seconds": seconds})
+                        for name, (count, seconds) in self.timers.items()),
+                     "files": self.files},
+                    stream, indent=1, sort_keys=True)
+                return
+            writer = csv.DictWriter(stream, self.CSV_FIELDS, restval="")
+            writer.writeheader()
+            for name, (count, seconds) in sorted(self.timers.items()):
+                writer.writerow(
+                    dict(kind="timer", name=name, count=count,
+                         seconds=seconds))
+            for name, record in sorted(self.files.items()):
+                writer.writerow(dict(record, kind="file", name=name,
+                                     count=1))
+
+
+class _ArchiveMemberStream(BytesIO):
+    """An in-memory copy of an archive member, which the toaster reads
+    from, and writes back to, as if it were a file.
+
+    >>> stream = _ArchiveMemberStream("meshes/a.nif", b"abc")
+    >>> stream.name, stream.read()
+    ('meshes/a.nif', b'abc')
+    >>> stream.close()
+    >>> stream.getvalue()
+    b'abc'
+    """
+
+    def __init__(self, name, raw):
+        BytesIO.__init__(self, raw)
+        self.name = name
+
+    def close(self):
+        """Keep the data after writing, until the toaster has
+        collected it."""
+        pass
+
+class _ArchiveWriter(object):
+    """The writer stage of :meth:`Toaster.toast_archives`. Archives and
+    their members are added in order, as they are extracted, and are
+    passed on in that same order, as soon as every member before them
+    is toasted: the results of the toasted members are passed on to the
+    toaster, and every archive is written back once all of its members
+    are in. Unless the spell writes back archives, the data of the
+    members is not kept.
+    """
+
+    def __init__(self, toaster):
+        self.toaster = toaster
+        # archives and members not passed on yet, in order
+        self._pending = collections.deque()
+        # data and worker results of toasted members not passed on yet
+        self._results = {}
+        # the archive being passed on, with its members so far
+        self._archive = None
+        self._members = []
+        self._changed = False
+
+    def begin_archive(self, archive_class, filename):
+        """Add the start of an archive."""
+        self._pending.append(("begin", archive_class, filename))
+        self.flush()
+
+    def end_archive(self, error=None):
+        """Add the end of the last archive, and if *error* is given,
+        log it instead of writing the archive.
+        """
+        self._pending.append(("end", error))
+        self.flush()
+
+    def add_member(self, name, raw, task=None):
+        """Add a member of the last archive, with the name of its task
+        if it is toasted (see :meth:`add_result`).
+        """
+        self._pending.append((
+            "member", name,
+            None if self.toaster.spellclass.READONLY else raw, task))
+        self.flush()
+
+    def add_result(self, task, data, result=None):
+        """Add the changed data of a toasted member, if any, along with
+        the result of its worker, if it was toasted by one, as a tuple
+        ``(info, records)`` (see :func:`_toaster_worker`).
+        """
+        self._results[task] = (data, result)
+        self.flush()
+
+    def flush(self):
+        """Pass on all archives and members which are ready."""
+        toaster = self.toaster
+        while self._pending:
+            item = self._pending[0]
+            if item[0] == "member" and item[3] is not None:
+                if item[3] not in self._results:
+                    return
+            self._pending.popleft()
+            if item[0] == "begin":
+                self._archive = item[1:]
+                self._members = []
+                self._changed = False
+                toaster.msgblockbegin("=== %s ===" % item[2])
+            elif item[0] == "member":
+                kind, name, raw, task = item
+                data = None
+                if task is not None:
+                    data, result = self._results.pop(task)
+                    if result is not None:
+                        toaster._pass_on_result(*result, name=task)
+                if not toaster.spellclass.READONLY:
+                    self._members.append(
+                        (name, raw if data is None else data))
+                    self._changed = self._changed or data is not None
+            else:
+                try:
+                    if item[1] is not None:
+                        toaster.logger.warn(item[1])
+                    elif self._changed:
+                        toaster._write_archive(*self._archive,
+                                               members=self._members)
+                finally:
+                    self._archive = None
+                    self._members = []
+                    toaster.msgblockend()
+
+def _toaster_worker(toasterclass, spellclass, options, spellnames,
+                    tasks, results):
     """For multiprocessing. This function creates a new toaster, with the
-    given options and spells, and calls the toaster on filename.
+    given options and spells (or deprecated spell class), and calls the
+    toaster on every task taken from the *tasks* queue, until it gets
+    ``None``. A task is either a file name, or the name and the data of
+    an archive member, as a ``tuple``. The toaster, and so the state of
+    the spells, is kept for all tasks.
+
+    Everything is sent back on the *results* queue, as tuples
+    ``(kind, name, info, records)``, where *records* are the
+    ``(level, msg)`` pairs logged meanwhile, and *info* is a ``dict``:
+
+    * if *kind* is ``"file"``, for every task, *info* has the keys
+      ``"status"`` (``"done"`` if the file was toasted, ``"skipped"``
+      if the spell does not apply or the file was skipped, or
+      ``"failed"``),
+      ``"reports"`` (the reports of the spell if done), ``"entry"`` (the
+      manifest entry, if any, see :meth:`Toaster.load_manifest`),
+      ``"profile"`` (the :class:`ToastProfile` state, if any), and
+      ``"data"`` (for archive members, the changed data, if any, see
+      :meth:`Toaster.toast_member`);
+    * if *kind* is ``"exit"``, when all tasks are done, *info* has the
+      keys ``"profile"`` (the state of the timers, if any), and
+      ``"state"`` (the statistics data of the spell, see
+      :meth:`Spell.toaststate`, if any files were toasted). The toast
+      exit code is not run by the worker: the toaster merges the
+      statistics data of all workers, and runs it once.
     """
+    records = []
 
     class multiprocessing_fake_logger(fake_logger):
-        """Simple logger which works well along with multiprocessing
-        on all platforms.
+        """Simple logger which keeps the messages, to send them back
+        to the parent process.
         """
         @classmethod
         def _log(cls, level, level_str, msg):
-            # do not actually log, just print
             if level >= cls.level:
-                print("pyffi.toaster:%i:%s:%s"
-                      % (multiprocessing.current_process().pid,
-                         level_str, msg))
+                records.append((level, msg))
 
-    toasterclass, filename, options, spellnames = args
-    toaster = toasterclass(options=options, spellnames=spellnames,
+    toaster = toasterclass(spellclass=spellclass, options=options,
+                           spellnames=spellnames,
                            logger=multiprocessing_fake_logger)
 
     # toast entry code
-    if not toaster.spellclass.toastentry(toaster):
-        multiprocessing_fake_logger.msg("spell does not apply! quiting early...")
-        return
-
-    # toast single file
-    stream = open(filename, mode='rb' if toaster.spellclass.READONLY else 'r+b')
-    toaster._toast(stream)
-
-    # toast exit code
-    toaster.spellclass.toastexit(toaster)
+    active = toaster.spellclass.toastentry(toaster)
+    if not active:
+        multiprocessing_fake_logger.info("spell does not apply! quiting early...")
+    toaster.load_manifest()
+    toasted = False
+    for task in iter(tasks.get, None):
+        if isinstance(task, tuple):
+            name, raw = task
+        else:
+            name, raw = task, None
+        data = None
+        if active:
+            # toast single file
+            toasted = True
+            try:
+                if raw is not None:
+                    data = toaster.toast_member(name, raw)
+                else:
+                    with open(name, mode='rb' if toaster.spellclass.READONLY
+                              else 'r+b') as stream:
+                        toaster._toast(stream)
+            except Exception:
+                # only raised with the raisetesterror option,
+                # or if the file cannot be opened
+                toaster.files_failed.add(name)
+                multiprocessing_fake_logger.error(traceback.format_exc())
+        info = dict(data=data, entry=None, profile=None)
+        if name in toaster.files_failed:
+            info.update(status="failed", reports=None)
+        elif name in toaster.files_done:
+            info.update(status="done", reports=toaster.files_done.pop(name))
+        else:
+            # not toasted, as the spell does not apply, or the file was
+            # skipped
+            info.update(status="skipped", reports=None)
+        toaster.files_failed.discard(name)
+        toaster.files_skipped.discard(name)
+        if toaster.manifest is not None:
+            info["entry"] = toaster.manifest["files"].pop(name, None)
+        if toaster.profile is not None:
+            info["profile"] = {"timers": {}, "files": {}}
+            if name in toaster.profile.files:
+                info["profile"]["files"][name] = toaster.profile.files.pop(
+                    name)
+        results.put(("file", name, info, records[:]))
+        del records[:]
+        if options["gccollect"]:
+            # force free memory (helps when parsing many files)
+            gc.collect()
+
+    # statistics data for the toast exit code, only if there is
+    # something to report on
+    info = dict(profile=None, state=None)
+    if toasted:
+        toaster._merge_file_states()
+        info["state"] = toaster.spellclass.toaststate(toaster)
+    if toaster.profile is not None:
+        info["profile"] = {"timers": toaster.profile.timers, "files": {}}
+    results.put(("exit", None, info, records[:]))
+
+def _catalog_job(args):
+    """For multiprocessing. This function inspects the catalog of the given
+    file, and returns the filename along with the catalog record, or
+    ``None`` if the file could not be inspected.
+    """
+    fileformat, filename = args
+    try:
+        with open(filename, mode='rb') as stream:
+            return filename, fileformat.Data().inspect_catalog(stream)
+    except Exception:
+        return filename, None
 
 # CPU_COUNT is used for default number of jobs
 if multiprocessing:
@@ -680,6 +1164,7 @@ class Toaster(object):
                            prefix="",
                            suffix="",
                            arg="",
+                           catalog=False,
                            createpatch=False,
                            applypatch=False,
                            diffcmd="",
@@ -694,7 +1179,9 @@ class Toaster(object):
                            archives=False,
                            resume=False,
                            gccollect=False,
-                           inifile=""
+                           inifile="",
+                           manifest="",
+                           profile=""
                            )
 
     """List of spell classes of the particular :class:`Toaster` instance."""
@@ -728,6 +1215,26 @@ class Toaster(object):
     """Tuple of regular expressions corresponding to the skip key of
     :attr:`options`."""
 
+    manifest = None
+    """The manifest, as ``dict`` loaded from the file given by the
+    manifest key of :attr:`options`, or ``None`` if there is no
+    manifest."""
+
+    profile = None
+    """A :class:`ToastProfile` which times all files and spells, if the
+    profile key of :attr:`options` is set, or ``None`` otherwise."""
+
+    member_stream = None
+    """The stream of the archive member being toasted, if any (see
+    :meth:`toast_member`)."""
+
+    MANIFEST_IGNORED_OPTIONS = frozenset((
+        "verbose", "pause", "examples", "spells", "interactive",
+        "helpspell", "catalog", "jobs", "refresh", "resume", "gccollect",
+        "inifile", "manifest", "profile", "raisetesterror"))
+    """Options which do not affect the outcome of toasting a file, and
+    so do not invalidate the :attr:`manifest` if they change."""
+
     def __init__(self, spellclass=None, options=None, spellnames=None,
                  logger=None):
         """Initialize the toaster.
@@ -758,6 +1265,8 @@ class Toaster(object):
         self.files_done = {}
         self.files_skipped = set()
         self.files_failed = set()
+        # statistics data of every file, with a manifest
+        self._file_states = []
 
     def _update_options(self):
         """Synchronize some fields with given options."""
@@ -798,6 +1307,11 @@ class Toaster(object):
             re.compile(regex) for regex in self.options["skip"])
         self.only_regexs = tuple(
             re.compile(regex) for regex in self.options["only"])
+        # time files and spells, if asked for
+        if not self.options.get("profile"):
+            self.profile = None
+        elif self.profile is None:
+            self.profile = ToastProfile()
 
     def _update_spellclass(self):
         """Update spell class from given list of spell names."""
@@ -979,6 +1493,7 @@ class Toaster(object):
         applypatch: False
         archives: False
         arg:
+        catalog: False
         createpatch: False
         destdir: _tests/
         diffcmd:
@@ -991,10 +1506,12 @@ class Toaster(object):
         inifile:
         interactive: False
         jobs: 1
+        manifest:
         only: []
         patchcmd:
         pause: True
         prefix:
+        profile:
         raisetesterror: False
         refresh: 32
         resume: True
@@ -1046,6 +1563,12 @@ class Toaster(object):
             type="string",
             metavar="ARG",
             help="pass argument ARG to each spell")
+        parser.add_option(
+            "--catalog", dest="catalog",
+            action="store_true",
+            help="print a catalog of every file, read from the file headers"
+            " only, as one line of JSON per file, and exit; no spells"
+            " are cast")
         parser.add_option(
             "--dest-dir", dest="destdir",
             type="string",
@@ -1102,6 +1625,13 @@ class Toaster(object):
             type="int",
             metavar="JOBS",
             help="allow JOBS jobs at once [default: %default]")
+        parser.add_option(
+            "--manifest", dest="manifest",
+            type="string",
+            metavar="FILE",
+            help="keep track of toasted files in the manifest FILE, and"
+            " skip files which did not change since they were last toasted"
+            " with the same spells and options, replaying their reports")
         parser.add_option(
             "--noninteractive", dest="interactive",
             action="store_false",
@@ -1139,6 +1669,13 @@ class Toaster(object):
             metavar="PREFIX",
             help="prepend PREFIX to file name when saving modification"
             " instead of overwriting the original")
+        parser.add_option(
+            "--profile", dest="profile",
+            type="string",
+            metavar="FILE",
+            help="time reading, writing, and every spell, for every file,"
+            " and write the timings, along with the peak memory use, to FILE"
+            " (as CSV if FILE ends with .csv, as JSON otherwise)")
         parser.add_option(
             "-r", "--raise", dest="raisetesterror",
             action="store_true",
@@ -1147,10 +1684,8 @@ class Toaster(object):
             "--refresh", dest="refresh",
             type="int",
             metavar="REFRESH",
-            help="start new process pool every JOBS * REFRESH files"
-            " if JOBS is 2 or more"
-            " (when processing a large number of files, this prevents"
-            " leaking memory on some operating systems) [default: %default]")
+            help="queue at most JOBS * REFRESH files for the worker"
+            " processes if JOBS is 2 or more [default: %default]")
         parser.add_option(
             "--resume", dest="resume",
             action="store_true",
@@ -1221,6 +1756,24 @@ class Toaster(object):
             print(self.EXAMPLES)
             return
 
+        # check if we are writing a catalog
+        if options.catalog:
+            if len(args) > 1:
+                parser.error("when using --catalog, do not specify a spell")
+            if args:
+                self.top = args[-1]
+            elif not self.top:
+                parser.error("no folder or file specified")
+            for filename, record in self.catalog(self.top):
+                if record is None:
+                    self.logger.warning("%s: not inspected" % filename)
+                    continue
+                fields = dict(
+                    (name, getattr(record, name)) for name in record.__slots__)
+                fields["filename"] = filename
+                print(json.dumps(fields, default=self._json_default))
+            return
+
         # check if we are applying patches
         if options.applypatch:
             if len(args) > 1:
@@ -1284,6 +1837,46 @@ class Toaster(object):
             # no --only found, so do not toast
             return False
 
+    @staticmethod
+    def _json_default(obj):
+        """Write byte strings, such as nif strings, to JSON."""
+        if isinstance(obj, bytes):
+            return obj.decode("ascii", "backslashreplace")
+        raise TypeError("%r is not JSON serializable" % obj)
+
+    def catalog(self, top):
+        """Walk over all files in a directory tree, and generate the
+        catalog record of every file, as returned by
+        :meth:`~pyffi.object_models.FileFormat.Data.inspect_catalog`.
+        Only the file headers are read, and no spells are cast, so
+        this is a quick way to index large collections of files. If
+        the ``jobs`` option is 2 or more, files are inspected by a
+        process pool.
+
+        :param top: The directory or file to inspect.
+        :type top: str
+        :return: Generator of ``(filename, record)`` pairs; the record is
+            ``None`` if the file could not be inspected.
+        """
+        jobs = self.options.get("jobs", CPU_COUNT)
+        args = (
+            (self.FILEFORMAT, filename)
+            for filename in pyffi.utils.walk(
+                top, onerror=None,
+                re_filename=self.FILEFORMAT.RE_FILENAME)
+            if self.inspect_filename(filename))
+        if jobs == 1:
+            for arg in args:
+                yield _catalog_job(arg)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=jobs) as executor:
+                # headers are small: send files to workers in large chunks
+                for result in executor.map(
+                        _catalog_job, args,
+                        chunksize=self.options.get("refresh", 32)):
+                    yield result
+
     def toast(self, top):
         """Walk over all files in a directory tree and cast spells
         on every file.
@@ -1292,25 +1885,6 @@ class Toaster(object):
         :type top: str
         """
 
-        def file_pools(chunksize):
-            """Helper function which generates list of files, sorted by size,
-            in chunks of given size.
-            """
-            all_files = pyffi.utils.walk(
-                top, onerror=None,
-                re_filename=self.FILEFORMAT.RE_FILENAME)
-            while True:
-                # fetch chunksize files from all files
-                file_pool = [
-                    filename for i, filename in zip(
-                        range(chunksize), all_files)]
-                if not file_pool:
-                    # done!
-                    break
-                # sort files by size
-                file_pool.sort(key=os.path.getsize, reverse=True)
-                yield file_pool
-
         # toast entry code
         if not self.spellclass.toastentry(self):
             self.msg("spell does not apply! quiting early...")
@@ -1372,60 +1946,271 @@ class Toaster(object):
                     input("Press enter...")
                 return
 
+        self.load_manifest()
+
         # walk over all streams, and create a data instance for each of them
         # inspect the file but do not yet read in full
-        if jobs == 1:
-            for stream in self.FILEFORMAT.walk(top, mode='rb' if self.spellclass.READONLY else 'r+b'):
-                self._toast(stream)
-                if self.options["gccollect"]:
-                    # force free memory (helps when parsing many files)
-                    gc.collect()
-        else:
-            chunksize = self.options["refresh"] * self.options["jobs"]
-            self.msg("toasting with %i threads in chunks of %i files"
-                     % (jobs, chunksize))
-            for file_pool in file_pools(chunksize):
-                self.logger.debug("process file pool:")
-                for filename in file_pool:
-                    self.logger.debug("  " + filename)
-                with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
-                    list(executor.map(
-                        _toaster_job,
-                        ((self.__class__, filename, self.options, self.spellnames)
-                         for filename in file_pool)))
+        try:
+            if jobs == 1:
+                for stream in self.FILEFORMAT.walk(top, mode='rb' if self.spellclass.READONLY else 'r+b'):
+                    self._toast(stream)
+                    if self.options["gccollect"]:
+                        # force free memory (helps when parsing many files)
+                        gc.collect()
+            else:
+                self._toast_pool(
+                    pyffi.utils.walk(top, onerror=None,
+                                     re_filename=self.FILEFORMAT.RE_FILENAME),
+                    jobs)
+        finally:
+            # also keep track of the files done when interrupted
+            self.save_manifest()
+            if self.profile is not None:
+                self.profile.write(self.options["profile"])
 
         # toast exit code
+        self._merge_file_states()
         self.spellclass.toastexit(self)
 
+    def _toast_pool(self, tasks, jobs, on_result=None):
+        """Toast files with a pool of worker processes, which live as
+        long as the pool (see :func:`_toaster_worker`). Tasks are
+        fed to the workers through a queue, which holds at most
+        ``jobs * refresh`` tasks, so that no worker waits on another,
+        and which are only taken from *tasks* as the queue has room.
+        The messages, reports, and failures of every file are passed on
+        as soon as a worker finishes it.
+
+        :param tasks: The names of the files to toast, or the names and
+            data of the archive members to toast.
+        :type tasks: iterator of ``str``, or of ``tuple``
+        :param jobs: The number of worker processes.
+        :type jobs: ``int``
+        :param on_result: If given, this is called with the name, the
+            info, and the records of every file a worker finishes,
+            instead of passing them on (see :meth:`_pass_on_result`).
+        :type on_result: ``function``
+        """
+        queue_in = multiprocessing.Queue(jobs * self.options["refresh"])
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=_toaster_worker,
+                args=(self.__class__,
+                      None if self.spellnames else self.spellclass,
+                      self.options, self.spellnames, queue_in, results))
+            for i in range(jobs)]
+        self.msg("toasting with %i processes" % jobs)
+        for worker in workers:
+            worker.start()
+        running = len(workers)
+
+        def handle_result(timeout):
+            """Get one result, and pass it on. Returns ``False`` if none
+            arrived within *timeout* seconds."""
+            nonlocal running
+            try:
+                kind, name, info, records = results.get(timeout=timeout)
+            except queue.Empty:
+                return False
+            if kind == "exit":
+                running -= 1
+                self._pass_on_result(info, records)
+                if info["state"] is not None:
+                    self.spellclass.toastmerge(self, info["state"])
+            elif on_result is not None:
+                on_result(name, info, records)
+            else:
+                self._pass_on_result(info, records, name=name)
+            return True
+
+        def put(task):
+            """Put a task on the queue, passing on results while the
+            queue is full."""
+            while True:
+                try:
+                    queue_in.put(task, timeout=0.1)
+                    return
+                except queue.Full:
+                    while handle_result(0):
+                        pass
+                    if all(not worker.is_alive() for worker in workers):
+                        raise RuntimeError("all worker processes died")
+
+        try:
+            for task in tasks:
+                put(task)
+                while handle_result(0):
+                    pass
+            for worker in workers:
+                put(None)
+            while running:
+                if not handle_result(1):
+                    # any worker which stopped without sending its exit
+                    # results is gone for good
+                    if all(not worker.is_alive() for worker in workers):
+                        while handle_result(0):
+                            pass
+                        if running:
+                            self.logger.error(
+                                "%i worker processes died unexpectedly"
+                                % running)
+                        break
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+
+    def _pass_on_result(self, info, records, name=None):
+        """Pass on the result of a worker process (see
+        :func:`_toaster_worker`): merge its profile, log its messages,
+        and if *name* is given, record how toasting that file went.
+        """
+        if self.profile is not None and info["profile"] is not None:
+            self.profile.merge(info["profile"])
+        for level, msg in records:
+            self.logger.log(level, msg)
+        if name is None:
+            return
+        if self.manifest is not None:
+            if info["entry"] is not None:
+                self.manifest["files"][name] = info["entry"]
+            else:
+                self.manifest["files"].pop(name, None)
+        if info["status"] == "done":
+            self.files_done[name] = info["reports"]
+        elif info["status"] == "skipped":
+            self.files_skipped.add(name)
+        else:
+            self.files_failed.add(name)
+            if self.options["raisetesterror"]:
+                raise RuntimeError("toasting %s failed" % name)
+
     def toast_archives(self, top):
-        """Toast all files in all archives."""
+        """Toast all files in all archives. The members of all archives
+        are extracted in order, and those of :attr:`FILEFORMAT` are
+        toasted, by a single pool of worker processes for all archives
+        if the jobs option asks for it, while further members are
+        extracted. The results are passed on in the original order, and
+        unless the spell is read only, every archive is written back,
+        with its members in their original order, if any member
+        changed, as soon as all of its members are toasted.
+
+        :param top: The directory or archive to toast.
+        :type top: str
+        """
         if not self.FILEFORMAT.ARCHIVE_CLASSES:
             self.logger.info("No known archives contain this file format.")
-        # walk over all files, and pick archives as we go
-        for filename_in in pyffi.utils.walk(top):
-            for ARCHIVE_CLASS in self.FILEFORMAT.ARCHIVE_CLASSES:
+            return
+        if not self.spellclass.toastentry(self):
+            self.msg("spell does not apply! quiting early...")
+            return
+        if not self.options.get("sourcedir"):
+            self.options["sourcedir"] = (
+                os.path.dirname(top) if os.path.isfile(top) else top)
+        jobs = self.options.get("jobs", CPU_COUNT)
+        writer = _ArchiveWriter(self)
+        tasks = self._get_archive_tasks(top, writer)
+        try:
+            if jobs == 1:
+                for name, raw in tasks:
+                    writer.add_result(name, self.toast_member(name, raw))
+            else:
+                self._toast_pool(
+                    tasks, jobs,
+                    on_result=lambda name, info, records: writer.add_result(
+                        name, info["data"], (info, records)))
+        finally:
+            if self.profile is not None:
+                self.profile.write(self.options["profile"])
+        # toast exit code
+        self.spellclass.toastexit(self)
+
+    def _get_archive_tasks(self, top, writer):
+        """Walk over all archives, and extract their members in order,
+        adding them to *writer* (see :class:`_ArchiveWriter`), and
+        yielding the name and the data of every member to toast, see
+        :meth:`toast_archives`. Members are toasted under their path in
+        the archive prefixed by the path of the archive, so that members
+        with the same name in different archives are kept apart.
+        """
+        for filename in pyffi.utils.walk(top):
+            for archive_class in self.FILEFORMAT.ARCHIVE_CLASSES:
                 # check if extension matches
-                if not ARCHIVE_CLASS.RE_FILENAME.match(filename_in):
+                if not archive_class.RE_FILENAME.match(filename):
                     continue
-                # open the archive
+                writer.begin_archive(archive_class, filename)
                 try:
-                    archive_in = ARCHIVE_CLASS.Data(name=filename_in, mode='r')
-                except ValueError:
-                    self.logger.warn("archive format not recognized, skipped")
+                    archive_in = archive_class.Data(name=filename, mode='r')
+                except (ValueError, NotImplementedError):
+                    writer.end_archive(
+                        "archive format not recognized, skipped")
                     continue
-                # toast all members in the archive
-                # and save them to a temporary archive as we go
-                if not self.spellclass.READONLY:
-                    for member in archive_in.get_members():
-                        self._toast_member(member)
-                else:
-                    file_out = tempfile.TemporaryFile()
-                    archive_out = ARCHIVE_CLASS.Data(fileobj=file_out, mode='w')
+                try:
                     for member in archive_in.get_members():
-                        self._toast(member)
-                        archive_out.add(member)
-                    archive_out.close()
-                archive_in.close()
+                        raw = member.stream.read()
+                        if self.FILEFORMAT.RE_FILENAME.match(member.name):
+                            name = os.path.join(filename, member.name)
+                            writer.add_member(member.name, raw, name)
+                            yield name, raw
+                        else:
+                            writer.add_member(member.name, raw)
+                finally:
+                    archive_in.close()
+                writer.end_archive()
+
+    def _write_archive(self, archive_class, filename, members):
+        """Write an archive back, with the given names and data of its
+        members, in order.
+        """
+        outstream = self.spellclass.get_toast_stream(self, filename)
+        try:
+            archive_out = archive_class.Data(fileobj=outstream, mode='w')
+            archive_out.set_members(
+                self._get_archive_member(name, raw) for name, raw in members)
+            archive_out.close()
+        except NotImplementedError:
+            self.logger.warn(
+                "writing %s archives not supported, skipped"
+                % archive_class.__name__)
+            # do not leave an empty archive behind
+            outstream_name = outstream.name
+            outstream.close()
+            if os.path.exists(outstream_name):
+                os.remove(outstream_name)
+        finally:
+            outstream.close()
+
+    @staticmethod
+    def _get_archive_member(name, raw):
+        """Return an archive member with the given name and data."""
+        member = pyffi.object_models.ArchiveMember()
+        member.name = name
+        member.stream = BytesIO(raw)
+        return member
+
+    def toast_member(self, name, raw):
+        """Toast a member of an archive, in memory.
+
+        :param name: The name of the member, prefixed by the path of
+            its archive.
+        :type name: ``str``
+        :param raw: The data of the member.
+        :type raw: ``bytes``
+        :return: The new data of the member if the spell changed it,
+            or ``None`` otherwise.
+        :rtype: ``bytes``
+        """
+        self.member_stream = _ArchiveMemberStream(name, raw)
+        manifest, self.manifest = self.manifest, None
+        try:
+            self._toast(self.member_stream)
+            data = self.member_stream.getvalue()
+        finally:
+            self.member_stream = None
+            self.manifest = manifest
+        return data if data != raw else None
 
     def _toast(self, stream):
         """Run toaster on particular stream and data.
@@ -1441,37 +2226,61 @@ class Toaster(object):
         if self.options["resume"]:
             if self.spellclass.get_toast_stream(self, stream.name, test_exists=True):
                 self.msg("=== %s (already done) ===" % stream.name)
+                self.files_skipped.add(stream.name)
+                return
+
+        # check if file changed since it was last toasted
+        if self.manifest is not None:
+            entry = self.manifest["files"].get(stream.name)
+            if entry is not None and self._is_unchanged(stream.name, entry):
+                self.msg("=== %s (unchanged) ===" % stream.name)
+                self._replay_manifest_entry(entry)
+                self.files_done[stream.name] = entry["reports"]
                 return
+            # keep the statistics data of this file apart
+            if self.spellclass.toaststate(self) is not None:
+                self.spellclass.toastentry(self)
 
         data = self.FILEFORMAT.Data()
+        phases = {}  # time of every phase, for the profile
+        logger = self.logger
 
         self.msgblockbegin("=== %s ===" % stream.name)
+        if self.manifest is not None:
+            self.logger = _RecordingLogger(logger)
         try:
             # inspect the file (reads only the header)
-            data.inspect(stream)
+            self._call_phase(phases, "inspect", data.inspect, stream)
 
             # create spell instance
             spell = self.spellclass(toaster=self, data=data, stream=stream)
 
             # inspect the spell instance
-            if spell._datainspect() and spell.datainspect():
+            if spell._datainspect() and spell._call_hook("datainspect"):
                 # read the full file
-                data.read(stream)
+                self._call_phase(phases, "read", data.read, stream)
 
                 # cast the spell on the data tree
-                spell.recurse()
+                self._call_phase(phases, "spells", spell.recurse)
 
                 # save file back to disk if not readonly and the spell
                 # changed the file
                 if (not self.spellclass.READONLY) and spell.changed:
                     if self.options["createpatch"]:
-                        self.writepatch(stream, data)
+                        self._call_phase(phases, "write",
+                                         self.writepatch, stream, data)
                     else:
-                        self.write(stream, data)
+                        self._call_phase(phases, "write",
+                                         self.write, stream, data)
             self.files_done[stream.name] = spell.reports
+            if self.manifest is not None:
+                self._update_manifest(stream, spell.reports,
+                                      self.logger.records)
 
         except Exception:
             self.files_failed.add(stream.name)
+            if self.manifest is not None:
+                self.manifest["files"].pop(stream.name, None)
             self.logger.error("TEST FAILED ON %s" % stream.name)
             self.logger.error(
                 "If you were running a spell that came with PyFFI, then")
@@ -1483,7 +2292,191 @@ class Toaster(object):
             if self.options["raisetesterror"]:
                 raise
         finally:
+            self.logger = logger
             self.msgblockend()
+            if self.profile is not None:
+                self.profile.add_file(stream.name, phases)
+
+    def _call_phase(self, phases, name, func, *args):
+        """Call *func* with the given arguments, and if there is a
+        :attr:`profile`, time it as a phase of toasting the file.
+
+        :param phases: Maps phase name to time, in seconds, for the
+            current file.
+        :type phases: ``dict``
+        :param name: The name of the phase.
+        :type name: ``str``
+        :return: The return value of *func*.
+        """
+        if self.profile is None:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            seconds = time.perf_counter() - start
+            phases[name] = seconds
+            self.profile.add(name, seconds)
+
+    def _get_manifest_key(self):
+        """Return the spells and options which the :attr:`manifest`
+        applies to.
+        """
+        spells = (self.spellnames if self.spellnames
+                  else [self.spellclass.__name__])
+        options = dict(
+            (name, value) for name, value in self.options.items()
+            if name not in self.MANIFEST_IGNORED_OPTIONS)
+        # normalize, as the manifest is stored as JSON
+        return json.loads(json.dumps(
+            {"spells": spells, "options": options},
+            sort_keys=True, default=self._json_default))
+
+    def load_manifest(self):
+        """Load the :attr:`manifest` from the file given by the manifest
+        option, if any. Files toasted with other spells or options are
+        forgotten. For files which did not change, the messages logged
+        and the statistics data of the spell are replayed from the
+        manifest, so the toast exit code still reports on all files.
+
+        >>> import os, tempfile
+        >>> import pyffi.spells.nif
+        >>> import pyffi.spells.nif.check
+        >>> from pyffi.formats.nif import NifFormat
+        >>> class NifToaster(pyffi.spells.nif.NifToaster):
+        ...     SPELLS = [pyffi.spells.nif.check.SpellCheckVersion]
+        >>> folder = tempfile.mkdtemp()
+        >>> data = NifFormat.Data(version=0x14000005)
+        >>> data.roots = [NifFormat.NiNode()]
+        >>> with open(os.path.join(folder, "test.nif"), "wb") as stream:
+        ...     data.write(stream)
+        >>> manifest = os.path.join(folder, "manifest.json")
+        >>> toaster = NifToaster(
+        ...     spellnames=["check_version"], logger=fake_logger,
+        ...     options=dict(jobs=1, manifest=manifest, verbose=1))
+        >>> toaster.toast(folder) # doctest: +ELLIPSIS
+        pyffi.toaster:INFO:=== .../test.nif ===
+        pyffi.toaster:INFO:  version      0x14000005
+        pyffi.toaster:INFO:  user version 0
+        pyffi.toaster:INFO:  user version 0
+        pyffi.toaster:INFO:version 0x14000005
+        pyffi.toaster:INFO:  number of nifs: 1
+        pyffi.toaster:INFO:  user version:  [0]
+        pyffi.toaster:INFO:  user version2: [0]
+        >>> toaster.toast(folder) # doctest: +ELLIPSIS
+        pyffi.toaster:INFO:=== .../test.nif (unchanged) ===
+        pyffi.toaster:INFO:  version      0x14000005
+        pyffi.toaster:INFO:  user version 0
+        pyffi.toaster:INFO:  user version 0
+        pyffi.toaster:INFO:version 0x14000005
+        pyffi.toaster:INFO:  number of nifs: 1
+        pyffi.toaster:INFO:  user version:  [0]
+        pyffi.toaster:INFO:  user version2: [0]
+        >>> os.remove(manifest)
+        >>> os.remove(os.path.join(folder, "test.nif"))
+        >>> os.rmdir(folder)
+        """
+        filename = self.options.get("manifest")
+        if not filename:
+            self.manifest = None
+            return
+        key = self._get_manifest_key()
+        self.manifest = dict(key, files={})
+        if os.path.exists(filename):
+            with open(filename) as stream:
+                manifest = json.load(stream)
+            if (manifest.get("spells") == key["spells"]
+                    and manifest.get("options") == key["options"]):
+                self.manifest["files"] = manifest["files"]
+            else:
+                self.msg("spells or options changed, manifest ignored")
+
+    def save_manifest(self):
+        """Save the :attr:`manifest`, if any, to the file given by the
+        manifest option. The file is replaced in one go, so it is never
+        left half written.
+        """
+        if self.manifest is None:
+            return
+        filename = self.options["manifest"]
+        with open(filename + ".tmp", "w") as stream:
+            json.dump(self.manifest, stream, sort_keys=True,
+                      default=self._json_default)
+        os.replace(filename + ".tmp", filename)
+
+    @staticmethod
+    def _get_file_hash(filename):
+        """Return the hash of the contents of a file, for the
+        :attr:`manifest`.
+        """
+        hsh = hashlib.sha1()
+        with open(filename, "rb") as stream:
+            for chunk in iter(lambda: stream.read(1 << 20), b""):
+                hsh.update(chunk)
+        return hsh.hexdigest()
+
+    def _is_unchanged(self, filename, entry):
+        """Check whether a file still matches its :attr:`manifest`
+        entry. The contents are only hashed if the size matches but the
+        modification time does not.
+        """
+        stat = os.stat(filename)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime"]:
+            return True
+        if self._get_file_hash(filename) != entry["hash"]:
+            return False
+        # remember the new time, to skip hashing next time
+        entry["mtime"] = stat.st_mtime_ns
+        return True
+
+    def _update_manifest(self, stream, reports, records):
+        """Record the state of a toasted file in the :attr:`manifest`,
+        after any changes have been written to it, along with the
+        messages logged, and the statistics data of the spell (see
+        :meth:`Spell.toaststate`) for the file, so they can be replayed
+        when the file is found unchanged.
+        """
+        if stream.writable():
+            stream.flush()
+        stat = os.stat(stream.name)
+        state = self.spellclass.toaststate(self)
+        if state is not None:
+            self._file_states.append(state)
+            # statistics data need not be JSON serializable
+            state = base64.b64encode(pickle.dumps(state)).decode("ascii")
+        self.manifest["files"][stream.name] = dict(
+            size=stat.st_size,
+            mtime=stat.st_mtime_ns,
+            hash=self._get_file_hash(stream.name),
+            reports=reports,
+            records=records,
+            state=state)
+
+    def _replay_manifest_entry(self, entry):
+        """Log the messages, and keep the statistics data of the spell,
+        of a file that is unchanged since it was recorded in the
+        :attr:`manifest`.
+        """
+        for level, msg in entry.get("records", ()):
+            self.logger.log(level, msg)
+        state = entry.get("state")
+        if state is not None:
+            self._file_states.append(
+                pickle.loads(base64.b64decode(state)))
+
+    def _merge_file_states(self):
+        """With a :attr:`manifest`, the statistics data of the spell are
+        kept for every file apart (see :meth:`_update_manifest`):
+        merge them, for the toast exit code.
+        """
+        if not self._file_states:
+            return
+        self.spellclass.toastentry(self)
+        for state in self._file_states:
+            self.spellclass.toastmerge(self, state)
+        self._file_states = []
 
     def get_toast_head_root_ext(self, filename):
         """Get the name of where the input file *filename* would
@@ -1530,6 +2523,13 @@ class Toaster(object):
         streams are created, and True is returned if the file
         already exists, and False is returned otherwise.
         """
+        if (self.member_stream is not None
+            and filename == self.member_stream.name):
+            # archive members are written back in memory
+            if test_exists:
+                return False
+            else:
+                return self.member_stream
         if self.options["dryrun"]:
             if test_exists:
                 return False  # temporary file never exists
@@ -115,6 +115,16 @@ class SpellNodeNamesByFlag(pyffi.spells.nif.NifSpell):
         for flag, names in toaster.flagdict.items():
             toaster.msg("%s %s" % (flag, names))
 
+    @classmethod
+    def toaststate(cls, toaster):
+        return toaster.flagdict
+
+    @classmethod
+    def toastmerge(cls, toaster, state):
+        for flag, names in state.items():
+            flagnames = toaster.flagdict.setdefault(flag, [])
+            flagnames.extend(name for name in names if name not in flagnames)
+
     def datainspect(self):
         return self.inspectblocktype(NifFormat.NiNode)
 
@@ -739,6 +749,14 @@ class SpellCheckTriStrip(pyffi.spells.nif.NifSpell):
                        )
                     )
 
+    @classmethod
+    def toaststate(cls, toaster):
+        return toaster.striplengths
+
+    @classmethod
+    def toastmerge(cls, toaster, state):
+        toaster.striplengths.extend(state)
+
     def datainspect(self):
         return self.inspectblocktype(NifFormat.NiTriBasedGeomData)
 
@@ -868,6 +886,27 @@ class SpellCheckVersion(pyffi.spells.nif.NifSpell):
             toaster.msg("user version2: %s" % toaster.user_version_2s[version])
             toaster.msgblockend()
 
+    @classmethod
+    def toaststate(cls, toaster):
+        return (toaster.versions, toaster.user_versions,
+                toaster.user_version_2s)
+
+    @classmethod
+    def toastmerge(cls, toaster, state):
+        versions, user_versions, user_version_2s = state
+        for version, num_nifs in versions.items():
+            if version not in toaster.versions:
+                toaster.versions[version] = 0
+                toaster.user_versions[version] = []
+                toaster.user_version_2s[version] = []
+            toaster.versions[version] += num_nifs
+            for user_version in user_versions[version]:
+                if user_version not in toaster.user_versions[version]:
+                    toaster.user_versions[version].append(user_version)
+            for user_version_2 in user_version_2s[version]:
+                if user_version_2 not in toaster.user_version_2s[version]:
+                    toaster.user_version_2s[version].append(user_version_2)
+
     def datainspect(self):
         # some shortcuts
         version = self.data.version
@@ -964,6 +1003,14 @@ class SpellCheckTriangles(pyffi.spells.nif.NifSpell):
     def toastexit(cls, toaster):
         toaster.msg("found {0} geometries".format(len(toaster.geometries)))
 
+    @classmethod
+    def toaststate(cls, toaster):
+        return toaster.geometries
+
+    @classmethod
+    def toastmerge(cls, toaster, state):
+        toaster.geometries.extend(state)
+
 try:
     import numpy
     import scipy.optimize
@@ -62,21 +62,41 @@ def tohex(value, nbytes=4):
 def dumpArray(arr):
     """Format an array.
 
+    Arrays which were read in bulk are formatted in full too:
+
+    >>> from io import BytesIO
+    >>> from pyffi.utils import BufferReader
+    >>> data = NifFormat.Data(version=0x14020007, user_version=11)
+    >>> shape = NifFormat.NiTriShapeData()
+    >>> shape.num_vertices = 2
+    >>> shape.has_vertices = True
+    >>> shape.vertices.update_size()
+    >>> shape.vertices[1].x = 1.0
+    >>> data.roots = [shape]
+    >>> stream = BytesIO()
+    >>> data.write(stream)
+    >>> data = NifFormat.Data()
+    >>> data.read(BufferReader(stream.getvalue()))
+    >>> print(dumpArray(data.roots[0].vertices))
+    0: [ 0.000  0.000  0.000]
+    1: [ 1.000  0.000  0.000]
+    <BLANKLINE>
+
     :param arr: An array.
     :type arr: L{pyffi.object_models.xml.array.Array}
     :return: String describing the array.
     """
     text = ""
     if arr._count2 is None:
-        for i, element in enumerate(list.__iter__(arr)):
+        for i, element in enumerate(arr.get_detail_child_nodes()):
             if i > 16:
                 text += "etc...\n"
                 break
             text += "%i: %s\n" % (i, dumpAttr(element))
     else:
         k = 0
-        for i, elemlist in enumerate(list.__iter__(arr)):
-            for j, elem in enumerate(list.__iter__(elemlist)):
+        for i, elemlist in enumerate(arr.get_detail_child_nodes()):
+            for j, elem in enumerate(elemlist.get_detail_child_nodes()):
                 if k > 16:
                     text += "etc...\n"
                     break
@@ -223,6 +243,19 @@ class SpellHtmlReport(NifSpell):
         # spell always applies
         return True
 
+    @classmethod
+    def toaststate(cls, toaster):
+        return toaster.reports_per_blocktype
+
+    @classmethod
+    def toastmerge(cls, toaster, state):
+        for blocktype, reports in state.items():
+            if blocktype in toaster.reports_per_blocktype:
+                # skip the header row
+                toaster.reports_per_blocktype[blocktype] += reports[1:]
+            else:
+                toaster.reports_per_blocktype[blocktype] = reports
+
     def _branchinspect(self, branch):
         # enter every branch
         # (the base method is called in branch entry)
@@ -456,12 +489,12 @@ class SpellDumpPython(NifSpell):
             if _value:
                 self.print_("%s.update_size()" % name)
                 if _value._count2 is None:
-                    for i, elem in enumerate(list.__iter__(_value)):
+                    for i, elem in enumerate(_value.get_detail_child_nodes()):
                         if self.print_instance("%s[%i]" % (name, i), elem):
                             result = True
                 else:
-                    for i, elemlist in enumerate(list.__iter__(_value)):
-                        for j, elem in enumerate(list.__iter__(elemlist)):
+                    for i, elemlist in enumerate(_value.get_detail_child_nodes()):
+                        for j, elem in enumerate(elemlist.get_detail_child_nodes()):
                             if self.print_instance("%s[%i][%i]" % (name, i, j), elem):
                                 result = True
             return result
@@ -321,8 +321,7 @@ class SpellDetachHavokTriStripsData(NifSpell):
 
     def dataentry(self):
         # build list of all NiTriStrips blocks
-        self.nitristrips = [branch for branch in self.data.get_global_iterator()
-                            if isinstance(branch, NifFormat.NiTriStrips)]
+        self.nitristrips = self.data.blocks_by_type(NifFormat.NiTriStrips)
         if self.nitristrips:
             return True
         else:
@@ -441,12 +440,11 @@ class SpellMergeSkeletonRoots(NifSpell):
     def dataentry(self):
         # make list of skeleton roots
         skelroots = []
-        for branch in self.data.get_global_iterator():
-            if isinstance(branch, NifFormat.NiGeometry):
-                if branch.skin_instance:
-                    skelroot = branch.skin_instance.skeleton_root
-                    if skelroot and skelroot not in skelroots:
-                        skelroots.append(skelroot)
+        for branch in self.data.blocks_by_type(NifFormat.NiGeometry):
+            if branch.skin_instance:
+                skelroot = branch.skin_instance.skeleton_root
+                if skelroot and skelroot not in skelroots:
+                    skelroots.append(skelroot)
         # find the 'root' skeleton roots (those that have no other skeleton
         # roots as child)
         self.skelrootlist = set()
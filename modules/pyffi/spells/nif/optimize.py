@@ -162,15 +162,26 @@ class SpellCleanRefLists(pyffi.spells.nif.NifSpell):
 
 
 class SpellMergeDuplicates(pyffi.spells.nif.NifSpell):
-    """Remove duplicate branches."""
+    """Remove duplicate branches.
+
+    Only branches with equal
+    :meth:`~pyffi.formats.nif.NifFormat.NiObject.get_interchangeable_hash`
+    are compared. Duplicates are replaced all at once, when all
+    branches have been visited.
+    """
 
     SPELLNAME = "opt_mergeduplicates"
     READONLY = False
 
     def __init__(self, *args, **kwargs):
         pyffi.spells.nif.NifSpell.__init__(self, *args, **kwargs)
-        # list of all branches visited so far
-        self.branches = []
+        # all branches visited so far, as lists of branches with equal
+        # interchangeable hash
+        self.branches = {}
+        # maps every duplicate branch to the branch that replaces it
+        self.replacements = {}
+        # all branches visited so far
+        self.visited = set()
 
     def datainspect(self):
         # see MadCat221's metstaff.nif:
@@ -191,31 +202,40 @@ class SpellMergeDuplicates(pyffi.spells.nif.NifSpell):
                                    NifFormat.NiGeometryData))
 
     def branchentry(self, branch):
-        for otherbranch in self.branches:
-            if(branch is not otherbranch and
-               branch.is_interchangeable(otherbranch)
-               ):
-                # skip properties that have controllers (the
-                # controller data cannot always be reliably checked,
-                # see also issue #2106668)
-                if(isinstance(branch, NifFormat.NiProperty) and
-                   branch.controller
-                   ):
-                    continue
-                # skip BSShaderProperty blocks (see niftools issue #3009832)
-                if isinstance(branch, NifFormat.BSShaderProperty):
-                    continue
-                # interchangeable branch found!
-                self.toaster.msg("removing duplicate branch")
-                self.data.replace_global_node(branch, otherbranch)
-                self.changed = True
-                # branch has been replaced, so no need to recurse further
-                return False
-        else:
-            # no duplicate found, add to list of visited branches
-            self.branches.append(branch)
-            # continue recursion
+        # branch visited before: it has been dealt with already
+        if branch in self.visited or branch in self.replacements:
+            return False
+        hsh = branch.get_interchangeable_hash()
+        if hsh is None:
+            # branch is only interchangeable with itself
+            self.visited.add(branch)
             return True
+        branches = self.branches.setdefault(hsh, [])
+        # skip properties that have controllers (the
+        # controller data cannot always be reliably checked,
+        # see also issue #2106668)
+        # skip BSShaderProperty blocks (see niftools issue #3009832)
+        if not((isinstance(branch, NifFormat.NiProperty) and
+                branch.controller) or
+               isinstance(branch, NifFormat.BSShaderProperty)):
+            for otherbranch in branches:
+                if branch.is_interchangeable(otherbranch):
+                    # interchangeable branch found!
+                    self.toaster.msg("removing duplicate branch")
+                    self.replacements[branch] = otherbranch
+                    self.changed = True
+                    # branch will be replaced, so no need to recurse further
+                    return False
+        # no duplicate found, add to list of visited branches
+        branches.append(branch)
+        self.visited.add(branch)
+        # continue recursion
+        return True
+
+    def dataexit(self):
+        # replace all duplicates in one go
+        if self.replacements:
+            self.data.replace_global_nodes(self.replacements)
 
 
 class SpellOptimizeGeometry(pyffi.spells.nif.NifSpell):
@@ -716,10 +736,9 @@ class SpellDelUnusedBones(pyffi.spells.nif.NifSpell):
     def dataentry(self):
         # make list of used bones
         self._used_bones = set()
-        for branch in self.data.get_global_iterator():
-            if isinstance(branch, NifFormat.NiGeometry):
-                if branch.skin_instance:
-                    self._used_bones |= set(branch.skin_instance.bones)
+        for branch in self.data.blocks_by_type(NifFormat.NiGeometry):
+            if branch.skin_instance:
+                self._used_bones |= set(branch.skin_instance.bones)
         return True
 
     def branchinspect(self, branch):
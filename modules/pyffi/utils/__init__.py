@@ -42,6 +42,8 @@
 # ***** END LICENSE BLOCK *****
 
 import os
+import struct
+import weakref
 
 
 def walk(top, topdown=True, onerror=None, re_filename=None):
@@ -164,6 +166,209 @@ def unique_map(hash_generator):
             hash_map.append(hash_index)
     return hash_map, hash_map_inverse
 
+
+class BufferReader(object):
+    """A read only file-like object on top of a buffer, such as an
+    ``mmap``, a ``memoryview``, or ``bytes``, with an offset cursor.
+    The buffer is never copied. Basic types recognize this reader, and
+    decode their values directly from the buffer with
+    ``struct.unpack_from``, without creating intermediate ``bytes``
+    objects.
+
+    Payloads, such as byte arrays, undecoded data, and arrays read in
+    bulk, are copied out of the buffer, unless C{copy_payloads} is
+    ``False``: then they are kept as views on the buffer, which must
+    stay valid, and cannot be closed (as for an ``mmap``), for as long
+    as the data read from it lives. L{close} refuses to release the
+    buffer while any such view is still in use.
+
+    >>> reader = BufferReader(b'abc\\ndef\\x01\\x00\\x00\\x00')
+    >>> reader.readline()
+    b'abc\\n'
+    >>> reader.read(3)
+    b'def'
+    >>> reader.unpack('<I', 4)
+    (1,)
+    >>> reader.tell()
+    11
+    >>> reader.read(1)
+    b''
+    >>> if reader.seek(-4, 1): pass
+    >>> reader.read()
+    b'\\x01\\x00\\x00\\x00'
+    >>> view = reader.read_view(0)
+    >>> reader.close()
+    Traceback (most recent call last):
+        ...
+    BufferError: 1 view(s) on the buffer still in use
+    >>> del view
+    >>> reader.close()
+    """
+
+    def __init__(self, buffer, offset=0, copy_payloads=True):
+        """Initialize the reader.
+
+        :param buffer: The buffer to read from.
+        :type buffer: ``mmap``, ``memoryview``, ``bytes``, ...
+        :param offset: The initial position of the cursor.
+        :type offset: ``int``
+        :param copy_payloads: Whether payloads are copied out of the
+            buffer (see L{_read_bytes}), or kept as views on it.
+        :type copy_payloads: ``bool``
+        """
+        self.buffer = memoryview(buffer).cast("B")
+        self.offset = offset
+        self.copy_payloads = copy_payloads
+        # weak references to the views handed out, see close
+        self._views = []
+
+    def read(self, size=-1):
+        """Read at most *size* bytes (all remaining bytes if *size* is
+        negative) and advance the cursor.
+        """
+        start = self.offset
+        end = len(self.buffer) if size < 0 else min(start + size,
+                                                     len(self.buffer))
+        self.offset = max(start, end)
+        return self.buffer[start:end].tobytes()
+
+    def read_view(self, size=-1):
+        """Like L{read}, but return a read only ``memoryview`` on the
+        buffer rather than a copy of the bytes.
+
+        >>> view = BufferReader(b'abcdef', 2).read_view(3)
+        >>> view.readonly, view.tobytes()
+        (True, b'cde')
+        """
+        start = self.offset
+        end = len(self.buffer) if size < 0 else min(start + size,
+                                                     len(self.buffer))
+        self.offset = max(start, end)
+        view = self.buffer[start:end].toreadonly()
+        self._views.append(weakref.ref(view))
+        return view
+
+    def readline(self, size=-1):
+        """Read up to and including the next newline, but at most
+        *size* bytes if *size* is not negative. The newline is searched
+        for in small, growing chunks, so only about the line is copied,
+        rather than the rest of the buffer.
+
+        >>> reader = BufferReader(b'abc\\n' + 300 * b'x' + b'\\ndef')
+        >>> reader.readline(2), reader.readline()
+        (b'ab', b'c\\n')
+        >>> len(reader.readline()), reader.readline(), reader.readline()
+        (301, b'def', b'')
+        """
+        start = self.offset
+        end = len(self.buffer) if size < 0 else min(start + size,
+                                                     len(self.buffer))
+        pos = start
+        chunk_size = 128
+        while pos < end:
+            chunk_end = min(pos + chunk_size, end)
+            i = self.buffer[pos:chunk_end].tobytes().find(b'\n')
+            if i != -1:
+                end = pos + i + 1
+                break
+            pos = chunk_end
+            chunk_size *= 2
+        self.offset = max(start, end)
+        return self.buffer[start:end].tobytes()
+
+    def unpack(self, fmt, size):
+        """Unpack *size* bytes at the cursor, according to the
+        ``struct`` format *fmt*, and advance the cursor.
+
+        :param fmt: The format.
+        :type fmt: ``str``
+        :param size: The size of the format, in bytes.
+        :type size: ``int``
+        :return: The unpacked values.
+        :rtype: ``tuple``
+        """
+        values = struct.unpack_from(fmt, self.buffer, self.offset)
+        self.offset += size
+        return values
+
+    def seek(self, offset, whence=0):
+        """Move the cursor, like the ``seek`` method of files."""
+        if whence == 1:
+            offset += self.offset
+        elif whence == 2:
+            offset += len(self.buffer)
+        if offset < 0:
+            raise ValueError("negative seek position %i" % offset)
+        self.offset = offset
+        return offset
+
+    def tell(self):
+        """Return the position of the cursor."""
+        return self.offset
+
+    def close(self):
+        """Release the buffer. Raises ``BufferError`` if any view
+        returned by L{read_view} is still in use, as the buffer could
+        not be closed (or changed) safely then.
+        """
+        views = sum(1 for view in self._views if view() is not None)
+        if views:
+            raise BufferError(
+                "%i view(s) on the buffer still in use" % views)
+        self._views = []
+        self.buffer.release()
+
+def _unpack(stream, fmt, size):
+    """Unpack *size* bytes from *stream*, according to the ``struct``
+    format *fmt*. From a L{BufferReader}, the values are decoded
+    directly from its buffer, without an intermediate copy.
+
+    >>> _unpack(BufferReader(b'\\x01\\x00\\x02\\x00'), '<HH', 4)
+    (1, 2)
+    >>> from io import BytesIO
+    >>> _unpack(BytesIO(b'\\x01\\x00\\x02\\x00'), '<HH', 4)
+    (1, 2)
+
+    :param stream: The stream to read from.
+    :type stream: ``file`` or L{BufferReader}
+    :param fmt: The format.
+    :type fmt: ``str``
+    :param size: The size of the format, in bytes.
+    :type size: ``int``
+    :return: The unpacked values.
+    :rtype: ``tuple``
+    """
+    if isinstance(stream, BufferReader):
+        return stream.unpack(fmt, size)
+    else:
+        return struct.unpack(fmt, stream.read(size))
+
+def _read_bytes(stream, size=-1):
+    """Read at most *size* bytes (all remaining bytes if *size* is
+    negative) from *stream*. From a L{BufferReader} which does not copy
+    payloads, a read only view on its buffer is returned, rather than a
+    copy.
+
+    >>> _read_bytes(BufferReader(b'abcdef', 2), 3)
+    b'cde'
+    >>> _read_bytes(BufferReader(b'abcdef', 2, copy_payloads=False), 3)
+    <memory at 0x...>
+    >>> from io import BytesIO
+    >>> _read_bytes(BytesIO(b'abcdef'), 3)
+    b'abc'
+
+    :param stream: The stream to read from.
+    :type stream: ``file`` or L{BufferReader}
+    :param size: The number of bytes to read.
+    :type size: ``int``
+    :return: The bytes read.
+    :rtype: ``memoryview`` or ``bytes``
+    """
+    if isinstance(stream, BufferReader) and not stream.copy_payloads:
+        return stream.read_view(size)
+    else:
+        return stream.read(size)
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
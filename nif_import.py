@@ -50,6 +50,7 @@ from .texturesys.texture_loader import TextureLoader
 
 import bpy
 import mathutils
+import numpy
 
 import pyffi.spells.nif.fix
 from pyffi.formats.nif import NifFormat
@@ -96,6 +97,15 @@ def create_capsule(name, start, end, r):
 	ob.rotation_euler.z = 1.5708
 	return ob
 def select_layer(layer_nr): return tuple(i == layer_nr for i in range(0, 20))
+
+def unique_rows(rows, **kwargs):
+	"""Like numpy.unique(rows, axis=0, **kwargs), which needs numpy 1.13,
+	for a two dimensional integer array: every row is viewed as a single
+	structured element, so the rows are compared as a whole. Returns the
+	indices and the inverse asked for, but not the unique rows."""
+	rows = numpy.ascontiguousarray(rows)
+	keys = rows.view(dtype=[('', rows.dtype)] * rows.shape[1]).reshape(-1)
+	return numpy.unique(keys, **kwargs)[1:]
 	
 class NifImport(NifCommon):
 
@@ -242,9 +252,7 @@ class NifImport(NifCommon):
 			if self.properties.send_bones_to_bind_position:
 				pyffi.spells.nif.fix.SpellSendBonesToBindPosition(data=self.data).recurse()
 			if self.properties.apply_skin_deformation:
-				for n_geom in self.data.get_global_iterator():
-					if not isinstance(n_geom, NifFormat.NiGeometry):
-						continue
+				for n_geom in self.data.blocks_by_type(NifFormat.NiGeometry):
 					if not n_geom.is_skin():
 						continue
 					self.info('Applying skin deformation on geometry %s'
@@ -966,28 +974,17 @@ class NifImport(NifCommon):
 									 )
 
 		# vertices
-		n_verts = niData.vertices
+		n_verts = niData.as_array("vertices")
 
 		# polygons
 		poly_gens = [list(tri) for tri in niData.get_triangles()]
-		
-		n_uvco = []
+
 		# "sticky" UV coordinates: these are transformed in Blender UV's
-		for i in range(len(niData.uv_sets)):
-			n_uv = list()
-			for lw in range(len(niData.uv_sets[i])):
-				n_uvt = list()
-				n_uvt.append(niData.uv_sets[i][lw].u)
-				n_uvt.append(1.0 - (niData.uv_sets[i][lw].v))
-				n_uv.append(tuple(n_uvt))
-			n_uvco.append(n_uv)
-		#n_uvco = tuple(n_uv)
-		#why???
-		n_uvco.reverse()
-	
-		
+		n_uvco = niData.as_array("uv_sets")
+		n_uvco[:, :, 1] = 1.0 - n_uvco[:, :, 1]
+
 		# vertex normals
-		n_norms = niData.normals
+		n_norms = niData.as_array("normals")
 
 		'''
 		Properties
@@ -1011,7 +1008,7 @@ class NifImport(NifCommon):
 		if n_mat_prop or n_shader_prop or n_effect_shader_prop:
 			# Texture
 			n_texture_prop = None
-			if n_uvco:
+			if len(n_uvco):
 				n_texture_prop = nif_utils.find_property(niBlock, NifFormat.NiTexturingProperty)
 
 			# extra datas (for sid meier's railroads) that have material info
@@ -1104,127 +1101,94 @@ class NifImport(NifCommon):
 			material = None
 			materialIndex = 0
 
-		# v_map will store the vertex index mapping
-		# nif vertex i maps to blender vertex v_map[i]
-		v_map = [(i) for i in range(len(n_verts))]  # pre-allocate memory, for faster performance
-
 		# Following code avoids introducing unwanted cracks in UV seams:
 		# Construct vertex map to get unique vertex / normal pair list.
-		# We use a Python dictionary to remove doubles and to keep track of indices.
-		# While we are at it, we also add vertices while constructing the map.
-		n_map = {}
-		b_v_index = len(b_mesh.vertices)
-		for i, v in enumerate(n_verts):
-			# The key k identifies unique vertex /normal pairs.
-			# We use a tuple of ints for key, this works MUCH faster than a
-			# tuple of floats.
-			if n_norms:
-				n = n_norms[i]
-				k = (int(v.x * self.VERTEX_RESOLUTION),
-					 int(v.y * self.VERTEX_RESOLUTION),
-					 int(v.z * self.VERTEX_RESOLUTION),
-					 int(n.x * self.NORMAL_RESOLUTION),
-					 int(n.y * self.NORMAL_RESOLUTION),
-					 int(n.z * self.NORMAL_RESOLUTION))
-			else:
-				k = (int(v.x * self.VERTEX_RESOLUTION),
-					 int(v.y * self.VERTEX_RESOLUTION),
-					 int(v.z * self.VERTEX_RESOLUTION))
-			# check if vertex was already added, and if so, what index
-			try:
-				# this is the bottle neck...
-				# can we speed this up?
-				if not self.properties.combine_vertices:
-					n_map_k = None
-				else:
-					n_map_k = n_map[k]
-			except KeyError:
-				n_map_k = None
-			if not n_map_k:
-				# not added: new vertex / normal pair
-				n_map[k] = i		 # unique vertex / normal pair with key k was added, with NIF index i
-				v_map[i] = b_v_index  # NIF vertex i maps to blender vertex b_v_index
-				# add the vertex
-				if applytransform:
-					v = mathutils.Vector([v.x, v.y, v.z])
-					v = v * transform
-					b_mesh.vertices.add(1)
-					b_mesh.vertices[-1].co = [v.x, v.y, v.z]
-				else:
-					b_mesh.vertices.add(1)
-					b_mesh.vertices[-1].co = [v.x, v.y, v.z]
-				# adds normal info if present (Blender recalculates these when
-				# switching between edit mode and object mode, handled further)
-				# if n_norms:
-				#	mv = b_mesh.vertices[b_v_index]
-				#	n = n_norms[i]
-				#	mv.normal = mathutils.Vector(n.x, n.y, n.z)
-				b_v_index += 1
-			else:
-				# already added
-				# NIF vertex i maps to Blender vertex v_map[n_map_k]
-				v_map[i] = v_map[n_map_k]
+		# v_map will store the vertex index mapping
+		# nif vertex i maps to blender vertex v_map[i]
+		b_v_start = len(b_mesh.vertices)
+		if self.properties.combine_vertices:
+			# The key identifies unique vertex / normal pairs, as a row of
+			# ints, which compare exactly, unlike floats.
+			n_keys = n_verts.astype(numpy.float64) * self.VERTEX_RESOLUTION
+			if len(n_norms):
+				n_keys = numpy.hstack(
+					(n_keys, n_norms.astype(numpy.float64) * self.NORMAL_RESOLUTION))
+			n_keys = n_keys.astype(numpy.int64)
+			# first NIF index of every unique key, and key of every NIF index
+			n_first, n_inverse = unique_rows(
+				n_keys, return_index=True, return_inverse=True)
+			# vertices are added in NIF order, so number the unique keys
+			# in order of their first NIF index
+			n_order = numpy.argsort(n_first)
+			b_key_index = numpy.empty(len(n_first), dtype=numpy.int64)
+			b_key_index[n_order] = numpy.arange(len(n_first))
+			n_v_added = n_first[n_order]
+			v_map = (b_v_start + b_key_index[n_inverse.reshape(-1)]).tolist()
+		else:
+			n_v_added = numpy.arange(len(n_verts))
+			v_map = (b_v_start + n_v_added).tolist()
 		# report
-		self.debug("%i unique vertex-normal pairs" % len(n_map))
-		# release memory
-		del n_map
+		self.debug("%i unique vertex-normal pairs" % len(n_v_added))
+
+		# add all vertices at once
+		b_verts = n_verts[n_v_added].astype(numpy.float64)
+		if applytransform:
+			# as v * transform, for all v at once: row vectors, with w = 1
+			b_verts = numpy.dot(
+				numpy.hstack((b_verts, numpy.ones((len(b_verts), 1)))),
+				numpy.array(transform))[:, :3]
+		b_mesh.vertices.add(len(b_verts))
+		self.foreach_set_new(b_mesh.vertices, "co", b_v_start,
+							 b_verts.astype(numpy.float32), width=3)
 
 		# Adds the polygons to the mesh
-		f_map = [None] * len(poly_gens)
-		b_f_index = len(b_mesh.polygons)
 		bf2_index = len(b_mesh.polygons)
 		bl_index = len(b_mesh.loops)
-		poly_count = len(poly_gens)
-		b_mesh.polygons.add(poly_count)
-		b_mesh.loops.add(poly_count * 3)
-		num_new_faces = 0  # counter for debugging
-		unique_faces = list()  # to avoid duplicate polygons
-		tri_point_list = list()
-		for i, f in enumerate(poly_gens):
-			# get face index
-			f_verts = [v_map[vert_index] for vert_index in f]
-			if tuple(f_verts) in unique_faces:
-				continue
-			unique_faces.append(tuple(f_verts))
+		# blender vertices of every polygon
+		n_faces = numpy.array(poly_gens, dtype=numpy.int64).reshape(-1, 3)
+		b_faces = numpy.array(v_map, dtype=numpy.int64)[n_faces]
+		# keep the first of duplicate polygons, in order
+		f_first = unique_rows(b_faces, return_index=True)[0]
+		f_first.sort()
+		unique_faces = b_faces[f_first]
+		# NIF vertex of every new loop, in order
+		n_loop_verts = n_faces[f_first].reshape(-1)
+		num_new_faces = len(unique_faces)  # counter for debugging
+		f_map = [None] * len(poly_gens)
+		for b_f_index, i in enumerate(f_first.tolist(), bf2_index):
 			f_map[i] = b_f_index
-			tri_point_list.append(len(poly_gens[i]))
-			ls_list = list()
-			b_f_index += 1
-			num_new_faces += 1
-		for ls1 in range(0, num_new_faces * (tri_point_list[len(ls_list)]), (tri_point_list[len(ls_list)])):
-			ls_list.append((ls1 + bl_index))
-		for i in range(len(unique_faces)):
-			if f_map[i] is None:
-				continue
-			b_mesh.polygons[f_map[i]].loop_start = ls_list[(f_map[i] - bf2_index)]
-			b_mesh.polygons[f_map[i]].loop_total = len(unique_faces[(f_map[i] - bf2_index)])
-			l = 0
-			lp_points = [v_map[loop_point] for loop_point in poly_gens[(f_map[i] - bf2_index)]]
-			while l < (len(poly_gens[(f_map[i] - bf2_index)])):
-				b_mesh.loops[(l + (bl_index))].vertex_index = lp_points[l]
-				l += 1
-			bl_index += (len(poly_gens[(f_map[i] - bf2_index)]))
 
 		# at this point, deleted polygons (degenerate or duplicate)
 		# satisfy f_map[i] = None
 
 		self.debug("%i unique polygons" % num_new_faces)
 
-		# set face smoothing and material
-		for b_polysmooth_index in f_map:
-			if b_polysmooth_index is None:
-				continue
-			polysmooth = b_mesh.polygons[b_polysmooth_index]
-			polysmooth.use_smooth = True if (n_norms or niBlock.skin_instance) else False
-			polysmooth.material_index = materialIndex
+		# add all polygons, with their loops, face smoothing and
+		# material at once; all polygons are triangles
+		b_mesh.polygons.add(num_new_faces)
+		b_mesh.loops.add(num_new_faces * 3)
+		self.foreach_set_new(
+			b_mesh.loops, "vertex_index", bl_index,
+			numpy.array(unique_faces, dtype=numpy.int32).reshape(-1))
+		self.foreach_set_new(
+			b_mesh.polygons, "loop_start", bf2_index,
+			numpy.arange(bl_index, bl_index + num_new_faces * 3, 3,
+						 dtype=numpy.int32))
+		self.foreach_set_new(
+			b_mesh.polygons, "loop_total", bf2_index,
+			numpy.full(num_new_faces, 3, dtype=numpy.int32))
+		self.foreach_set_new(
+			b_mesh.polygons, "use_smooth", bf2_index,
+			numpy.full(num_new_faces,
+					   bool(len(n_norms) or niBlock.skin_instance),
+					   dtype=bool))
+		self.foreach_set_new(
+			b_mesh.polygons, "material_index", bf2_index,
+			numpy.full(num_new_faces, materialIndex, dtype=numpy.int32))
 		# vertex colors
 
 		if b_mesh.polygons and niData.vertex_colors:
-			n_vcol_map = list()
-			for n_vcol, n_vmap in zip(niData.vertex_colors,
-									  v_map
-									  ):
-				n_vcol_map.append((n_vcol, n_vmap))
+			n_vcols = niData.as_array("vertex_colors")[n_loop_verts]
 
 			# create vertex_layers
 			if "VertexColor" not in b_mesh.vertex_colors:
@@ -1232,17 +1196,12 @@ class NifImport(NifCommon):
 				b_mesh.vertex_colors.new(name="VertexAlpha")  # greyscale
 
 			# Mesh Vertex Color / Mesh Face
-			for b_polygon_loop in b_mesh.loops:
-				b_loop_index = b_polygon_loop.index
-				vcol = b_mesh.vertex_colors["VertexColor"].data[b_loop_index]
-				vcola = b_mesh.vertex_colors["VertexAlpha"].data[b_loop_index]
-				for n_col_index, n_map_index in n_vcol_map:
-					if n_map_index == b_polygon_loop.vertex_index:
-						col_list = n_col_index
-						vcol.color.r = col_list.r
-						vcol.color.g = col_list.g
-						vcol.color.b = col_list.b
-						vcola.color.v = col_list.a
+			self.foreach_set_new(
+				b_mesh.vertex_colors["VertexColor"].data, "color", bl_index,
+				n_vcols[:, :3], width=3)
+			self.foreach_set_new(
+				b_mesh.vertex_colors["VertexAlpha"].data, "color", bl_index,
+				numpy.repeat(n_vcols[:, 3:], 3, axis=1), width=3)
 			# vertex colors influence lighting...
 			# we have to set the use_vertex_color_light flag on the material
 			# see below
@@ -1258,38 +1217,17 @@ class NifImport(NifCommon):
 		# (some corner cases have only one vertex, and no polygons,
 		# and b_mesh.faceUV = 1 on such mesh raises a runtime error)
 		if b_mesh.polygons:
-
-			# b_mesh.faceUV = 1
-			# b_mesh.vertexUV = 0
-			for i in range(len(niData.uv_sets)):
+			for i, n_uvs in enumerate(n_uvco):
 				# Set the face UV's for the mesh. The NIF format only supports
 				# vertex UV's, but Blender only allows explicit editing of face
 				# UV's, so load vertex UV's as face UV's
 				uvlayer = self.texturehelper.get_uv_layer_name(i)
 				if uvlayer not in b_mesh.uv_textures:
 					b_mesh.uv_textures.new(uvlayer)
-					uv_faces = b_mesh.uv_textures.active.data[:]
-					#print(i,"case1")
-				elif uvlayer in b_mesh.uv_textures:
-					uv_faces = b_mesh.uv_textures[uvlayer].data[:]
-					#print(i,"case2")
-				else:
-					uv_faces = None
-					#print(i,"case3")
-				if uv_faces:
-					uvl = b_mesh.uv_layers.active.data[:]
-					for b_f_index, f in enumerate(poly_gens):
-						if b_f_index is None:
-							continue
-						uvlist = f
-						v1, v2, v3 = uvlist
-						# if v3 == 0:
-						#   v1,v2,v3 = v3,v1,v2
-						#print(n_uvco[i])
-						b_poly_index = b_mesh.polygons[b_f_index + bf2_index]
-						uvl[b_poly_index.loop_start].uv = n_uvco[i][v1]
-						uvl[b_poly_index.loop_start + 1].uv = n_uvco[i][v2]
-						uvl[b_poly_index.loop_start + 2].uv = n_uvco[i][v3]
+				# UV of the NIF vertex of every new loop
+				self.foreach_set_new(
+					b_mesh.uv_layers[uvlayer].data, "uv", bl_index,
+					n_uvs[n_loop_verts], width=2)
 			b_mesh.uv_textures.active_index = 0
 
 		if material:
@@ -1308,13 +1246,13 @@ class NifImport(NifCommon):
 			# if there's a base texture assigned to this material sets it
 			# to be displayed in Blender's 3D view
 			# but only if there are UV coordinates
-			if mbasetex and mbasetex.texture and n_uvco:
+			if mbasetex and mbasetex.texture and len(n_uvco):
 				imgobj = mbasetex.texture.image
 				if imgobj:
-					for b_polyimage_index in f_map:
-						if b_polyimage_index is None:
-							continue
-						tface = b_mesh.uv_textures.active.data[b_polyimage_index]
+					# the new polygons follow each other, so take them
+					# all at once (foreach_set does not take images)
+					for tface in b_mesh.uv_textures.active.data[
+							bf2_index:bf2_index + num_new_faces]:
 						# gone in blender 2.5x+?
 						# f.mode = Blender.Mesh.FaceModes['TEX']
 						# f.transp = Blender.Mesh.FaceTranspModes['ALPHA']
@@ -1332,37 +1270,50 @@ class NifImport(NifCommon):
 					continue
 				vertex_weights = boneWeights[idx].vertex_weights
 				groupname = self.dict_names[bone]
-				if groupname not in b_obj.vertex_groups.items():
+				if groupname in b_obj.vertex_groups:
+					v_group = b_obj.vertex_groups[groupname]
+				else:
 					v_group = b_obj.vertex_groups.new(groupname)
+				# weight of every blender vertex (the last one wins, as
+				# with 'REPLACE')
+				b_weights = {}
 				for skinWeight in vertex_weights:
-					vert = skinWeight.index
-					weight = skinWeight.weight
-					v_group.add([v_map[vert]],
-								weight,
-								'REPLACE'
-								)
+					b_weights[v_map[skinWeight.index]] = skinWeight.weight
+				# add all vertices with the same weight at once
+				weight_verts = {}
+				for b_v_index, weight in b_weights.items():
+					weight_verts.setdefault(weight, []).append(b_v_index)
+				for weight, groupverts in weight_verts.items():
+					v_group.add(groupverts, weight, 'REPLACE')
 
 		# import body parts as vertex groups
 		if isinstance(skininst, NifFormat.BSDismemberSkinInstance):
 			skinpart_list = []
 			bodypart_flag = []
 			skinpart = niBlock.get_skin_partition()
+			# vertices of every body part, collected over all partitions
+			bodypart_verts = {}
 			for bodypart, skinpartblock in zip(skininst.partitions,
 											   skinpart.skin_partition_blocks
 											   ):
 				groupname = self.import_dismember_body_part(bodypart.body_part)
+				if groupname not in bodypart_verts:
+					bodypart_verts[groupname] = set()
+					if groupname not in b_obj.vertex_groups:
+						skinpart_index = len(skinpart_list)
+						skinpart_list.append((skinpart_index, groupname))
+						bodypart_flag.append(bodypart.part_flag)
+				# find vertex indices of this group
+				bodypart_verts[groupname].update(
+					v_map[v_index] for v_index in skinpartblock.vertex_map)
+			# create the groups, with one call each
+			for groupname, groupverts in bodypart_verts.items():
 				# create vertex group if it did not exist yet
-				if not(groupname in b_obj.vertex_groups.items()):
+				if groupname in b_obj.vertex_groups:
+					v_group = b_obj.vertex_groups[groupname]
+				else:
 					v_group = b_obj.vertex_groups.new(groupname)
-					skinpart_index = len(skinpart_list)
-					skinpart_list.append((skinpart_index, groupname))
-					bodypart_flag.append(bodypart.part_flag)
-				# find vertex indices of this group
-				groupverts = [v_map[v_index] for
-							  v_index in skinpartblock.vertex_map
-							  ]
-				# create the group
-				v_group.add(groupverts, 1, 'ADD')
+				v_group.add(sorted(groupverts), 1, 'ADD')
 			b_obj.niftools_part_flags_panel.pf_partcount = len(skinpart_list)
 			for i, pl_name in skinpart_list:
 				b_obj_partflag = b_obj.niftools_part_flags.add()
@@ -1486,7 +1437,7 @@ class NifImport(NifCommon):
 				# for each vertex calculate the key position from base
 				# pos + delta offset
 				for bv, mv, b_v_index in zip(n_verts, morphverts, v_map):
-					base = mathutils.Vector(bv.x, bv.y, bv.z)
+					base = mathutils.Vector(bv)
 					delta = mathutils.Vector(mv[0], mv[1], mv[2])
 					v = base + delta
 					if applytransform:
@@ -1521,7 +1472,7 @@ class NifImport(NifCommon):
 
 			# finally: return to base position
 			for bv, b_v_index in zip(n_verts, v_map):
-				base = mathutils.Vector(bv.x, bv.y, bv.z)
+				base = mathutils.Vector(bv)
 				if applytransform:
 					base *= transform
 				b_mesh.vertices[b_v_index].co[0] = base.x
@@ -1544,6 +1495,27 @@ class NifImport(NifCommon):
 
 		return b_obj
 
+	def foreach_set_new(self, b_items, attr, start, values, width=1):
+		"""Set an attribute of all items of a Blender collection, from
+		index start on, with a single foreach_set call. Items before start
+		keep their value.
+
+		:param b_items: The collection, such as b_mesh.vertices.
+		:param attr: The name of the attribute, such as "co".
+		:type attr: C{str}
+		:param start: The index of the first item to set.
+		:type start: C{int}
+		:param values: The values of the items, flattened.
+		:type values: C{numpy.ndarray}
+		:param width: The number of values per item.
+		:type width: C{int}
+		"""
+		b_values = numpy.zeros(len(b_items) * width, dtype=values.dtype)
+		if start:
+			b_items.foreach_get(attr, b_values)
+		b_values[start * width:] = values.reshape(-1)
+		b_items.foreach_set(attr, b_values)
+
 	def set_parents(self, niBlock):
 		"""Set the parent block recursively through the tree, to allow
 		crawling back as needed."""